@@ -0,0 +1,77 @@
+"""Deterministic generators of synthetic CSV data for benchmarks.
+
+Each profile describes the shape of the data: the number of columns,
+the kinds of the values, the cardinality of the columns,
+and whether text values contain quoted newlines.
+"""
+
+import csv
+import random
+import collections
+
+Profile = collections.namedtuple(
+    'Profile', ['columns', 'kinds', 'cardinality', 'quoted_newlines'])
+
+_NUMERIC_KINDS = ['int', 'float']
+_TEXT_KINDS = ['text']
+_MIXED_KINDS = ['int', 'float', 'text', 'null']
+
+PROFILES = collections.OrderedDict([
+    ('narrow-numeric', Profile(5, _NUMERIC_KINDS, 0, False)),
+    ('narrow-text', Profile(5, _TEXT_KINDS, 0, False)),
+    ('wide-numeric', Profile(100, _NUMERIC_KINDS, 0, False)),
+    ('wide-text', Profile(100, _TEXT_KINDS, 0, False)),
+    ('low-cardinality', Profile(20, _MIXED_KINDS, 16, False)),
+    ('high-cardinality', Profile(20, _MIXED_KINDS, 0, False)),
+    ('quoted-newline', Profile(10, _TEXT_KINDS, 0, True)),
+])
+
+
+def _generate_value(rand, kind, quoted_newlines):
+    if kind == 'int':
+        return str(rand.randint(-1000000, 1000000))
+    if kind == 'float':
+        return '{0:.6f}'.format(rand.uniform(-1000.0, 1000.0))
+    if kind == 'text':
+        if quoted_newlines:
+            return 'line {0},\n"quoted" {1}'.format(
+                rand.randint(0, 1000000), rand.randint(0, 1000000))
+        return 'text-{0}'.format(rand.randint(0, 1000000))
+    return ''
+
+
+def column_names(profile):
+    """Return the column names of `profile`."""
+    return ['c{0}'.format(index) for index in range(profile.columns)]
+
+
+def generate_rows(profile, num_rows, seed=0):
+    """Generate `num_rows` rows of `profile` deterministically.
+    When the cardinality is positive, each column has at most
+    the number of distinct values.
+    """
+    rand = random.Random(seed)
+    column_kinds = [
+        profile.kinds[index % len(profile.kinds)]
+        for index in range(profile.columns)]
+    if profile.cardinality > 0:
+        domains = [
+            [_generate_value(rand, kind, profile.quoted_newlines)
+             for _ in range(profile.cardinality)]
+            for kind in column_kinds]
+        return [
+            [rand.choice(domain) for domain in domains]
+            for _ in range(num_rows)
+        ]
+    return [
+        [_generate_value(rand, kind, profile.quoted_newlines)
+         for kind in column_kinds]
+        for _ in range(num_rows)
+    ]
+
+
+def write_csv(out_stream, profile, rows):
+    """Write the header of `profile` and `rows` into `out_stream`."""
+    writer = csv.writer(out_stream, lineterminator='\n')
+    writer.writerow(column_names(profile))
+    writer.writerows(rows)
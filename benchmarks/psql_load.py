@@ -0,0 +1,253 @@
+#!/usr/bin/env python
+
+"""Benchmark of loading the output variants into a local PostgreSQL.
+
+Run `python -m benchmarks.psql_load --database 'host=localhost ...'`
+from the repository root, with `psql` in the path.
+Generated datasets of increasing size are loaded by each variant
+of the output: text COPY, batched COPY, shards loaded in parallel,
+and binary COPY when the query engine supports it.
+For each load, it measures the wall time, the CPU time of the client
+processes (csv2sql and psql), the CPU time of the server processes,
+and the size of the table.
+The server CPU time is read from /proc, so it is measured only for
+a server on the same host, and it includes the other sessions.
+"""
+
+import argparse
+import collections
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from subprocess import Popen
+
+from benchmarks.generators import PROFILES
+from benchmarks.generators import generate_rows
+from benchmarks.generators import write_csv
+from csv2sql.queryengines import psql
+from integrate import run_pipe_process
+
+# The type cache is disabled so that every variant infers the types,
+# and the cache of the user is not written.
+_ALL = [sys.executable, '-m', 'csv2sql', 'all', '-r', '--no-cache']
+_TABLE_NAME = 'csv2sql_benchmark'
+_SERVER_PROCESS_NAMES = ('postgres', 'postmaster')
+_VARIANTS = ['text', 'batched', 'sharded', 'binary']
+
+
+def _psql(args):
+    return [args.psql, '-X', '-q', '-v', 'ON_ERROR_STOP=1',
+            '-d', args.database]
+
+
+def _check_statuses(statuses, variant):
+    if any(status != 0 for status in statuses):
+        raise RuntimeError(
+            'The {0} load failed: {1}'.format(variant, statuses))
+
+
+def _load_text(args, in_path, _):
+    run = _ALL + ['-i', in_path, _TABLE_NAME]
+    _check_statuses(run_pipe_process([run, _psql(args)]), 'text')
+
+
+def _load_batched(args, in_path, _):
+    run = _ALL + [
+        '-i', in_path, '--batch-rows', str(args.batch_rows), _TABLE_NAME]
+    _check_statuses(run_pipe_process([run, _psql(args)]), 'batched')
+
+
+def _load_sharded(args, in_path, work_dir):
+    out_dir = os.path.join(work_dir, 'shards')
+    run = _ALL + [
+        '-i', in_path, '--out-dir', out_dir, '--shards', str(args.shards),
+        _TABLE_NAME]
+    _check_statuses(run_pipe_process([run]), 'sharded')
+    _check_statuses(run_pipe_process([
+        _psql(args) + ['-f', os.path.join(out_dir, 'schema.sql')]]),
+        'sharded')
+
+    with open(os.path.join(out_dir, 'manifest.json')) as manifest_file:
+        manifest = json.load(manifest_file)
+    processes = [
+        Popen(_psql(args) + ['-f', os.path.join(out_dir, shard['file'])])
+        for shard in manifest['shards']]
+    _check_statuses(
+        tuple(process.wait() for process in processes), 'sharded')
+    shutil.rmtree(out_dir)
+
+
+def _load_binary(args, in_path, work_dir):
+    data_path = os.path.join(work_dir, 'data.bin')
+    run = _ALL + [
+        '-i', in_path, '--copy-format', 'binary', '--data-file', data_path,
+        _TABLE_NAME]
+    _check_statuses(run_pipe_process([run, _psql(args)]), 'binary')
+    os.remove(data_path)
+
+
+_LOADERS = {
+    'text': _load_text,
+    'batched': _load_batched,
+    'sharded': _load_sharded,
+    'binary': _load_binary,
+}
+
+
+def _read_process_times(pid):
+    """Return the name, the parent pid, the CPU time of the process
+    and the CPU time of its waited-for children in clock ticks.
+    """
+    with open('/proc/{0}/stat'.format(pid)) as stat_file:
+        stat = stat_file.read()
+    # The name is in parentheses and can contain spaces.
+    name = stat[stat.index('(') + 1:stat.rindex(')')]
+    fields = stat[stat.rindex(')') + 2:].split()
+    utime, stime, cutime, cstime = (int(value) for value in fields[11:15])
+    return name, int(fields[1]), utime + stime, cutime + cstime
+
+
+def _server_cpu_seconds():
+    """Return the total CPU time of the PostgreSQL processes on this host,
+    including the exited backends accounted to their parents,
+    or None when not found.
+    """
+    processes = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            times = _read_process_times(entry)
+        except (OSError, ValueError):
+            continue
+        if times[0] in _SERVER_PROCESS_NAMES:
+            processes[int(entry)] = times
+    if not processes:
+        return None
+    ticks = 0
+    for _, parent, own_ticks, children_ticks in processes.values():
+        ticks += own_ticks
+        if parent not in processes:
+            ticks += children_ticks
+    return ticks / os.sysconf('SC_CLK_TCK')
+
+
+def _client_cpu_seconds():
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def _table_size(args):
+    output = subprocess.check_output(
+        _psql(args) + ['-A', '-t', '-c',
+                       'SELECT pg_total_relation_size(\'{0}\')'.format(
+                           _TABLE_NAME)],
+        universal_newlines=True)
+    return int(output.strip())
+
+
+def _measure(args, variant, in_path, work_dir):
+    server_start = _server_cpu_seconds()
+    client_start = _client_cpu_seconds()
+    start_time = time.perf_counter()
+    _LOADERS[variant](args, in_path, work_dir)
+    elapsed = time.perf_counter() - start_time
+    client = _client_cpu_seconds() - client_start
+    server_end = _server_cpu_seconds()
+    server = (
+        None if server_start is None or server_end is None
+        else server_end - server_start)
+    return collections.OrderedDict([
+        ('variant', variant),
+        ('seconds', elapsed),
+        ('client_cpu_seconds', client),
+        ('server_cpu_seconds', server),
+        ('table_bytes', _table_size(args)),
+    ])
+
+
+def _format_seconds(seconds):
+    return '-' if seconds is None else '{0:.2f}'.format(seconds)
+
+
+def _print_table(results):
+    print('{0:>10s} {1:8s} {2:>10s} {3:>12s} {4:>12s} {5:>12s} {6:>12s}'
+          .format('rows', 'variant', 'wall s', 'rows/sec',
+                  'client cpu s', 'server cpu s', 'table MB'))
+    for result in results:
+        print('{0:10d} {1:8s} {2:>10s} {3:12.0f} {4:>12s} {5:>12s}'
+              ' {6:12.2f}'.format(
+                  result['rows'], result['variant'],
+                  _format_seconds(result['seconds']),
+                  result['rows'] / result['seconds'],
+                  _format_seconds(result['client_cpu_seconds']),
+                  _format_seconds(result['server_cpu_seconds']),
+                  result['table_bytes'] / 1e6))
+
+
+def main():
+    """Main."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        '--database', default=os.environ.get('CSV2SQL_LOAD_DATABASE'),
+        help=('libpq connection string of the server.'
+              ' [default: $CSV2SQL_LOAD_DATABASE]'))
+    parser.add_argument('--psql', default='psql', help='psql command.')
+    parser.add_argument(
+        '--sizes', type=int, nargs='+', default=[10000, 100000, 1000000],
+        help='Num rows of the datasets.')
+    parser.add_argument(
+        '--profile', choices=list(PROFILES), default='high-cardinality')
+    parser.add_argument(
+        '--variant', action='append', choices=_VARIANTS,
+        help='Output variant to load. [default: all the variants]')
+    parser.add_argument('--batch-rows', type=int, default=100000)
+    parser.add_argument('--shards', type=int, default=4)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument(
+        '--output', metavar='PATH', help='JSON file of the results.')
+    args = parser.parse_args()
+    if not args.database:
+        parser.error('`--database` or $CSV2SQL_LOAD_DATABASE is required.')
+
+    variants = args.variant or _VARIANTS
+    if not hasattr(psql, 'write_binary_data') and 'binary' in variants:
+        variants = [variant for variant in variants if variant != 'binary']
+
+    results = []
+    work_dir = tempfile.mkdtemp()
+    try:
+        for num_rows in args.sizes:
+            in_path = os.path.join(work_dir, 'in.csv')
+            with open(in_path, 'w', encoding='utf-8') as in_file:
+                profile = PROFILES[args.profile]
+                write_csv(
+                    in_file, profile,
+                    generate_rows(profile, num_rows, args.seed))
+            for variant in variants:
+                result = _measure(args, variant, in_path, work_dir)
+                result['rows'] = num_rows
+                result['bytes'] = os.path.getsize(in_path)
+                results.append(result)
+    finally:
+        shutil.rmtree(work_dir)
+
+    _print_table(results)
+    if args.output:
+        with open(args.output, 'w') as out_file:
+            json.dump({
+                'profile': args.profile,
+                'batch_rows': args.batch_rows,
+                'shards': args.shards,
+                'results': results,
+            }, out_file, indent=2)
+            out_file.write('\n')
+
+
+if __name__ == '__main__':
+    main()
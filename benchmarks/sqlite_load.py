@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+
+"""Benchmark of loading records into a SQLite database file.
+
+Run `python -m benchmarks.sqlite_load` from the repository root.
+"""
+
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import timeit
+
+from csv2sql.queryengines import sqlite
+
+
+def generate_rows(num_rows, seed=0):
+    """Generate rows of an integer, a float and a text deterministically."""
+    rand = random.Random(seed)
+    return [
+        [str(rand.randint(0, 1000000)),
+         repr(rand.random()),
+         'text-{0}'.format(rand.randint(0, 1000))]
+        for _ in range(num_rows)
+    ]
+
+
+_COLUMN_TYPES = [('a', 'INTEGER'), ('b', 'REAL'), ('c', 'TEXT')]
+
+
+def _measure(rows, repeat, **kwargs):
+    temp_dir = tempfile.mkdtemp()
+    try:
+        def _load():
+            database = os.path.join(temp_dir, 'benchmark.db')
+            if os.path.exists(database):
+                os.remove(database)
+            sqlite.load(database, 'tbl', _COLUMN_TYPES, rows, '', **kwargs)
+        elapsed = min(timeit.repeat(_load, number=1, repeat=repeat))
+    finally:
+        shutil.rmtree(temp_dir)
+    return len(rows) / elapsed
+
+
+def main():
+    """Main."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    rows = generate_rows(args.rows)
+    cases = [
+        ('batch 1000', {'batch_size': 1000}),
+        ('batch 100000', {'batch_size': 100000}),
+        ('batch 100000, journal off, synchronous off', {
+            'batch_size': 100000, 'journal_mode': 'OFF',
+            'synchronous': 'OFF'}),
+        ('batch 100000, index', {
+            'batch_size': 100000, 'indexes': ['a']}),
+        ('batch 100000, deferred index', {
+            'batch_size': 100000, 'indexes': ['a'], 'defer_index': True}),
+    ]
+
+    print('rows: {0}'.format(args.rows))
+    for name, kwargs in cases:
+        print('{0:45s} {1:12.0f} rows/sec'.format(
+            name + ':', _measure(rows, args.repeat, **kwargs)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,285 @@
+#!/usr/bin/env python
+
+"""Benchmark suite of type inference, prefetching, writing and whole runs
+over synthetic CSV data of several profiles.
+
+Run `python -m benchmarks.suite` from the repository root.
+Each case runs in its own process to measure its peak RSS.
+The results are written in JSON by `--output`,
+and compared with the ones of another commit by `--compare`.
+"""
+
+import argparse
+import collections
+import datetime
+import io
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+
+from benchmarks.generators import PROFILES
+from benchmarks.generators import column_names
+from benchmarks.generators import generate_rows
+from benchmarks.generators import write_csv
+from csv2sql.core.compilation import compile_patterns
+from csv2sql.core.prefetching import RewindableFileIterator
+from csv2sql.core.type_inference import decide_types
+from csv2sql.core.type_inference import interpret_patterns
+from csv2sql.queryengines import psql
+
+_INTERPRETATIONS = 1000
+_SPOOL_BUFFER_SIZE = 1024 * 1024 * 1024
+_SPILL_BUFFER_SIZE = 1024 * 1024
+_RESULT_FORMAT = (
+    '{0:20s} {1:18s} {2:14.0f} rows/sec {3:>8s} MB/sec {4:8d} KiB')
+
+
+class _Unseekable(io.StringIO):
+    """A text stream which cannot seek, such as a pipe."""
+
+    def seekable(self):
+        return False
+
+
+def _generate(profile_name, num_rows, seed):
+    profile = PROFILES[profile_name]
+    rows = generate_rows(profile, num_rows, seed)
+    stream = io.StringIO()
+    write_csv(stream, profile, rows)
+    return profile, rows, stream.getvalue()
+
+
+def _best_time(function, repeat):
+    return min(timeit.repeat(function, number=1, repeat=repeat))
+
+
+def _bench_interpret_patterns(_, repeat, __, ___):
+    obj = psql.type_patterns()
+
+    def interpret():
+        for _ in range(_INTERPRETATIONS):
+            interpret_patterns(obj)
+    return _INTERPRETATIONS, 0, _best_time(interpret, repeat)
+
+
+def _bench_decide_types(profile_name, repeat, num_rows, seed):
+    profile, rows, text = _generate(profile_name, num_rows, seed)
+    patterns = compile_patterns(psql.type_patterns())
+    names = column_names(profile)
+    seconds = _best_time(
+        lambda: decide_types(patterns, rows, names), repeat)
+    return len(rows), len(text.encode('utf-8')), seconds
+
+
+def _spool_and_rewind(text, **kwargs):
+    with RewindableFileIterator(_Unseekable(text), **kwargs) as iterator:
+        for _ in iterator:
+            pass
+        iterator.rewind()
+        for _ in iterator.freeze():
+            pass
+
+
+def _bench_rewindable(buffer_size):
+    def bench(profile_name, repeat, num_rows, seed):
+        _, rows, text = _generate(profile_name, num_rows, seed)
+        seconds = _best_time(
+            lambda: _spool_and_rewind(text, buffer_size=buffer_size),
+            repeat)
+        return len(rows), len(text.encode('utf-8')), seconds
+    return bench
+
+
+def _bench_writer(profile_name, repeat, num_rows, seed):
+    _, rows, text = _generate(profile_name, num_rows, seed)
+
+    def write():
+        writer = psql.WriterWrapper(io.StringIO(), dialect='excel')
+        writer.writerows(rows)
+    return len(rows), len(text.encode('utf-8')), _best_time(write, repeat)
+
+
+def _run_all(in_path):
+    """Run `csv2sql all` in a process and return the elapsed time
+    and the peak RSS of the process in KiB.
+    """
+    command = [
+        sys.executable, '-m', 'csv2sql', 'all', '-i', in_path,
+        '-o', os.devnull, '--no-cache', 'tbl']
+    start_time = time.perf_counter()
+    with open(os.devnull, 'w') as devnull:
+        returncode = subprocess.Popen(command, stderr=devnull).wait()
+    elapsed = time.perf_counter() - start_time
+    if returncode != 0:
+        raise RuntimeError('csv2sql exited with {0}.'.format(returncode))
+    # The largest of the processes waited for, which are only the runs
+    # in the worker process of the case.
+    return elapsed, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+
+
+def _bench_all(profile_name, repeat, num_rows, seed):
+    _, rows, text = _generate(profile_name, num_rows, seed)
+    temp_dir = tempfile.mkdtemp()
+    try:
+        in_path = os.path.join(temp_dir, 'in.csv')
+        with open(in_path, 'w', encoding='utf-8') as in_file:
+            in_file.write(text)
+        runs = [_run_all(in_path) for _ in range(repeat)]
+    finally:
+        shutil.rmtree(temp_dir)
+    seconds = min(elapsed for elapsed, _ in runs)
+    peak_rss = max(peak for _, peak in runs)
+    return len(rows), len(text.encode('utf-8')), seconds, peak_rss
+
+
+# Cases, which are run for each profile unless profile-independent.
+_CASES = collections.OrderedDict([
+    ('interpret_patterns', (_bench_interpret_patterns, False)),
+    ('decide_types', (_bench_decide_types, True)),
+    ('rewindable_spool', (_bench_rewindable(_SPOOL_BUFFER_SIZE), True)),
+    ('rewindable_spill', (_bench_rewindable(_SPILL_BUFFER_SIZE), True)),
+    ('writer_writerows', (_bench_writer, True)),
+    ('all', (_bench_all, True)),
+])
+
+
+def _run_case(task):
+    """Run a case in a worker process and return the result."""
+    case, profile_name, repeat, num_rows, seed = task
+    function, _ = _CASES[case]
+    measured = function(profile_name, repeat, num_rows, seed)
+    items, num_bytes, seconds = measured[:3]
+    # ru_maxrss is in KiB on Linux.
+    peak_rss = (
+        measured[3] if len(measured) > 3 else
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+    return collections.OrderedDict([
+        ('case', case),
+        ('profile', profile_name),
+        ('rows', items),
+        ('bytes', num_bytes),
+        ('seconds', seconds),
+        ('rows_per_sec', items / seconds),
+        ('mb_per_sec', num_bytes / seconds / 1e6 if num_bytes else None),
+        ('peak_rss_kb', peak_rss),
+    ])
+
+
+def _run_in_process(task):
+    context = multiprocessing.get_context('spawn')
+    with context.Pool(1) as pool:
+        return pool.apply(_run_case, (task,))
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL,
+            universal_newlines=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _format_result(result):
+    mb_per_sec = result['mb_per_sec']
+    return _RESULT_FORMAT.format(
+        result['case'], result['profile'] or '-', result['rows_per_sec'],
+        '-' if mb_per_sec is None else '{0:.2f}'.format(mb_per_sec),
+        result['peak_rss_kb'])
+
+
+def _compare(results, baseline, threshold):
+    """Print the speed of `results` relative to `baseline`
+    and return if no case is slower beyond `threshold`.
+    """
+    baseline_map = dict(
+        ((result['case'], result['profile']), result)
+        for result in baseline['results'])
+    passed = True
+    print('compared with {0}:'.format(baseline.get('commit')))
+    for result in results:
+        base = baseline_map.get((result['case'], result['profile']))
+        if base is None:
+            continue
+        ratio = result['rows_per_sec'] / base['rows_per_sec']
+        regressed = ratio < 1.0 - threshold
+        passed = passed and not regressed
+        print('{0:20s} {1:18s} {2:8.2f}x{3}'.format(
+            result['case'], result['profile'] or '-', ratio,
+            '  REGRESSION' if regressed else ''))
+    return passed
+
+
+def main():
+    """Main."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument(
+        '--case', action='append', choices=list(_CASES),
+        help='Case to run. [default: all the cases]')
+    parser.add_argument(
+        '--profile', action='append', choices=list(PROFILES),
+        help='Profile of the data. [default: all the profiles]')
+    parser.add_argument(
+        '--output', metavar='PATH', help='JSON file of the results.')
+    parser.add_argument(
+        '--compare', metavar='PATH',
+        help=('JSON file of the baseline results. The exit status is 1'
+              ' when a case is slower than the baseline beyond'
+              ' `--threshold`.'))
+    parser.add_argument(
+        '--threshold', type=float, default=0.1,
+        help='Ratio of the acceptable slowdown. [default: 0.1]')
+    args = parser.parse_args()
+
+    cases = args.case or list(_CASES)
+    profile_names = args.profile or list(PROFILES)
+    tasks = []
+    for case in cases:
+        _, per_profile = _CASES[case]
+        for profile_name in (profile_names if per_profile else [None]):
+            tasks.append(
+                (case, profile_name, args.repeat, args.rows, args.seed))
+
+    results = []
+    for task in tasks:
+        result = _run_in_process(task)
+        print(_format_result(result))
+        results.append(result)
+
+    report = collections.OrderedDict([
+        ('commit', _git_commit()),
+        ('date', datetime.datetime.now(datetime.timezone.utc).isoformat()),
+        ('python', platform.python_version()),
+        ('platform', platform.platform()),
+        ('parameters', {
+            'rows': args.rows, 'repeat': args.repeat, 'seed': args.seed}),
+        ('results', results),
+    ])
+    if args.output:
+        with open(args.output, 'w') as out_file:
+            json.dump(report, out_file, indent=2)
+            out_file.write('\n')
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+        if baseline.get('parameters') != report['parameters']:
+            print('warning: the parameters differ from the baseline:'
+                  ' {0}'.format(baseline.get('parameters')))
+        if not _compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
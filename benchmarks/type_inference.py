@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+
+"""Benchmark of type inference on wide files.
+
+Run `python -m benchmarks.type_inference` from the repository root.
+"""
+
+import argparse
+import timeit
+
+from benchmarks.generators import PROFILES
+from benchmarks.generators import column_names
+from benchmarks.generators import generate_rows
+from csv2sql.core.compilation import compile_patterns
+from csv2sql.core.type_inference import decide_types
+from csv2sql.core.type_inference import interpret_patterns
+from csv2sql.queryengines import psql
+
+
+def _measure(patterns, rows, column_names, repeat, **kwargs):
+    elapsed = min(timeit.repeat(
+        lambda: decide_types(patterns, rows, column_names, **kwargs),
+        number=1, repeat=repeat))
+    return len(rows) * len(column_names) / elapsed
+
+
+def main():
+    """Main."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=2000)
+    parser.add_argument('--columns', type=int, default=300)
+    parser.add_argument('--cardinality', type=int, default=0)
+    parser.add_argument('--cache-size', type=int, default=1024)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    # The mixed-type columns in the shape of the arguments.
+    profile = PROFILES['high-cardinality']._replace(
+        columns=args.columns, cardinality=args.cardinality)
+    rows = generate_rows(profile, args.rows)
+    names = column_names(profile)
+    obj = psql.type_patterns()
+
+    interpreted = _measure(
+        interpret_patterns(obj), rows, names, args.repeat,
+        cache_size=args.cache_size)
+    compiled = _measure(
+        compile_patterns(obj), rows, names, args.repeat,
+        cache_size=args.cache_size)
+
+    print('rows: {0}, columns: {1}, cardinality: {2}, cache size: {3}'.format(
+        args.rows, args.columns, args.cardinality, args.cache_size))
+    print('interpreted: {0:12.0f} cells/sec'.format(interpreted))
+    print('compiled:    {0:12.0f} cells/sec'.format(compiled))
+    print('speed-up:    {0:12.2f}x'.format(compiled / interpreted))
+
+
+if __name__ == '__main__':
+    main()
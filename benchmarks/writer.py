@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+
+"""Benchmark of writing COPY data.
+
+Run `python -m benchmarks.writer` from the repository root.
+"""
+
+import argparse
+import io
+import random
+import timeit
+
+from csv2sql.queryengines.psql import WriterWrapper
+
+
+def generate_rows(num_rows, num_columns, seed=0):
+    """Generate rows of short values deterministically."""
+    rand = random.Random(seed)
+    return [
+        [str(rand.randint(0, 1000000)) for _ in range(num_columns)]
+        for _ in range(num_rows)
+    ]
+
+
+def _write_row_by_row(rows):
+    stream = io.StringIO()
+    writer = WriterWrapper(stream, dialect='excel')
+    for row in rows:
+        writer.writerow(row)
+    return stream.getvalue()
+
+
+def _write_batched(rows):
+    stream = io.StringIO()
+    writer = WriterWrapper(stream, dialect='excel')
+    writer.writerows(rows)
+    return stream.getvalue()
+
+
+def _measure(function, rows, repeat):
+    elapsed = min(timeit.repeat(
+        lambda: function(rows), number=1, repeat=repeat))
+    return len(rows) / elapsed
+
+
+def main():
+    """Main."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--columns', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    rows = generate_rows(args.rows, args.columns)
+    if _write_row_by_row(rows) != _write_batched(rows):
+        raise AssertionError('The outputs differ.')
+
+    row_by_row = _measure(_write_row_by_row, rows, args.repeat)
+    batched = _measure(_write_batched, rows, args.repeat)
+
+    print('rows: {0}, columns: {1}'.format(args.rows, args.columns))
+    print('row by row: {0:12.0f} rows/sec'.format(row_by_row))
+    print('batched:    {0:12.0f} rows/sec'.format(batched))
+    print('speed-up:   {0:12.2f}x'.format(batched / row_by_row))
+
+
+if __name__ == '__main__':
+    main()
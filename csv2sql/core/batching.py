@@ -0,0 +1,63 @@
+"""Batches of records."""
+
+
+def record_size(row):
+    """Return the approximate size of the serialized record `row`,
+    that is, the characters of the values and the delimiters.
+    """
+    return sum(len(value) for value in row) + len(row)
+
+
+class Batch:
+    """A batch of records, taken lazily from the iterator `rows`
+    following the first record `first` until the limits.
+    The batch can be iterated only once.
+    """
+
+    def __init__(self, first, rows, max_rows=None, max_bytes=None):
+        self._rows = rows
+        self._max_rows = max_rows
+        self._max_bytes = max_bytes
+        self._iterator = self._iterate(first)
+        self.num_rows = 0
+        self.num_bytes = 0
+        self.exhausted = False
+
+    def __iter__(self):
+        return self._iterator
+
+    def _iterate(self, row):
+        while True:
+            self.num_rows += 1
+            self.num_bytes += record_size(row)
+            yield row
+            if self._max_rows and self.num_rows >= self._max_rows:
+                return
+            if self._max_bytes and self.num_bytes >= self._max_bytes:
+                return
+            row = next(self._rows, None)
+            if row is None:
+                self.exhausted = True
+                return
+
+    def skip(self):
+        """Skip the rest of the batch."""
+        for _ in self._iterator:
+            pass
+
+
+def iterate_batches(rows, max_rows=None, max_bytes=None):
+    """Split the records of `rows` into batches
+    of at most `max_rows` records and about `max_bytes` bytes,
+    and yield them lazily.
+    A batch exceeds `max_bytes` only by its last record.
+    Each batch must be consumed before the next one,
+    otherwise the rest of it is skipped.
+    """
+    rows = iter(rows)
+    for first in rows:
+        batch = Batch(first, rows, max_rows, max_bytes)
+        yield batch
+        batch.skip()
+        if batch.exhausted:
+            return
@@ -0,0 +1,71 @@
+"""Checkpoints of append-only input files.
+
+A checkpoint is kept in a state file in JSON, which records
+the offset after the records already written, the digest of
+the last one of them, and the decided types of the columns.
+"""
+
+import os
+import json
+import hashlib
+
+from csv2sql.core.error import InputError
+
+_ENCODING = 'utf-8'
+_VERSION = 1
+
+
+def record_digest(raw_file, start, end):
+    """Return the digest of the bytes of `raw_file` from `start` to `end`."""
+    raw_file.seek(start)
+    return hashlib.sha256(raw_file.read(end - start)).hexdigest()
+
+
+def load_state(path):
+    """Return the checkpoint in the state file of `path`,
+    or None when the file does not exist.
+    """
+    try:
+        with open(path, encoding=_ENCODING) as state_file:
+            state = json.load(state_file)
+    except FileNotFoundError:
+        return None
+    except ValueError as error:
+        raise InputError(
+            'The state file {0} is broken: {1}'.format(path, error))
+    if state.get('version') != _VERSION:
+        raise InputError(
+            'The state file {0} has an unknown version: {1}'.format(
+                path, state.get('version')))
+    return state
+
+
+def save_state(path, state):
+    """Save the checkpoint `state` into the state file of `path`
+    replacing the old one at once.
+    """
+    temp_path = '{0}.tmp'.format(path)
+    with open(temp_path, 'w', encoding=_ENCODING) as state_file:
+        json.dump(dict(state, version=_VERSION), state_file,
+                  indent=2, sort_keys=True)
+        state_file.write('\n')
+    os.replace(temp_path, path)
+
+
+def verify_state(raw_file, state):
+    """Verify that the records of the checkpoint `state`
+    are not changed in `raw_file`, raising `InputError` otherwise.
+    """
+    size = raw_file.seek(0, os.SEEK_END)
+    if size < state['offset']:
+        raise InputError(
+            'The input is shorter than the checkpoint:'
+            ' {0} < {1} bytes.'.format(size, state['offset']))
+    last_start = state.get('last_record_start')
+    if last_start is None:
+        return
+    digest = record_digest(raw_file, last_start, state['offset'])
+    if digest != state['last_record_sha256']:
+        raise InputError(
+            'The last record of the checkpoint at {0} is changed.'
+            ' The input must be appended only.'.format(last_start))
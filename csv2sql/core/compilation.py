@@ -0,0 +1,301 @@
+"""Type pattern compilation.
+
+Predicate trees are compiled into one flat Python function per type pattern
+instead of a chain of nested closures.
+The compiled predicates return the same results as the interpreted ones.
+"""
+
+import re
+import decimal
+import operator
+
+from csv2sql.core.type_inference import always_true
+from csv2sql.core.type_inference import interpret_predicate
+
+
+_COMPARE_OPERATORS = {
+    'less-than': '<',
+    'less-than-or-equal-to': '<=',
+    'greater-than': '>',
+    'greater-than-or-equal-to': '>=',
+}
+
+_OPERATOR_FUNCTIONS = {
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+}
+
+_TRUE = ('true',)
+_FALSE = ('false',)
+
+
+def _args_of(obj):
+    args = obj.get('args', [])  # `args` is an optional value.
+    if isinstance(args, (str, bytes)) or not hasattr(args, '__iter__'):
+        args = [args]
+    return list(args)
+
+
+def _build(obj):
+    """Build an intermediate tree of a predicate object,
+    which must have been validated by `interpret_predicate`.
+    """
+    predicate_type = obj['type']
+    args = _args_of(obj)
+
+    if predicate_type == 'compatible':
+        return ('compatible', args[0])
+    if predicate_type in _COMPARE_OPERATORS:
+        return (
+            'compare',
+            _COMPARE_OPERATORS[predicate_type],
+            decimal.Decimal(args[0]))
+    if predicate_type == 'shorter-than':
+        return ('shorter-than', int(args[0]))
+    if predicate_type == 'match':
+        return ('match', args[0])
+    if predicate_type == 'all-of':
+        return ('all-of', [_build(arg) for arg in args])
+    if predicate_type == 'any-of':
+        return ('any-of', [_build(arg) for arg in args])
+    if predicate_type == 'not':
+        return ('not', _build(args[0]))
+    return _TRUE  # `any`.
+
+
+def _may_raise(node):
+    """Return if evaluating `node` can raise an error.
+    Only the comparisons can raise an error for non-numeric values.
+    """
+    if node[0] == 'compare':
+        return True
+    if node[0] in ('all-of', 'any-of'):
+        return any(_may_raise(child) for child in node[1])
+    if node[0] == 'not':
+        return _may_raise(node[1])
+    return False
+
+
+def _fuse_int_range(children):
+    """Fuse `compatible int` and the following comparisons into a range
+    check on the integer, which also saves the decimal conversions.
+    Once the value is compatible with int, no predicate can raise an error,
+    so the comparisons can be moved ahead.
+    """
+    fused = []
+    int_index = None
+    for child in children:
+        if child[0] == 'int-range':
+            if int_index is None:
+                int_index = len(fused)
+                fused.append(('int-range', list(child[1])))
+            else:
+                fused[int_index][1].extend(child[1])
+            continue
+        if int_index is not None and child[0] == 'compare':
+            fused[int_index][1].append(child[1:])
+            continue
+        fused.append(child)
+    return fused
+
+
+def _fold_junction(node_type, children):
+    """Fold an `all-of` or an `any-of` node.
+    `decisive` is the constant that decides the result by itself.
+    """
+    decisive, neutral = (
+        (_FALSE, _TRUE) if node_type == 'all-of' else (_TRUE, _FALSE))
+
+    flattened = []
+    for child in (_simplify(child) for child in children):
+        if child[0] == node_type:
+            flattened.extend(child[1])
+        else:
+            flattened.append(child)
+    if node_type == 'all-of':
+        flattened = _fuse_int_range(flattened)
+
+    folded = []
+    for child in flattened:
+        if child == neutral:
+            continue
+        if child == decisive:
+            if not any(_may_raise(item) for item in folded):
+                return decisive
+            folded.append(child)
+            break  # The rest will never be evaluated.
+        folded.append(child)
+
+    if not folded:
+        return neutral
+    if len(folded) == 1:
+        return folded[0]
+    return (node_type, folded)
+
+
+def _simplify(node):
+    if node[0] in ('all-of', 'any-of'):
+        return _fold_junction(node[0], node[1])
+    if node[0] == 'not':
+        child = _simplify(node[1])
+        if child == _TRUE:
+            return _FALSE
+        if child == _FALSE:
+            return _TRUE
+        if child[0] == 'not':
+            return child[1]
+        return ('not', child)
+    if node == ('compatible', 'int'):
+        return ('int-range', [])
+    return node
+
+
+def _int_bound(value):
+    """Return an int when the bound is integral to compare ints faster."""
+    if value.is_finite() and value == value.to_integral_value():
+        return int(value)
+    return value
+
+
+def _is_float(value):
+    try:
+        float(value)
+    except ValueError:
+        return False
+    return True
+
+
+def _create_int_range_checker(conditions):
+    bounds = [
+        (_OPERATOR_FUNCTIONS[operator_], _int_bound(value))
+        for operator_, value in conditions]
+
+    def check(value):
+        try:
+            number = int(value)
+        except ValueError:
+            return False
+        return all(function(number, bound) for function, bound in bounds)
+    return check
+
+
+class _CodeGenerator:
+    """Generates the source code of a compiled predicate."""
+
+    def __init__(self):
+        self.namespace = {
+            'Decimal': decimal.Decimal,
+            'is_float': _is_float,
+        }
+
+    def _constant(self, prefix, value):
+        name = '{0}{1}'.format(prefix, len(self.namespace))
+        self.namespace[name] = value
+        return name
+
+    def expression(self, node):
+        """Return an expression evaluating `node` on `value`."""
+        node_type = node[0]
+        if node == _TRUE:
+            return 'True'
+        if node == _FALSE:
+            return 'False'
+        if node_type == 'int-range':
+            checker = _create_int_range_checker(node[1])
+            return '{0}(value)'.format(self._constant('int_range', checker))
+        if node_type == 'compatible':
+            return 'is_float(value)'
+        if node_type == 'compare':
+            return 'Decimal(value) {0} {1}'.format(
+                node[1], self._constant('bound', node[2]))
+        if node_type == 'shorter-than':
+            return 'len(value) < {0!r}'.format(node[1])
+        if node_type == 'match':
+            search = re.compile(node[1]).search
+            return '{0}(value) is not None'.format(
+                self._constant('search', search))
+        if node_type == 'not':
+            return 'not ({0})'.format(self.expression(node[1]))
+        junction = ' and ' if node_type == 'all-of' else ' or '
+        return '({0})'.format(
+            junction.join(self.expression(child) for child in node[1]))
+
+    def statements(self, node):
+        """Return the statements that return False
+        when `node` is not satisfied.
+        """
+        if node[0] == 'all-of':
+            lines = []
+            for child in node[1]:
+                lines.extend(self.statements(child))
+            return lines
+
+        if node[0] == 'int-range':
+            bounds = [
+                (operator_, self._constant('bound', _int_bound(value)))
+                for operator_, value in node[1]]
+            lines = [
+                'try:',
+                '    number = int(value)',
+                'except ValueError:',
+                '    return False',
+            ]
+            if bounds:
+                lines.append('if not ({0}):'.format(' and '.join(
+                    'number {0} {1}'.format(operator_, name)
+                    for operator_, name in bounds)))
+                lines.append('    return False')
+            return lines
+
+        if node == ('compatible', 'float'):
+            return [
+                'try:',
+                '    float(value)',
+                'except ValueError:',
+                '    return False',
+            ]
+
+        return [
+            'if not ({0}):'.format(self.expression(node)),
+            '    return False',
+        ]
+
+
+def compile_predicate(obj, name='predicate'):
+    """Compile a predicate object into a function.
+    The result is the same as `interpret_predicate`.
+    """
+    interpret_predicate(obj)  # Validate. Can raise InterpretationError.
+
+    node = _simplify(_build(obj))
+    if node == _TRUE:
+        return always_true
+
+    generator = _CodeGenerator()
+    if node == _FALSE:
+        body = ['return False']
+    elif node[0] == 'any-of':
+        body = ['return {0}'.format(generator.expression(node))]
+    else:
+        body = generator.statements(node) + ['return True']
+
+    source = '\n'.join(
+        ['def predicate(value):'] + ['    ' + line for line in body])
+    code = compile(source, '<{0}>'.format(name), 'exec')
+    exec(code, generator.namespace)  # pylint: disable=exec-used
+    return generator.namespace['predicate']
+
+
+def _compile_one_type_pattern(obj):
+    typename = obj['typename']
+    predicate = compile_predicate(obj['predicate'], name=typename)
+    return typename, predicate
+
+
+def compile_patterns(obj):
+    """Compile the type-pattern object.
+    The result can be used in place of `interpret_patterns`.
+    """
+    return [_compile_one_type_pattern(item) for item in obj]
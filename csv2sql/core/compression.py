@@ -0,0 +1,256 @@
+"""Transparent compression of input and output files.
+
+Compression is detected by the magic bytes of input files
+and by the extensions of output files.
+Input files are decompressed in a background thread,
+which overlaps parsing the decompressed data.
+zstd needs the optional package `zstandard`.
+"""
+
+import io
+import os
+import re
+import bz2
+import gzip
+import lzma
+import queue
+import threading
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+_BUFFER_SIZE = 1024 * 1024
+_QUEUE_SIZE = 4
+# The magic bytes with the following header bytes,
+# not to take text beginning with the same characters for them.
+_MAGIC_BYTES = [
+    ('gzip', re.compile(rb'\x1f\x8b\x08')),
+    ('bz2', re.compile(rb'BZh[1-9](?:1AY&SY|\x17rE8P\x90)')),
+    ('xz', re.compile(rb'\xfd7zXZ\x00')),
+    ('zstd', re.compile(rb'\x28\xb5\x2f\xfd')),
+]
+_MAGIC_SIZE = 10
+_EXTENSIONS = {
+    '.gz': 'gzip',
+    '.bz2': 'bz2',
+    '.xz': 'xz',
+    '.lzma': 'xz',
+    '.zst': 'zstd',
+}
+
+
+def _require_zstandard():
+    if zstandard is None:
+        raise IOError('zstandard is required for zstd files.')
+
+
+def detect_compression(head):
+    """Return the compression of data starting with `head`
+    detected by the magic bytes, or None when not compressed.
+    """
+    for compression, magic in _MAGIC_BYTES:
+        if magic.match(head):
+            return compression
+    return None
+
+
+def compression_of_path(path):
+    """Return the compression of the file of `path`
+    detected by the extension, or None when not compressed.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    return _EXTENSIONS.get(extension)
+
+
+def _open_decompressor(raw_file, compression):
+    if compression == 'gzip':
+        return gzip.GzipFile(fileobj=raw_file, mode='rb')
+    if compression == 'bz2':
+        return bz2.BZ2File(raw_file, mode='rb')
+    if compression == 'xz':
+        return lzma.LZMAFile(raw_file, mode='rb')
+    _require_zstandard()
+    return zstandard.ZstdDecompressor().stream_reader(
+        raw_file, read_across_frames=True)
+
+
+def _open_compressor(raw_file, compression):
+    if compression == 'gzip':
+        return gzip.GzipFile(fileobj=raw_file, mode='wb')
+    if compression == 'bz2':
+        return bz2.BZ2File(raw_file, mode='wb')
+    if compression == 'xz':
+        return lzma.LZMAFile(raw_file, mode='wb')
+    _require_zstandard()
+    return zstandard.ZstdCompressor().stream_writer(raw_file)
+
+
+class _ThreadedReader(io.RawIOBase):
+    """A raw reader of a file object `source` read in a background thread,
+    which closes `source` and `underlying` when closed.
+    `consumed_position` is the position in `underlying` after the chunks
+    given to the reader, excluding the ones read ahead in the thread,
+    or None when unknown.
+    """
+
+    def __init__(self, source, underlying=None, chunk_size=_BUFFER_SIZE):
+        super().__init__()
+        self._source = source
+        self._underlying = underlying
+        self._chunk_size = chunk_size
+        self._chunks = queue.Queue(maxsize=_QUEUE_SIZE)
+        self._chunk = b''
+        self._position = 0
+        self._eof = False
+        self.consumed_position = self._underlying_position()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _underlying_position(self):
+        if self._underlying is None:
+            return None
+        try:
+            return self._underlying.tell()
+        except (OSError, ValueError):
+            return None
+
+    def _run(self):
+        try:
+            while not self._stopped.is_set():
+                chunk = self._source.read(self._chunk_size)
+                self._chunks.put((chunk, self._underlying_position()))
+                if not chunk:
+                    return
+        # pylint: disable=broad-except
+        # since the error is raised again in the reading thread.
+        except Exception as error:
+            self._chunks.put(error)
+
+    def readable(self):
+        return True
+
+    def fileno(self):
+        # The descriptor of the compressed file, as for `GzipFile`.
+        if self._underlying is None:
+            return super().fileno()
+        return self._underlying.fileno()
+
+    def readinto(self, buffer):
+        if self._position >= len(self._chunk):
+            if self._eof:
+                return 0
+            item = self._chunks.get()
+            if isinstance(item, Exception):
+                self._eof = True
+                raise item
+            chunk, self.consumed_position = item
+            if not chunk:
+                self._eof = True
+                return 0
+            self._chunk = chunk
+            self._position = 0
+
+        size = min(len(buffer), len(self._chunk) - self._position)
+        buffer[:size] = self._chunk[self._position:self._position + size]
+        self._position += size
+        return size
+
+    def close(self):
+        if not self.closed:
+            self._stopped.set()
+            # Unblock the thread waiting for the queue.
+            while self._thread.is_alive():
+                try:
+                    self._chunks.get(timeout=0.01)
+                except queue.Empty:
+                    pass
+            self._source.close()
+            if self._underlying is not None:
+                self._underlying.close()
+        super().close()
+
+
+def is_decompressed(text_file):
+    """Return if `text_file` is decompressed by `wrap_input`."""
+    buffer = getattr(text_file, 'buffer', None)
+    return isinstance(getattr(buffer, 'raw', None), _ThreadedReader)
+
+
+def consumed_position(text_file):
+    """Return the position in the compressed file under `text_file`,
+    which is decompressed by `wrap_input`, up to which the data are read
+    excluding the ones decompressed ahead in the background,
+    or None when unknown.
+    """
+    return text_file.buffer.raw.consumed_position
+
+
+def wrap_input(binary_file, encoding=None):
+    """Return the text file of the binary file `binary_file`
+    decompressed in a background thread when it is compressed,
+    or None when not compressed.
+    `binary_file` must be peekable, such as `io.BufferedReader`,
+    and is closed with the returned file.
+    """
+    compression = detect_compression(binary_file.peek(_MAGIC_SIZE))
+    if compression is None:
+        return None
+    decompressor = _open_decompressor(binary_file, compression)
+    reader = _ThreadedReader(decompressor, binary_file)
+    return io.TextIOWrapper(
+        io.BufferedReader(reader, _BUFFER_SIZE), encoding=encoding)
+
+
+def open_input(path, encoding=None):
+    """Open the file of `path` as a text file for reading,
+    which is decompressed transparently.
+    """
+    binary_file = open(path, 'rb', buffering=_BUFFER_SIZE)
+    try:
+        text_file = wrap_input(binary_file, encoding)
+    except Exception:
+        binary_file.close()
+        raise
+    if text_file is not None:
+        return text_file
+    binary_file.close()
+    return open(path, encoding=encoding)
+
+
+class _ClosingWriter(io.BufferedWriter):
+    """A buffered writer into a compressor,
+    which also closes the underlying file of the compressor.
+    """
+
+    def __init__(self, compressor, binary_file):
+        super().__init__(compressor, _BUFFER_SIZE)
+        self._binary_file = binary_file
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            self._binary_file.close()
+
+
+def open_output(path, encoding=None):
+    """Open the file of `path` as a text file for writing,
+    which is compressed by the extension of `path`.
+    """
+    compression = compression_of_path(path)
+    if compression is None:
+        return open(path, 'w', encoding=encoding)
+
+    binary_file = open(path, 'wb')
+    try:
+        compressor = _open_compressor(binary_file, compression)
+    except Exception:
+        binary_file.close()
+        raise
+    return io.TextIOWrapper(
+        _ClosingWriter(compressor, binary_file), encoding=encoding)
+
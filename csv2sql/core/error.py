@@ -9,3 +9,23 @@ class InterpretationError(RuntimeError):
 class TypeInferenceError(RuntimeError):
     """Errors on type-inference."""
     pass
+
+
+class SerializationError(RuntimeError):
+    """Errors on serialization of values."""
+    pass
+
+
+class LoadingError(RuntimeError):
+    """Errors on loading data into databases."""
+    pass
+
+
+class InputError(RuntimeError):
+    """Errors on input files."""
+    pass
+
+
+class RecordBoundaryError(InputError):
+    """Errors on record boundaries found by counting quote characters."""
+    pass
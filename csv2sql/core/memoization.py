@@ -0,0 +1,111 @@
+"""Memoization."""
+
+import sys
+import collections
+
+
+class ValueCache:
+    """A bounded set of values with LRU eviction.
+    Values are evicted from the least recently used one
+    when the number of values exceeds `max_items`
+    or their total size exceeds `max_bytes`.
+    """
+
+    def __init__(self, max_items, max_bytes=None):
+        """Initialize.
+        When `max_items` is 0, nothing is cached.
+        When `max_bytes` is None, the total size is not limited.
+        """
+        self._max_items = max_items
+        self._max_bytes = max_bytes
+        self._values = collections.OrderedDict()
+        self._num_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __contains__(self, value):
+        return value in self._values
+
+    def __len__(self):
+        return len(self._values)
+
+    @property
+    def num_bytes(self):
+        """Return the total size of the cached values."""
+        return self._num_bytes
+
+    def lookup(self, value):
+        """Return if `value` is cached, counting the hits and the misses."""
+        if value in self._values:
+            self._values.move_to_end(value)
+            self.hits += 1
+            return True
+        self.misses += 1
+        return False
+
+    def filter_unknown(self, values):
+        """Return the values that are not cached, keeping their order,
+        counting the hits and the misses.
+        """
+        cached = self._values
+        if not cached:
+            self.misses += len(values)
+            return values
+
+        unknown = [value for value in values if value not in cached]
+        num_hits = len(values) - len(unknown)
+        if num_hits:
+            for value in values:
+                if value in cached:
+                    cached.move_to_end(value)
+        self.hits += num_hits
+        self.misses += len(unknown)
+        return unknown
+
+    def add(self, value):
+        """Add a value."""
+        self.update([value])
+
+    def update(self, values):
+        """Add values."""
+        if not self._max_items:
+            return
+
+        cached = self._values
+        if self._max_bytes is None:
+            cached.update(collections.OrderedDict.fromkeys(values))
+        else:
+            for value in values:
+                if value in cached:
+                    continue
+                cached[value] = None
+                self._num_bytes += sys.getsizeof(value)
+        self._evict()
+
+    def disable(self):
+        """Stop caching, keeping the counters."""
+        self._max_items = 0
+        self.clear()
+
+    @property
+    def enabled(self):
+        """Return if values are cached or not."""
+        return bool(self._max_items)
+
+    def clear(self):
+        """Remove all the values, keeping the counters."""
+        self._values.clear()
+        self._num_bytes = 0
+
+    def _evict(self):
+        cached = self._values
+        if self._max_bytes is None:
+            for _ in range(len(cached) - self._max_items):
+                cached.popitem(last=False)
+            return
+
+        while len(cached) > self._max_items or (
+                self._max_bytes is not None and
+                self._num_bytes > self._max_bytes):
+            value, _ = cached.popitem(last=False)
+            self._num_bytes -= sys.getsizeof(value)
@@ -0,0 +1,143 @@
+"""Multiple CSV files read as one input."""
+
+import os
+import csv
+import glob
+
+from csv2sql.core.compression import open_input
+from csv2sql.core.error import InputError
+
+
+def expand_path(pattern):
+    """Return the sorted paths of the files matching the glob `pattern`,
+    or the path `pattern` itself when it is a file.
+    """
+    if os.path.isfile(pattern):
+        return [pattern]
+    return sorted(path for path in glob.glob(pattern) if os.path.isfile(path))
+
+
+def _terminated_lines(in_file):
+    # The last line of a file may lack the line terminator.
+    for line in in_file:
+        if not line.endswith('\n'):
+            line += '\n'
+        yield line
+
+
+def _recording(lines, recorded):
+    for line in lines:
+        recorded.append(line)
+        yield line
+
+
+def _read_header(lines, path, delimiter):
+    """Read the header of the file of `path` from `lines`,
+    consuming only the lines of the header.
+    """
+    header = next(csv.reader(lines, delimiter=delimiter), None)
+    if header is None:
+        raise InputError('{0} has no header.'.format(path))
+    return header
+
+
+def _check_header(header, expected, path, first_path):
+    if header != expected:
+        raise InputError(
+            'The header of {0} differs from the one of {1}: {2}'.format(
+                path, first_path, header))
+
+
+def check_headers(paths, delimiter=',', encoding=None):
+    """Return the header of the files of `paths`
+    after checking that all of them are the same.
+    """
+    expected = None
+    for path in paths:
+        with open_input(path, encoding) as in_file:
+            header = _read_header(_terminated_lines(in_file), path, delimiter)
+        if expected is None:
+            expected = header
+        _check_header(header, expected, path, paths[0])
+    return expected
+
+
+class ConcatenatedFile:
+    """A text file of the CSV files of `paths` read in order as one,
+    which has the header of the first file only.
+    The files are opened one by one while reading,
+    and raise `InputError` when their headers differ.
+    `on_file_read`, when set, is called with the path of each file
+    read to the end.
+    """
+
+    def __init__(self, paths, delimiter=',', encoding=None):
+        self._paths = list(paths)
+        self._delimiter = delimiter
+        self._encoding = encoding
+        self.on_file_read = None
+        self._lines = self._iterate()
+        self._buffer = ''
+        self._closed = False
+
+    def _iterate(self):
+        expected = None
+        for path in self._paths:
+            with open_input(path, self._encoding) as in_file:
+                lines = _terminated_lines(in_file)
+                header_lines = []
+                header = _read_header(
+                    _recording(lines, header_lines), path, self._delimiter)
+                if expected is None:
+                    expected = header
+                    yield from header_lines
+                _check_header(header, expected, path, self._paths[0])
+                yield from lines
+            if self.on_file_read is not None:
+                self.on_file_read(path)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if not self._buffer:
+            return next(self._lines)
+        end = self._buffer.find('\n') + 1
+        if end:
+            line, self._buffer = self._buffer[:end], self._buffer[end:]
+            return line
+        line, self._buffer = self._buffer, ''
+        return line + next(self._lines, '')
+
+    def read(self, size=-1):
+        """Read at most `size` characters, or to the end when negative."""
+        chunks = [self._buffer]
+        num_chars = len(self._buffer)
+        while size is None or size < 0 or num_chars < size:
+            line = next(self._lines, None)
+            if line is None:
+                break
+            chunks.append(line)
+            num_chars += len(line)
+        data = ''.join(chunks)
+        if size is None or size < 0:
+            self._buffer = ''
+            return data
+        data, self._buffer = data[:size], data[size:]
+        return data
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args, **kwarg):
+        self.close()
+
+    @property
+    def closed(self):
+        """Return if the file is closed."""
+        return self._closed
+
+    def close(self):
+        """Close the file being read."""
+        self._lines.close()
+        self._closed = True
@@ -0,0 +1,156 @@
+"""Parallel type inference over byte ranges of a file or over files."""
+
+import csv
+import itertools
+import concurrent.futures
+
+from csv2sql.core.compilation import compile_patterns
+from csv2sql.core.compression import open_input
+from csv2sql.core.error import TypeInferenceError
+from csv2sql.core.records import open_range
+from csv2sql.core.records import read_records
+from csv2sql.core.records import skip_records
+from csv2sql.core.records import split_ranges
+from csv2sql.core.type_inference import infer_transitions
+
+
+def _infer_range(task):
+    """Infer the type transitions of a byte range in a worker process."""
+    (path, encoding, (start, end), starts, pattern_obj, column_names,
+     options) = task
+
+    csv.field_size_limit(options['field_size_limit'])
+    patterns = compile_patterns(pattern_obj)
+    with open_range(path, start, end, encoding) as in_file:
+        reader = read_records(
+            in_file, options['delimiter'], num_fields=len(column_names))
+        if start == 0:
+            next(reader, None)  # Skip the header.
+        return infer_transitions(
+            patterns, reader, column_names, starts,
+            null_value=options['null_value'],
+            index_types=options['index_types'],
+            cache_size=options['cache_size'],
+            cache_memory=options['cache_memory'])
+
+
+def _infer_file(task):
+    """Infer the type transitions of a whole file in a worker process."""
+    path, starts, pattern_obj, column_names, options = task
+
+    csv.field_size_limit(options['field_size_limit'])
+    patterns = compile_patterns(pattern_obj)
+    with open_input(path, options['encoding']) as in_file:
+        reader = csv.reader(in_file, delimiter=options['delimiter'])
+        next(reader, None)  # Skip the header.
+        if options['num_records'] > 0:
+            reader = itertools.islice(reader, options['num_records'])
+        return infer_transitions(
+            patterns, reader, column_names, starts,
+            null_value=options['null_value'],
+            index_types=options['index_types'],
+            cache_size=options['cache_size'],
+            cache_memory=options['cache_memory'])
+
+
+def _compose(transitions_list, column_index):
+    """Follow the transitions of the ranges in order from the pattern 0."""
+    current = 0
+    for transitions in transitions_list:
+        current = transitions[column_index][current]
+        if not isinstance(current, int):
+            raise TypeInferenceError(current)
+    return current
+
+
+def _options(kwargs):
+    return {
+        'field_size_limit': csv.field_size_limit(),
+        'delimiter': kwargs.get('delimiter', ','),
+        'null_value': kwargs.get('null_value', ''),
+        'index_types': kwargs.get('index_types', []),
+        'cache_size': kwargs.get('cache_size', 1024),
+        'cache_memory': kwargs.get('cache_memory'),
+    }
+
+
+def _type_names(pattern_obj, transitions_list, column_names, index_types):
+    typename_maps = dict(
+        (int(index), typename) for (index, typename) in index_types)
+    type_names = []
+    for index in range(len(column_names)):
+        if index in typename_maps:
+            type_names.append(typename_maps[index])
+            continue
+        pattern_index = _compose(transitions_list, index)
+        type_names.append(pattern_obj[pattern_index]['typename'])
+    return type_names
+
+
+def decide_types_in_parallel(pattern_obj, path, column_names, jobs, **kwargs):
+    """Decide the types of the file of `path` in `jobs` processes
+    and return the list of types, which is the same as `decide_types`.
+    The file is split into byte ranges aligned to record boundaries
+    and each range is inferred from every possible pattern.
+    Raises `RecordBoundaryError` when the ranges are found
+    not to be aligned, so that the types are to be decided serially.
+    Patterns are given as the pattern object to be compiled in the workers.
+    Keyword arguments are `encoding`, `delimiter`, and the ones of
+    `decide_types`.
+    """
+    if not pattern_obj:
+        raise TypeInferenceError('Type pattern is empty.')
+
+    encoding = kwargs.get('encoding')
+    options = _options(kwargs)
+
+    with open(path, 'rb') as raw_file:
+        header_end = skip_records(raw_file, 0, 1)
+        ranges = split_ranges(raw_file, jobs, start=header_end)
+    if ranges:
+        # The header is read again to check its boundary.
+        ranges[0] = (0, ranges[0][1])
+
+    all_starts = list(range(len(pattern_obj)))
+    tasks = [
+        (path, encoding, byte_range, [0] if index == 0 else all_starts,
+         pattern_obj, column_names, options)
+        for index, byte_range in enumerate(ranges)
+    ]
+    with concurrent.futures.ProcessPoolExecutor(jobs) as executor:
+        transitions_list = list(executor.map(_infer_range, tasks))
+    return _type_names(
+        pattern_obj, transitions_list, column_names, options['index_types'])
+
+
+def decide_types_of_files(pattern_obj, paths, column_names, jobs, **kwargs):
+    """Decide the types of the files of `paths` read in order as one input
+    in `jobs` processes and return the list of types.
+    Each file, which may be compressed, is inferred from every possible
+    pattern and the transitions are followed in the order of the files,
+    so that the types are the same as reading the files one by one.
+    Given positive `num_records`, only the records of the number
+    from the head of each file are inferred.
+    Keyword arguments are `encoding`, `delimiter`, `num_records`,
+    and the ones of `decide_types`.
+    """
+    if not pattern_obj:
+        raise TypeInferenceError('Type pattern is empty.')
+
+    options = _options(kwargs)
+    options['encoding'] = kwargs.get('encoding')
+    options['num_records'] = kwargs.get('num_records', 0)
+
+    all_starts = list(range(len(pattern_obj)))
+    tasks = [
+        (path, [0] if index == 0 else all_starts,
+         pattern_obj, column_names, options)
+        for index, path in enumerate(paths)
+    ]
+    if jobs > 1:
+        with concurrent.futures.ProcessPoolExecutor(jobs) as executor:
+            transitions_list = list(executor.map(_infer_file, tasks))
+    else:
+        transitions_list = [_infer_file(task) for task in tasks]
+    return _type_names(
+        pattern_obj, transitions_list, column_names, options['index_types'])
@@ -1,57 +1,216 @@
 """File pre-fetching."""
 
-import itertools
+import io
+import bz2
+import lzma
+import zlib
 import tempfile
 
+from csv2sql.core.tracing import span
+
+_DEFAULT_BUFFER_SIZE = 10 * 1024 * 1024
+_DEFAULT_BLOCK_SIZE = 1024 * 1024
+_SPILL_ENCODING = 'utf-8'
+_SPILL_ERRORS = 'surrogatepass'
+
+SPILL_COMPRESSIONS = {
+    'zlib': (zlib.compress, zlib.decompress),
+    'bz2': (bz2.compress, bz2.decompress),
+    'lzma': (lzma.compress, lzma.decompress),
+}
+
+
+def _tell_if_seekable(file_obj):
+    """Return the position of `file_obj` when it is seekable, or None."""
+    try:
+        if not file_obj.seekable():
+            return None
+        return file_obj.tell()
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+class _Spool:
+    """Blocks of text, which are kept in memory up to `memory_limit`
+    characters and spilled into a temporary file beyond it.
+    """
+
+    def __init__(self, memory_limit, spill_dir=None, compression=None):
+        self._memory_limit = memory_limit
+        self._spill_dir = spill_dir
+        self._compress, self._decompress = SPILL_COMPRESSIONS.get(
+            compression, (None, None))
+        self._blocks = []  # Texts in memory or (offset, size) in the file.
+        self._memory_used = 0
+        self._spill_file = None
+        self._spill_size = 0
+        self.spooled_bytes = 0
+        self.spilled_bytes = 0
+
+    def __len__(self):
+        return len(self._blocks)
+
+    def append(self, text):
+        """Append a block."""
+        self.spooled_bytes += len(text)
+        if self._memory_used + len(text) <= self._memory_limit:
+            self._blocks.append(text)
+            self._memory_used += len(text)
+            return
+
+        with span('spill', 'spool', chars=len(text)):
+            data = text.encode(_SPILL_ENCODING, _SPILL_ERRORS)
+            if self._compress:
+                data = self._compress(data)
+            if self._spill_file is None:
+                self._spill_file = tempfile.TemporaryFile(
+                    dir=self._spill_dir)
+            self._spill_file.seek(self._spill_size)
+            self._spill_file.write(data)
+        self._blocks.append((self._spill_size, len(data)))
+        self._spill_size += len(data)
+        self.spilled_bytes += len(data)
+
+    def read(self, index):
+        """Return the text of the block of `index`."""
+        block = self._blocks[index]
+        if isinstance(block, str):
+            return block
+
+        offset, size = block
+        with span('read_spill', 'spool', bytes=size):
+            self._spill_file.seek(offset)
+            data = self._spill_file.read(size)
+            if self._decompress:
+                data = self._decompress(data)
+            return data.decode(_SPILL_ENCODING, _SPILL_ERRORS)
+
+    @property
+    def closed(self):
+        """Return if the spool is closed or not."""
+        return self._blocks is None
+
+    def close(self):
+        """Release the blocks and the temporary file."""
+        self._blocks = None
+        if self._spill_file is not None:
+            self._spill_file.close()
+
 
 class RewindableFileIterator:
     """A file iterator class that can be rewinded.
+    A seekable file is rewinded by seeking back to the initial position.
+    Otherwise, such as for pipes, the file is read by blocks
+    and they are spooled in memory and in a temporary file.
     An instances of this class can create a temporary file
     and should be closed by `close()` or using `with` statement.
     """
 
     def __init__(self, file_obj, **kwargs):
         """Initialize.
-        The buffer size can be specified by `buffer_size`,
+        The memory budget of the spool can be specified by `buffer_size`,
         which can result in performance improvement
         in exchange for memory usage.
+        Blocks beyond it are spilled into a temporary file in `spill_dir`,
+        compressed by `spill_compression` (one of `SPILL_COMPRESSIONS`).
+        The file is read by `block_size` characters.
         """
-        buffer_size = kwargs.get('buffer_size', 10 * 1024 * 1024)
-
         self._file = file_obj
-        self._buffer = tempfile.SpooledTemporaryFile(
-            max_size=buffer_size, mode='w+')
+        self._offset = _tell_if_seekable(file_obj)
+        self._closed = False
+        self._spool = None
+        if self._offset is None:
+            self._spool = _Spool(
+                kwargs.get('buffer_size', _DEFAULT_BUFFER_SIZE),
+                spill_dir=kwargs.get('spill_dir'),
+                compression=kwargs.get('spill_compression'))
+        self._block_size = kwargs.get('block_size', _DEFAULT_BLOCK_SIZE)
+        self._block_index = 0  # The next block to read from the spool.
+        self._lines = iter(())  # The rest lines of the current block.
+        self._carry = ''  # The incomplete line read from the file.
+        self._exhausted = False
 
     def __iter__(self):
         return self
 
     def __next__(self):
-        try:
-            return next(iter(self._buffer))
-        except StopIteration:
-            line = next(self._file)
-            self._buffer.write(line)
+        if self._spool is None:
+            # `tell()` of a text file is disabled by `next()`.
+            line = self._file.readline()
+            if not line:
+                raise StopIteration
             return line
 
+        while True:
+            try:
+                return next(self._lines)
+            except StopIteration:
+                pass
+            if self._block_index < len(self._spool):
+                text = self._spool.read(self._block_index)
+            else:
+                text = self._read_block()
+            self._block_index += 1
+            self._lines = iter(io.StringIO(text))
+
+    def _read_block(self):
+        """Read a block of complete lines from the file and spool it."""
+        while not self._exhausted:
+            with span('read_block', 'input'):
+                data = self._file.read(self._block_size)
+            if not data:
+                self._exhausted = True
+                text, self._carry = self._carry, ''
+            else:
+                data = self._carry + data
+                cut = data.rfind('\n') + 1
+                text, self._carry = data[:cut], data[cut:]
+            if text:
+                self._spool.append(text)
+                return text
+        raise StopIteration
+
     def __enter__(self):
         return self
 
     def __exit__(self, *args, **kwarg):
         self.close()
 
+    @property
+    def spooling(self):
+        """Return if the read lines are spooled or not."""
+        return self._spool is not None
+
+    @property
+    def spooled_bytes(self):
+        """Return the size of the spooled text."""
+        return self._spool.spooled_bytes if self._spool else 0
+
+    @property
+    def spilled_bytes(self):
+        """Return the size of the blocks spilled into a temporary file."""
+        return self._spool.spilled_bytes if self._spool else 0
+
     @property
     def closed(self):
         """Return if the temporary file is closed or not."""
-        return self._buffer.closed
+        if self._spool is None:
+            return self._closed
+        return self._spool.closed
 
     def close(self):
         """Close the temporary file."""
-        self._buffer.close()
+        self._closed = True
+        if self._spool is not None:
+            self._spool.close()
 
     def rewind(self):
         """Rewind the file to its head."""
-        self._buffer.flush()
-        self._buffer.seek(0)
+        if self._spool is None:
+            self._file.seek(self._offset)
+            return
+        self._block_index = 0
+        self._lines = iter(())
 
     def freeze(self):
         """Stop iteration and return the iterator of the rest
@@ -59,5 +218,16 @@ class RewindableFileIterator:
         in performance improvement in exchange of disabling file
         rewinding.
         """
-        buf = self._buffer
-        return itertools.chain(iter(buf), self._file)
+        if self._spool is None:
+            return iter(self._file)
+        return self._iterate_frozen()
+
+    def _iterate_frozen(self):
+        yield from self._lines
+        for index in range(self._block_index, len(self._spool)):
+            yield from io.StringIO(self._spool.read(index))
+        if self._exhausted:
+            return
+        if self._carry:
+            yield self._carry + next(self._file, '')
+        yield from self._file
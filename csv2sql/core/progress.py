@@ -0,0 +1,183 @@
+"""Progress reports of a run.
+
+A reporter thread writes the progress of the current phase
+at an interval: the records read, the records per second,
+and the position in the input file against its size when known.
+The position is the offset of the file descriptor of the input,
+so it is known for a regular file even given as the standard input.
+For a compressed file, it is the compressed offset up to which the data
+are read, excluding the ones decompressed ahead in the background.
+For multiple input files, it is the total size of the files read.
+The records are counted by chunks, not by each record.
+"""
+
+import os
+import sys
+import json
+import time
+import datetime
+import itertools
+import threading
+
+from csv2sql.core.compression import consumed_position
+from csv2sql.core.compression import is_decompressed
+from csv2sql.core.my_logging import get_logger
+
+_CHUNK_SIZE = 1024
+DEFAULT_INTERVAL = 5.0
+
+
+def _input_descriptor(in_file):
+    """Return the file descriptor of the regular file under `in_file`
+    and its size, or (None, None).
+    """
+    try:
+        descriptor = in_file.fileno()
+        stat = os.fstat(descriptor)
+        os.lseek(descriptor, 0, os.SEEK_CUR)
+    except (AttributeError, OSError, ValueError):
+        return None, None
+    if stat.st_size <= 0:
+        return None, None
+    return descriptor, stat.st_size
+
+
+class ProgressReporter:
+    """Reports the progress of reading `in_file` every `interval` seconds
+    into `out_stream` as JSON lines when `machine_readable`,
+    or into the log otherwise.
+    Given `paths` of the input files, the position is counted
+    by `add_file` instead of read from `in_file`.
+    """
+
+    def __init__(self, in_file, interval=DEFAULT_INTERVAL,
+                 machine_readable=False, out_stream=None, paths=None):
+        self._in_file = in_file
+        self._decompressed = is_decompressed(in_file)
+        if paths:
+            self._descriptor = None
+            self._total_bytes = sum(os.path.getsize(path) for path in paths)
+            self._files_bytes = 0
+        else:
+            self._descriptor, self._total_bytes = _input_descriptor(in_file)
+            self._files_bytes = None
+        self._interval = interval
+        self._machine_readable = machine_readable
+        self._out_stream = out_stream or sys.stderr
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._phase = None
+        self._phase_start = (time.perf_counter(), None)
+        self._rows = 0
+
+    def _position(self):
+        if self._files_bytes is not None:
+            return self._files_bytes
+        if self._descriptor is None:
+            return None
+        if self._decompressed:
+            return consumed_position(self._in_file)
+        try:
+            return os.lseek(self._descriptor, 0, os.SEEK_CUR)
+        except OSError:
+            return None
+
+    def set_phase(self, name):
+        """Start the phase `name`, from which the rates are measured."""
+        with self._lock:
+            self._phase = name
+            self._phase_start = (time.perf_counter(), self._position())
+            self._rows = 0
+
+    def add_rows(self, num_rows):
+        """Add the number of the records read."""
+        self._rows += num_rows
+
+    def add_file(self, path):
+        """Add the size of the input file of `path` read to the end
+        to the position, given `paths`.
+        """
+        self._files_bytes += os.path.getsize(path)
+
+    def count_rows(self, rows):
+        """Return the iterator over `rows` counting them by chunks."""
+        return itertools.chain.from_iterable(self._chunks(rows))
+
+    def _chunks(self, rows):
+        rows = iter(rows)
+        while True:
+            chunk = list(itertools.islice(rows, _CHUNK_SIZE))
+            if not chunk:
+                return
+            self._rows += len(chunk)
+            yield chunk
+
+    def snapshot(self):
+        """Return the progress of the current phase as a dict."""
+        with self._lock:
+            phase, (start_time, start_position) = (
+                self._phase, self._phase_start)
+            rows = self._rows
+        elapsed = time.perf_counter() - start_time
+        position = self._position()
+        eta = None
+        if position is not None and start_position is not None:
+            read_bytes = position - start_position
+            if read_bytes > 0 and elapsed > 0:
+                eta = max(0, self._total_bytes - position) * (
+                    elapsed / read_bytes)
+        return {
+            'phase': phase,
+            'rows': rows,
+            'rows_per_sec': rows / elapsed if elapsed > 0 else 0.0,
+            'bytes': position,
+            'total_bytes': self._total_bytes,
+            'eta_seconds': eta,
+        }
+
+    def report(self):
+        """Write the progress of the current phase."""
+        progress = self.snapshot()
+        if self._machine_readable:
+            self._out_stream.write(json.dumps(progress) + '\n')
+            self._out_stream.flush()
+            return
+        if progress['bytes'] is None:
+            get_logger().info(
+                'Progress of the %s phase: %d records (%.0f records/sec).',
+                progress['phase'], progress['rows'],
+                progress['rows_per_sec'])
+            return
+        get_logger().info(
+            'Progress of the %s phase: %d records (%.0f records/sec),'
+            ' %d of %d bytes (%.1f%%), ETA %s.',
+            progress['phase'], progress['rows'], progress['rows_per_sec'],
+            progress['bytes'], progress['total_bytes'],
+            100.0 * progress['bytes'] / progress['total_bytes'],
+            '-' if progress['eta_seconds'] is None else
+            datetime.timedelta(seconds=int(progress['eta_seconds'])))
+
+    def _run(self):
+        while not self._stopped.wait(self._interval):
+            self.report()
+
+    def start(self):
+        """Start reporting in a thread."""
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop reporting and write the last progress."""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.report()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *_):
+        self.stop()
@@ -0,0 +1,377 @@
+"""Record boundaries of CSV files.
+
+CSV records can contain quoted newlines, so a newline is a record boundary
+only when it is out of quotes, that is, an even number of quote characters
+precede it. Files are scanned counting only the quote characters,
+which is much faster than parsing them.
+To be scanned as bytes, the encoding must be ASCII-compatible,
+such as UTF-8.
+Quote characters in unquoted fields break the counting,
+which is detected by `read_records` reading the records.
+To find record boundaries without scanning from the start of a file,
+the parity is decided by a nearby quote character which is found
+to open or close a quoted field by its neighbors.
+"""
+
+import io
+import os
+import csv
+
+from csv2sql.core.error import RecordBoundaryError
+
+_QUOTE_CHAR = b'"'
+_NEWLINE = b'\n'
+_CARRIAGE_RETURN = b'\r'
+_BLOCK_SIZE = 1024 * 1024
+_WINDOW_SIZE = 16 * 1024
+
+
+def is_splittable(encoding):
+    """Return if files in `encoding` can be split in bytes."""
+    try:
+        return (
+            '\n'.encode(encoding) == _NEWLINE and
+            '"'.encode(encoding) == _QUOTE_CHAR)
+    except LookupError:
+        return False
+
+
+def find_boundaries(raw_file, start, targets, block_size=_BLOCK_SIZE):
+    """Return the first record boundary at or after each offset
+    in `targets` in ascending order, reading `raw_file` from `start`,
+    which must be a record boundary.
+    When no record boundary is found, the file size is returned.
+    """
+    targets = sorted(targets)
+    boundaries = []
+    while targets and targets[0] <= start:
+        targets.pop(0)
+        boundaries.append(start)
+
+    raw_file.seek(start)
+    position = start
+    num_quotes = 0
+    while targets:
+        block = raw_file.read(block_size)
+        if not block:
+            break
+        block_end = position + len(block)
+        while targets and targets[0] <= block_end:
+            # A target is a boundary when the byte before it ends a record.
+            boundary = _find_boundary_in_block(
+                block, targets[0] - 1 - position, num_quotes)
+            if boundary is None:
+                break
+            targets.pop(0)
+            boundaries.append(position + boundary)
+        num_quotes += block.count(_QUOTE_CHAR)
+        position = block_end
+        targets = [max(target, position + 1) for target in targets]
+
+    boundaries.extend([position] * len(targets))
+    return boundaries
+
+
+def _find_boundary_in_block(block, search_from, num_quotes_before):
+    newline_index = block.find(_NEWLINE, search_from)
+    while newline_index >= 0:
+        num_quotes = num_quotes_before + block.count(
+            _QUOTE_CHAR, 0, newline_index)
+        if num_quotes % 2 == 0:
+            return newline_index + 1
+        newline_index = block.find(_NEWLINE, newline_index + 1)
+    return None
+
+
+def find_boundaries_nearby(
+        raw_file, start, targets, delimiter=b',', window=_WINDOW_SIZE):
+    """Return the same boundaries as `find_boundaries`,
+    reading about `window` bytes before and after each offset
+    instead of the whole file from `start`.
+    The offsets where the parity is not decided in the window are found
+    by `find_boundaries`, while a window without quote characters
+    is taken as out of quotes, ignoring quoted fields longer than it.
+    `delimiter` is the encoded delimiter.
+    """
+    targets = sorted(targets)
+    size = raw_file.seek(0, os.SEEK_END)
+    if len(targets) * 2 * window >= size - start:
+        # Scanning the whole file reads less.
+        return find_boundaries(raw_file, start, targets)
+
+    boundaries = {}
+    ambiguous_targets = []
+    for target in targets:
+        boundary = _find_boundary_nearby(
+            raw_file, start, target, delimiter, window)
+        if boundary is None:
+            ambiguous_targets.append(target)
+        else:
+            boundaries[target] = boundary
+    boundaries.update(zip(
+        ambiguous_targets,
+        find_boundaries(raw_file, start, ambiguous_targets)))
+    return [boundaries[target] for target in targets]
+
+
+def _find_boundary_nearby(raw_file, start, target, delimiter, window):
+    if target <= start:
+        return start
+    window_start = max(start, target - window)
+    raw_file.seek(window_start)
+    data = raw_file.read(target - window_start + window)
+    if window_start == start:
+        num_quotes = 0
+    else:
+        num_quotes = _quote_parity(data, delimiter)
+        if num_quotes is None:
+            return None
+
+    boundary = _find_boundary_in_block(
+        data, target - 1 - window_start, num_quotes)
+    if boundary is not None:
+        return window_start + boundary
+    # The record continues over the window.
+    position = window_start + len(data)
+    num_quotes += data.count(_QUOTE_CHAR)
+    while True:
+        block = raw_file.read(window)
+        if not block:
+            return position
+        boundary = _find_boundary_in_block(block, 0, num_quotes)
+        if boundary is not None:
+            return position + boundary
+        num_quotes += block.count(_QUOTE_CHAR)
+        position += len(block)
+
+
+def _quote_parity(data, delimiter):
+    """Return the parity of the quote characters from the start
+    of the record to the start of `data`, or None when it is ambiguous.
+    A quote character followed by a value opens a quoted field
+    and one preceded by a value closes it, where escaped quotes
+    are taken as closing and opening again.
+    """
+    separators = (_QUOTE_CHAR, _NEWLINE, _CARRIAGE_RETURN, delimiter)
+    index = data.find(_QUOTE_CHAR)
+    if index < 0:
+        return 0
+    while index >= 0:
+        opening = (
+            index + 1 < len(data) and
+            not data.startswith(separators, index + 1))
+        closing = index > 0 and not data.endswith(separators, 0, index)
+        if opening and closing:
+            # A quote character in an unquoted field breaks the parity.
+            return None
+        if opening or closing:
+            return (opening + data.count(_QUOTE_CHAR, 0, index + 1)) % 2
+        index = data.find(_QUOTE_CHAR, index + 1)
+    return None
+
+
+def skip_records(raw_file, start, num_records):
+    """Return the offset after `num_records` records from `start`,
+    which must be a record boundary, or the file size at most.
+    """
+    raw_file.seek(start)
+    position = start
+    num_quotes = 0
+    while num_records > 0:
+        line = raw_file.readline()
+        if not line:
+            break
+        position += len(line)
+        num_quotes += line.count(_QUOTE_CHAR)
+        if num_quotes % 2 == 0:
+            num_records -= 1
+    return position
+
+
+def find_complete_records(raw_file, start):
+    """Scan the complete records from `start`, which must be
+    a record boundary, to the end of `raw_file`, and return
+    the end of the last one, the start of it, or None when no record
+    is complete, and the number of them.
+    A record is complete when its final newline is written,
+    so that a record being appended is excluded.
+    """
+    raw_file.seek(start)
+    position = start
+    record_start = start
+    last_start = None
+    num_records = 0
+    num_quotes = 0
+    for line in iter(raw_file.readline, b''):
+        position += len(line)
+        num_quotes += line.count(_QUOTE_CHAR)
+        if num_quotes % 2 == 0 and line.endswith(_NEWLINE):
+            last_start = record_start
+            record_start = position
+            num_records += 1
+            num_quotes = 0
+    return record_start, last_start, num_records
+
+
+def read_records(in_file, delimiter=',', num_fields=None):
+    """Yield the records of the text file `in_file` read by `csv.reader`,
+    which must start at a record boundary.
+    Raises `RecordBoundaryError` at a record containing an odd number of
+    quote characters, such as `1,5"in`, since the record boundaries
+    found by counting them are wrong from the record on,
+    or given `num_fields`, at a record of another number of fields.
+    """
+    num_quotes = 0
+
+    def lines():
+        nonlocal num_quotes
+        for line in in_file:
+            num_quotes += line.count('"')
+            yield line
+
+    for row in csv.reader(lines(), delimiter=delimiter):
+        if num_quotes % 2 != 0:
+            raise RecordBoundaryError(
+                'A record contains an odd number of quote characters:'
+                ' {0}'.format(row))
+        if num_fields is not None and len(row) != num_fields:
+            raise RecordBoundaryError(
+                'A record has {0} fields instead of {1}: {2}'.format(
+                    len(row), num_fields, row))
+        yield row
+
+
+def split_ranges(raw_file, num_ranges, start=0):
+    """Split `raw_file` from `start` into at most `num_ranges`
+    byte ranges aligned to record boundaries.
+    Returns a list of (start, end) tuples, skipping empty ranges.
+    """
+    size = raw_file.seek(0, os.SEEK_END)
+    length = size - start
+    targets = [start + length * index // num_ranges
+               for index in range(1, num_ranges)]
+    boundaries = find_boundaries(raw_file, start, targets)
+
+    edges = [start] + boundaries + [size]
+    return [
+        (range_start, range_end)
+        for range_start, range_end in zip(edges[:-1], edges[1:])
+        if range_start < range_end
+    ]
+
+
+class _RangeReader(io.RawIOBase):
+    """A raw reader of a byte range of a file."""
+
+    def __init__(self, path, start, end):
+        super().__init__()
+        self._file = open(path, 'rb')
+        self._file.seek(start)
+        self._remaining = end - start
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        size = min(len(buffer), self._remaining)
+        if size <= 0:
+            return 0
+        data = self._file.read(size)
+        buffer[:len(data)] = data
+        self._remaining -= len(data)
+        return len(data)
+
+    def close(self):
+        self._file.close()
+        super().close()
+
+
+def open_range(path, start, end, encoding=None):
+    """Open a byte range of the file as a text file,
+    reading in the same way as `open(path)`.
+    """
+    return io.TextIOWrapper(
+        io.BufferedReader(_RangeReader(path, start, end)),
+        encoding=encoding)
+
+
+def _find_last_text_boundary(text):
+    """Return the end of the last complete record in `text`,
+    which must start at a record boundary, or 0 when no record ends.
+    """
+    num_quotes = text.count('"')
+    newline_index = text.rfind('\n')
+    while newline_index >= 0:
+        num_quotes_after = text.count('"', newline_index)
+        if (num_quotes - num_quotes_after) % 2 == 0:
+            return newline_index + 1
+        newline_index = text.rfind('\n', 0, newline_index)
+    return 0
+
+
+def read_record_blocks(in_file, block_size=_BLOCK_SIZE):
+    """Read the text file `in_file` from a record boundary
+    and yield blocks of complete records.
+    Only the last block can lack the final newline.
+    """
+    carry = ''
+    while True:
+        data = in_file.read(block_size)
+        if not data:
+            break
+        data = carry + data
+        cut = _find_last_text_boundary(data)
+        if cut:
+            yield data[:cut]
+        carry = data[cut:]
+    if carry:
+        yield carry
+
+
+def split_first_record(text):
+    """Split `text`, which starts at a record boundary,
+    into the first record and the rest.
+    """
+    num_quotes = 0
+    position = 0
+    while True:
+        newline_index = text.find('\n', position)
+        if newline_index < 0:
+            return text, ''
+        num_quotes += text.count('"', position, newline_index)
+        position = newline_index + 1
+        if num_quotes % 2 == 0:
+            return text[:position], text[position:]
+
+
+def serialize_canonically(rows):
+    """Return the text of `rows` as `csv.writer` writes them
+    in the excel dialect with LF terminators.
+    """
+    buf = io.StringIO()
+    writer = csv.writer(buf, dialect='excel', lineterminator='\n')
+    writer.writerows(rows)
+    return buf.getvalue()
+
+
+def read_canonical(text):
+    """Return the records of the CSV records `text`
+    when they are in the canonical format as `is_canonical`,
+    or None otherwise.
+    """
+    if text and not text.endswith('\n'):
+        text += '\n'
+    try:
+        rows = list(csv.reader(io.StringIO(text), dialect='excel'))
+    except csv.Error:
+        return None
+    return rows if serialize_canonically(rows) == text else None
+
+
+def is_canonical(text):
+    """Return if the CSV records `text` are exactly the same as
+    `csv.writer` writes them in the excel dialect with LF terminators,
+    that is, if parsing and serializing them again changes nothing
+    but line terminators.
+    """
+    return read_canonical(text) is not None
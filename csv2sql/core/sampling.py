@@ -0,0 +1,107 @@
+"""Record sampling for type inference.
+
+Sampled records are returned in the order of the file,
+since type inference depends on the order.
+"""
+
+import locale
+import itertools
+
+from csv2sql.core.records import find_boundaries_nearby
+from csv2sql.core.records import open_range
+from csv2sql.core.records import read_records
+from csv2sql.core.records import skip_records
+
+
+def head_sample(reader, size):
+    """Return an iterator of the first `size` records,
+    which reads `reader` only as far as it is consumed.
+    """
+    return itertools.islice(reader, size)
+
+
+def reservoir_sample(reader, size, rand):
+    """Return `size` records sampled uniformly from the whole `reader`,
+    which is read only once, in the order of the file.
+    """
+    reservoir = []
+    for index, row in enumerate(reader):
+        if index < size:
+            reservoir.append((index, row))
+            continue
+        position = rand.randint(0, index)
+        if position < size:
+            reservoir[position] = (index, row)
+    return [row for _, row in sorted(reservoir, key=lambda item: item[0])]
+
+
+def _read_records(path, start, end, size, **kwargs):
+    encoding = kwargs.get('encoding')
+    delimiter = kwargs.get('delimiter', ',')
+    with open_range(path, start, end, encoding) as in_file:
+        reader = read_records(in_file, delimiter)
+        return list(itertools.islice(reader, size))
+
+
+def _encoded_delimiter(**kwargs):
+    encoding = kwargs.get('encoding') or locale.getpreferredencoding(False)
+    return kwargs.get('delimiter', ',').encode(encoding)
+
+
+def _data_range(path, raw_file, **kwargs):
+    header_end = skip_records(raw_file, 0, 1)
+    # The header is read to check its boundary.
+    _read_records(path, 0, header_end, None, **kwargs)
+    size = raw_file.seek(0, 2)
+    return header_end, size
+
+
+def uniform_sample(path, size, rand, **kwargs):
+    """Return about `size` records at uniformly sampled byte offsets
+    of the file of `path`, which are resynchronized to record boundaries
+    by reading only near them.
+    An offset stands for the record starting at or after it,
+    and offsets standing for the same record result in only one record.
+    Keyword arguments are `encoding` and `delimiter`.
+    Raises `RecordBoundaryError` when a record read is found
+    not to start at a record boundary.
+    """
+    with open(path, 'rb') as raw_file:
+        start, end = _data_range(path, raw_file, **kwargs)
+        if start >= end:
+            return []
+        offsets = [rand.randint(start, end - 1) for _ in range(size)]
+        boundaries = sorted(set(find_boundaries_nearby(
+            raw_file, start, offsets, _encoded_delimiter(**kwargs))))
+
+    return list(itertools.chain.from_iterable(
+        _read_records(path, boundary, end, 1, **kwargs)
+        for boundary in boundaries if boundary < end))
+
+
+def stratified_sample(path, size, **kwargs):
+    """Return about `size` records of the file of `path`
+    as the head, the middle and the tail blocks,
+    which never overlap each other.
+    Keyword arguments are `encoding` and `delimiter`.
+    Raises `RecordBoundaryError` when a record read is found
+    not to start at a record boundary.
+    """
+    block_size = -(-size // 3)  # Ceiling.
+    with open(path, 'rb') as raw_file:
+        start, end = _data_range(path, raw_file, **kwargs)
+        head_end = skip_records(raw_file, start, block_size)
+        block_bytes = head_end - start
+        middle_start, tail_start = find_boundaries_nearby(
+            raw_file, start, [
+                max(head_end, start + (end - start - block_bytes) // 2),
+                # With a margin, since the tail records can be longer.
+                max(head_end, end - 2 * block_bytes),
+            ], _encoded_delimiter(**kwargs))
+        middle_end = skip_records(raw_file, middle_start, block_size)
+        tail_start = max(tail_start, middle_end)
+
+    head = _read_records(path, start, head_end, None, **kwargs)
+    middle = _read_records(path, middle_start, middle_end, None, **kwargs)
+    tail = _read_records(path, tail_start, end, None, **kwargs)
+    return head + middle + tail[-block_size:]
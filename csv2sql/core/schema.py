@@ -0,0 +1,28 @@
+"""Schema statements shared by the query engines."""
+
+_LINE_TERMINATOR = '\n'
+
+
+def write_create_table_statement(
+        out_stream, table_name, column_types, quote, rebuild=False):
+    """Write the query creating the table `table_name` of `column_types`,
+    a list of (column name, type name), into `out_stream`,
+    with the column names quoted by `quote`.
+    When `rebuild` is true, it prepends the query
+    'DROP TABLE IF EXISTS `table_name`.
+    """
+    if rebuild:
+        out_stream.write('DROP TABLE IF EXISTS {0};'.format(table_name))
+        out_stream.write(_LINE_TERMINATOR)
+
+    out_stream.write('CREATE TABLE {0} ('.format(table_name))
+    out_stream.write(_LINE_TERMINATOR)
+    for index, column_type in enumerate(column_types):
+        if index != 0:
+            out_stream.write(',')
+            out_stream.write(_LINE_TERMINATOR)
+        column_name, type_name = column_type[0], column_type[1]
+        out_stream.write('  {0} {1}'.format(quote(column_name), type_name))
+    out_stream.write(_LINE_TERMINATOR)
+    out_stream.write(');')
+    out_stream.write(_LINE_TERMINATOR)
@@ -0,0 +1,202 @@
+"""Sharded output into a directory.
+
+The directory has a schema file to be run first, shard files
+to be run in parallel, and a manifest of them in JSON.
+Shards can also be written apart as parts, such as in other processes,
+and adopted into the output in order.
+"""
+
+import io
+import os
+import json
+import hashlib
+
+_ENCODING = 'utf-8'
+_SCHEMA_FILE_NAME = 'schema.sql'
+_SHARD_FILE_NAME_FORMAT = 'data-{0:05d}.sql'
+_MANIFEST_FILE_NAME = 'manifest.json'
+_PART_FILE_NAME_FORMAT = '.{0}-{{0:05d}}.part'
+
+
+class _HashingWriter(io.RawIOBase):
+    """A raw writer computing the SHA-256 digest of the written bytes."""
+
+    def __init__(self, path):
+        super().__init__()
+        self._file = open(path, 'wb')
+        self._hash = hashlib.sha256()
+        self.num_bytes = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._file.write(data)
+        self._hash.update(data)
+        self.num_bytes += len(data)
+        return len(data)
+
+    def hexdigest(self):
+        """Return the digest of the written bytes."""
+        return self._hash.hexdigest()
+
+    def close(self):
+        self._file.close()
+        super().close()
+
+
+class _OutputFile:
+    """A text file in the output directory with its digest."""
+
+    def __init__(self, out_dir, file_name):
+        self.file_name = file_name
+        self._writer = _HashingWriter(os.path.join(out_dir, file_name))
+        self.stream = io.TextIOWrapper(
+            io.BufferedWriter(self._writer), encoding=_ENCODING)
+        self.num_rows = 0
+
+    def close(self):
+        """Close the file."""
+        self.stream.close()
+
+    def describe(self):
+        """Return the description of the closed file."""
+        return {
+            'file': self.file_name,
+            'bytes': self._writer.num_bytes,
+            'sha256': self._writer.hexdigest(),
+        }
+
+
+class _AdoptedFile:
+    """A closed file written apart and adopted into the output directory."""
+
+    def __init__(self, description):
+        self._description = dict(description)
+        self.num_rows = self._description.pop('rows')
+
+    def close(self):
+        """Do nothing, since the file is already closed."""
+
+    def describe(self):
+        """Return the description of the file."""
+        return dict(self._description)
+
+
+class _Shards:
+    """Shard files in `out_dir` named by `file_name_format`."""
+
+    def __init__(self, out_dir, file_name_format):
+        self._out_dir = out_dir
+        self._file_name_format = file_name_format
+        self._shards = []
+        os.makedirs(out_dir, exist_ok=True)
+
+    def shard(self, index):
+        """Return the stream of the shard of `index`,
+        opening the shards up to it.
+        """
+        while len(self._shards) <= index:
+            self._shards.append(_OutputFile(
+                self._out_dir,
+                self._file_name_format.format(len(self._shards))))
+        return self._shards[index].stream
+
+    def add_rows(self, index, num_rows):
+        """Count `num_rows` rows written into the shard of `index`."""
+        self._shards[index].num_rows += num_rows
+
+    @property
+    def num_shards(self):
+        """Num opened shards."""
+        return len(self._shards)
+
+    def _describe_shards(self):
+        descriptions = []
+        for shard in self._shards:
+            description = shard.describe()
+            description['rows'] = shard.num_rows
+            descriptions.append(description)
+        return descriptions
+
+
+class PartialOutput(_Shards):
+    """Output of shard files into `out_dir` apart from `ShardedOutput`,
+    named after `name` not to conflict with the other parts.
+    The files are removed when closed with errors.
+    """
+
+    def __init__(self, out_dir, name):
+        super().__init__(out_dir, _PART_FILE_NAME_FORMAT.format(name))
+        self.descriptions = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        if exc_type is not None:
+            for description in self.descriptions:
+                os.remove(os.path.join(self._out_dir, description['file']))
+
+    def close(self):
+        """Close the files and keep their descriptions
+        to be passed to `ShardedOutput.adopt`.
+        """
+        for shard in self._shards:
+            shard.close()
+        self.descriptions = self._describe_shards()
+
+
+class ShardedOutput(_Shards):
+    """Output of a schema file and shard files into `out_dir`,
+    which writes the manifest when closed without errors.
+    """
+
+    def __init__(self, out_dir, table_name):
+        super().__init__(out_dir, _SHARD_FILE_NAME_FORMAT)
+        self._table_name = table_name
+        self._schema = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close(write_manifest=exc_type is None)
+
+    @property
+    def schema(self):
+        """The stream of the schema file, opened on the first access."""
+        if self._schema is None:
+            self._schema = _OutputFile(self._out_dir, _SCHEMA_FILE_NAME)
+        return self._schema.stream
+
+    def adopt(self, descriptions):
+        """Add the closed parts of `descriptions` of a `PartialOutput`
+        as the next shards, renaming their files.
+        """
+        for description in descriptions:
+            file_name = self._file_name_format.format(len(self._shards))
+            os.replace(
+                os.path.join(self._out_dir, description['file']),
+                os.path.join(self._out_dir, file_name))
+            self._shards.append(
+                _AdoptedFile(dict(description, file=file_name)))
+
+    def close(self, write_manifest=True):
+        """Close the files and write the manifest."""
+        files = self._shards + ([self._schema] if self._schema else [])
+        for output_file in files:
+            output_file.close()
+        if not write_manifest:
+            return
+
+        manifest = {
+            'table': self._table_name,
+            'schema': self._schema.describe() if self._schema else None,
+            'shards': self._describe_shards(),
+        }
+        path = os.path.join(self._out_dir, _MANIFEST_FILE_NAME)
+        with open(path, 'w', encoding=_ENCODING) as manifest_file:
+            json.dump(manifest, manifest_file, indent=2, sort_keys=True)
+            manifest_file.write('\n')
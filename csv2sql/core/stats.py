@@ -0,0 +1,184 @@
+"""Statistics of the phases of a run.
+
+Each phase records the wall time, the CPU time, the records read,
+the characters read and written, and the peak memory of the process.
+The input, the output and the records are counted by wrappers,
+which are used only when the statistics are enabled.
+"""
+
+import json
+import time
+import contextlib
+import collections
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from csv2sql.core.my_logging import get_logger
+
+
+def _cpu_seconds():
+    """Return the CPU time of the process and its waited-for children."""
+    if resource is None:
+        return time.process_time()
+    return sum(
+        usage.ru_utime + usage.ru_stime for usage in (
+            resource.getrusage(resource.RUSAGE_SELF),
+            resource.getrusage(resource.RUSAGE_CHILDREN)))
+
+
+def _max_rss_kb():
+    """Return the peak RSS of the process in KiB, or None if unknown."""
+    if resource is None:
+        return None
+    # ru_maxrss is in KiB on Linux.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+class _CountingInput:
+    """An input file counting the characters read from it."""
+
+    def __init__(self, in_file, stats):
+        self._in_file = in_file
+        self._lines = None
+        self._stats = stats
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._lines is None:
+            self._lines = iter(self._in_file)
+        line = next(self._lines)
+        self._stats.bytes_in += len(line)
+        return line
+
+    def read(self, size=-1):
+        """Read and count at most `size` characters."""
+        data = self._in_file.read(size)
+        self._stats.bytes_in += len(data)
+        return data
+
+
+class _CountingOutput:
+    """An output file counting the characters written into it."""
+
+    def __init__(self, out_file, stats):
+        self._out_file = out_file
+        self._stats = stats
+
+    def write(self, text):
+        """Write and count `text`."""
+        self._stats.bytes_out += len(text)
+        return self._out_file.write(text)
+
+    def __getattr__(self, name):
+        return getattr(self._out_file, name)
+
+
+class Stats:
+    """Statistics of the phases of a run and of type inference.
+    The bytes are counted in the characters of the text.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self._phases = []
+        self._inference = None
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """Record the statistics of the phase `name` in the context."""
+        counts = (self.rows, self.bytes_in, self.bytes_out)
+        start_cpu = _cpu_seconds()
+        start_time = time.perf_counter()
+        yield
+        elapsed = time.perf_counter() - start_time
+        self._phases.append(collections.OrderedDict([
+            ('phase', name),
+            ('seconds', elapsed),
+            ('cpu_seconds', _cpu_seconds() - start_cpu),
+            ('rows', self.rows - counts[0]),
+            ('bytes_in', self.bytes_in - counts[1]),
+            ('bytes_out', self.bytes_out - counts[2]),
+            ('max_rss_kb', _max_rss_kb()),
+        ]))
+
+    def count_input(self, in_file):
+        """Return `in_file` counting the characters read."""
+        return _CountingInput(in_file, self)
+
+    def count_output(self, out_file):
+        """Return `out_file` counting the characters written."""
+        return _CountingOutput(out_file, self)
+
+    def count_rows(self, rows):
+        """Iterate over `rows` counting them."""
+        for row in rows:
+            self.rows += 1
+            yield row
+
+    def record_inference(self, type_names, num_rows, columns):
+        """Record the type inference over `num_rows` records
+        with the patterns of `type_names`.
+        `columns` is a list of the column name, the index of the decided
+        pattern, and the numbers of the predicate evaluations
+        of the patterns reached from the first one.
+        """
+        self._inference = collections.OrderedDict([
+            ('rows', num_rows),
+            ('predicate_evaluations', sum(
+                sum(evaluations) for _, _, evaluations in columns)),
+            ('patterns', [
+                collections.OrderedDict([
+                    ('typename', type_name),
+                    ('columns_reached', sum(
+                        1 for _, end, _ in columns if end >= index)),
+                ])
+                for index, type_name in enumerate(type_names)]),
+            ('columns', [
+                collections.OrderedDict([
+                    ('name', name),
+                    ('typename', type_names[end]),
+                    ('evaluations', list(evaluations[:end + 1])),
+                ])
+                for name, end, evaluations in columns]),
+        ])
+
+    def report(self):
+        """Return the statistics as a dict serializable in JSON."""
+        return collections.OrderedDict([
+            ('phases', self._phases),
+            ('inference', self._inference),
+        ])
+
+    def dump(self, out_stream):
+        """Write the statistics into `out_stream` in JSON."""
+        json.dump(self.report(), out_stream, indent=2)
+        out_stream.write('\n')
+
+    def log(self):
+        """Log the summary of the statistics."""
+        for phase in self._phases:
+            get_logger().info(
+                'The %s phase took %.3f seconds and %.3f CPU seconds'
+                ' for %d records, reading %d bytes and writing %d bytes'
+                ' (max RSS %s KiB).',
+                phase['phase'], phase['seconds'], phase['cpu_seconds'],
+                phase['rows'], phase['bytes_in'], phase['bytes_out'],
+                phase['max_rss_kb'])
+        if self._inference is None:
+            return
+        get_logger().info(
+            'Type inference read %d records'
+            ' and evaluated predicates %d times.',
+            self._inference['rows'],
+            self._inference['predicate_evaluations'])
+        for pattern in self._inference['patterns']:
+            get_logger().info(
+                'The type pattern %s is reached by %d columns.',
+                pattern['typename'], pattern['columns_reached'])
@@ -0,0 +1,118 @@
+"""Tracing in the trace event format of Chrome.
+
+Spans of the work on chunks are written as complete events
+into a JSON file, which can be opened in a trace viewer
+such as Perfetto or chrome://tracing.
+Until tracing is started, `span` returns a shared context doing nothing.
+"""
+
+import os
+import json
+import time
+import threading
+
+_TRACER = None
+
+
+class _NullSpan:
+    """A span doing nothing, which is shared while not tracing."""
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *_):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    """A span recorded as a complete event when exited."""
+
+    __slots__ = ('_tracer', '_name', '_category', '_args', '_start')
+
+    def __init__(self, tracer, name, category, args):
+        self._tracer = tracer
+        self._name = name
+        self._category = category
+        self._args = args
+        self._start = None
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *_):
+        self._tracer.add(
+            self._name, self._category, self._start, time.perf_counter(),
+            self._args)
+
+
+class Tracer:
+    """Writes trace events into `out_stream` as a JSON array,
+    which is closed by `close()`.
+    Viewers also accept the array without the end,
+    so the events are kept even if the process dies.
+    """
+
+    def __init__(self, out_stream):
+        self.pid = os.getpid()
+        self._out_stream = out_stream
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+        self._out_stream.write('[')
+        self._write({
+            'name': 'process_name', 'ph': 'M', 'pid': self.pid,
+            'args': {'name': 'csv2sql'}}, first=True)
+
+    def _write(self, event, first=False):
+        self._out_stream.write('\n' if first else ',\n')
+        self._out_stream.write(json.dumps(event, separators=(',', ':')))
+
+    def add(self, name, category, start, end, args=None):
+        """Add a complete event from `start` to `end`,
+        which are given by `time.perf_counter`.
+        """
+        event = {
+            'name': name,
+            'cat': category,
+            'ph': 'X',
+            'ts': (start - self._origin) * 1e6,
+            'dur': (end - start) * 1e6,
+            'pid': self.pid,
+            'tid': threading.get_ident(),
+        }
+        if args:
+            event['args'] = args
+        with self._lock:
+            self._write(event)
+
+    def close(self):
+        """End the array of the events."""
+        self._out_stream.write('\n]\n')
+        self._out_stream.flush()
+
+
+def start_tracing(out_stream):
+    """Start writing the trace events into `out_stream`."""
+    global _TRACER  # pylint: disable=global-statement
+    _TRACER = Tracer(out_stream)
+
+
+def stop_tracing():
+    """Stop tracing and end the events."""
+    global _TRACER  # pylint: disable=global-statement
+    if _TRACER is not None:
+        _TRACER.close()
+        _TRACER = None
+
+
+def span(name, category, **args):
+    """Return the context recording the span `name` of `category`
+    with `args`. Spans in child processes are not recorded.
+    """
+    tracer = _TRACER
+    if tracer is None or tracer.pid != os.getpid():
+        return _NULL_SPAN
+    return _Span(tracer, name, category, args)
@@ -0,0 +1,140 @@
+"""Persistent cache of decided types.
+
+The types are stored in a directory as a JSON file per key,
+which is a digest of the fingerprints of the input files
+and the settings of type inference.
+"""
+
+import os
+import json
+import time
+import hashlib
+
+_ENCODING = 'utf-8'
+_ENTRY_SUFFIX = '.json'
+_SAMPLE_SIZE = 64 * 1024
+DEFAULT_MAX_AGE = 30 * 24 * 60 * 60  # 30 days.
+DEFAULT_MAX_BYTES = 16 * 1024 * 1024
+
+
+def default_cache_dir():
+    """Return the default cache directory,
+    which is `csv2sql` in `$XDG_CACHE_HOME` or `~/.cache`.
+    """
+    base_dir = os.environ.get('XDG_CACHE_HOME') or os.path.join(
+        os.path.expanduser('~'), '.cache')
+    return os.path.join(base_dir, 'csv2sql')
+
+
+def file_fingerprint(path):
+    """Return the fingerprint of the file of `path`,
+    that is, the size, the modification time and the digest of
+    the head, the middle and the tail blocks.
+    """
+    stat = os.stat(path)
+    digest = hashlib.sha256()
+    with open(path, 'rb') as raw_file:
+        for offset in sorted(set((
+                0,
+                max(0, stat.st_size // 2 - _SAMPLE_SIZE // 2),
+                max(0, stat.st_size - _SAMPLE_SIZE)))):
+            raw_file.seek(offset)
+            digest.update(raw_file.read(_SAMPLE_SIZE))
+    return {
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'sha256': digest.hexdigest(),
+    }
+
+
+def make_key(paths, **settings):
+    """Return the cache key of the files of `paths`
+    and the settings of type inference given as keyword arguments,
+    which must be serializable in JSON.
+    """
+    obj = {
+        'files': [file_fingerprint(path) for path in paths],
+        'settings': settings,
+    }
+    serialized = json.dumps(obj, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(serialized.encode(_ENCODING)).hexdigest()
+
+
+class TypeCache:
+    """Cache of the decided types in `cache_dir`.
+    Entries not used for `max_age` seconds are expired,
+    and the least recently used entries are evicted
+    while the entries exceed `max_bytes` bytes in total.
+    Errors on the cache are not raised but taken as misses.
+    """
+
+    def __init__(self, cache_dir, max_age=DEFAULT_MAX_AGE,
+                 max_bytes=DEFAULT_MAX_BYTES):
+        self._cache_dir = cache_dir
+        self._max_age = max_age
+        self._max_bytes = max_bytes
+
+    def _path(self, key):
+        return os.path.join(self._cache_dir, key + _ENTRY_SUFFIX)
+
+    def lookup(self, key):
+        """Return the entry of `key`, which is a dict
+        with `type_names` and `pattern_indexes`, or None when missed.
+        """
+        path = self._path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self._max_age:
+                return None
+            with open(path, encoding=_ENCODING) as entry_file:
+                entry = json.load(entry_file)
+            os.utime(path)  # Mark as recently used.
+        except (OSError, ValueError):
+            return None
+        return entry
+
+    def store(self, key, type_names, pattern_indexes):
+        """Store the types of `key` and evict the old entries.
+        Returns if the entry is stored.
+        """
+        entry = {
+            'type_names': list(type_names),
+            'pattern_indexes': list(pattern_indexes),
+        }
+        path = self._path(key)
+        temp_path = '{0}.{1}.tmp'.format(path, os.getpid())
+        try:
+            os.makedirs(self._cache_dir, exist_ok=True)
+            with open(temp_path, 'w', encoding=_ENCODING) as entry_file:
+                json.dump(entry, entry_file)
+            os.replace(temp_path, path)
+            self.evict()
+        except OSError:
+            return False
+        return True
+
+    def evict(self):
+        """Remove the expired entries and the least recently used ones
+        beyond the size limit.
+        """
+        entries = []
+        for file_name in os.listdir(self._cache_dir):
+            if not file_name.endswith(_ENTRY_SUFFIX):
+                continue
+            path = os.path.join(self._cache_dir, file_name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        now = time.time()
+        kept_bytes = 0
+        for mtime, size, path in sorted(entries, reverse=True):
+            if (now - mtime <= self._max_age and
+                    kept_bytes + size <= self._max_bytes):
+                kept_bytes += size
+            else:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
@@ -5,8 +5,12 @@ import decimal
 import operator
 import itertools
 import functools
+import collections
 
 from csv2sql.core.error import InterpretationError, TypeInferenceError
+from csv2sql.core.memoization import ValueCache
+from csv2sql.core.my_logging import get_logger
+from csv2sql.core.tracing import span
 
 
 def _compatible(cast_type, value):
@@ -22,6 +26,11 @@ _COMPATIBLE_PREDICATES = {
     'float': functools.partial(_compatible, float),
 }
 _DEFAULT_NULL_VALUE = ''
+_DEFAULT_CHUNK_SIZE = 1024
+_DEFAULT_CACHE_SIZE = 1024
+_CACHE_WARMING_LOOKUPS = 4096
+_CACHE_MIN_HIT_RATIO_INVERSE = 4
+_NOTHING = object()
 
 
 def _create_compatible_predicate(args):
@@ -99,14 +108,17 @@ def _create_not_predicate(args):
     return lambda value: not positive_predicate(value)
 
 
-def _always_true(_):
+def always_true(_):
+    """A predicate that is satisfied by any value.
+    Type inference never goes beyond a pattern with this predicate.
+    """
     return True
 
 
 def _create_any_predicate(args):
     if args:
         raise InterpretationError('Match predicate takes no argument.')
-    return _always_true
+    return always_true
 
 
 _PREDICATE_GENERATORS = {
@@ -161,16 +173,36 @@ def interpret_patterns(obj):
 class TypeInferrer:
     """Infers the type while reading items."""
 
-    def __init__(self, patterns, null_value=_DEFAULT_NULL_VALUE):
-        """Initialize."""
-        self._iterator = iter(patterns)
+    def __init__(self, patterns, null_value=_DEFAULT_NULL_VALUE, **kwargs):
+        """Initialize.
+        Values accepted by the current pattern are cached
+        up to `cache_size` values and `cache_memory` bytes,
+        and the predicates are not evaluated for them again.
+        Given `start`, the inference starts from the pattern of the index.
+        """
+        self._patterns = list(patterns)
+        self._index = kwargs.get('start', 0)
+        self._evaluations = [0] * len(self._patterns)
         self._null_value = null_value
+        self._cache = ValueCache(
+            kwargs.get('cache_size', _DEFAULT_CACHE_SIZE),
+            kwargs.get('cache_memory'))
 
-        try:
-            self._current = next(self._iterator)
-        except StopIteration:
+        if not self._patterns:
             raise TypeInferenceError('Type pattern is empty.')
 
+    def _advance(self, item):
+        """Consume type patterns while their predicates are not satisfied."""
+        while True:
+            self._evaluations[self._index] += 1
+            if self._patterns[self._index][1](item):
+                return
+            if self._index + 1 >= len(self._patterns):
+                raise TypeInferenceError(
+                    'Matching pattern is not found for: {0}'.format(item))
+            self._index += 1
+            self._cache.clear()
+
     def read_item(self, item):
         """Read `item` and consume type patterns
         while their predicates are not satisfied.
@@ -178,31 +210,92 @@ class TypeInferrer:
         """
         if item == self._null_value:
             return
+        if self._cache.lookup(item):
+            return
+        self._advance(item)
+        self._cache.add(item)
+
+    def read_items(self, items):
+        """Read a list of items at once.
+        The whole list is checked against the current pattern in one call,
+        and only the rest of the list is checked again
+        when the pattern is consumed.
+        The result is the same as reading the items one by one.
+        """
+        items = list(filter(self._null_value.__ne__, items))
+        while items:
+            unknown_items = self._cache.filter_unknown(
+                list(collections.OrderedDict.fromkeys(items)))
+            predicate = self._patterns[self._index][1]
+            failed = next(
+                itertools.filterfalse(predicate, unknown_items), _NOTHING)
+            if failed is _NOTHING:
+                self._evaluations[self._index] += len(unknown_items)
+                self._cache.update(unknown_items)
+                break
+            self._evaluations[self._index] += (
+                unknown_items.index(failed) + 1)
+            failed_index = items.index(failed)
+            self._advance(failed)
+            self._cache.add(failed)
+            items = items[failed_index + 1:]
+        self._disable_ineffective_cache()
+
+    def _disable_ineffective_cache(self):
+        """Stop caching for high cardinality values,
+        where the cache costs more than it saves.
+        """
+        cache = self._cache
+        if (cache.enabled and
+                cache.misses > _CACHE_WARMING_LOOKUPS and
+                cache.hits * _CACHE_MIN_HIT_RATIO_INVERSE < cache.misses):
+            cache.disable()
 
-        try:
-            while not self._current[1](item):
-                self._current = next(self._iterator)
-        except StopIteration:
-            raise TypeInferenceError(
-                'Matching pattern is not found for: {0}'.format(item))
+    @property
+    def index(self):
+        """Return the index of the current type pattern."""
+        return self._index
+
+    @property
+    def settled(self):
+        """Return if the type can no longer change,
+        that is, the current pattern accepts any value.
+        """
+        return self._patterns[self._index][1] is always_true
 
     @property
     def type_name(self):
         """Return the current type pattern."""
-        return self._current[0]
+        return self._patterns[self._index][0]
+
+    @property
+    def evaluations(self):
+        """Return the numbers of the predicate evaluations
+        of the type patterns.
+        """
+        return list(self._evaluations)
+
+    @property
+    def cache_hits(self):
+        """Return the number of values found in the cache."""
+        return self._cache.hits
+
+    @property
+    def cache_misses(self):
+        """Return the number of values not found in the cache."""
+        return self._cache.misses
 
 
 class _Inference:
-    def __init__(self, index, patterns, null_value):
+    def __init__(self, index, patterns, null_value, **kwargs):
         """Initialize."""
         self._index = int(index)
         self._key = operator.itemgetter(self._index)
-        self._inferrer = TypeInferrer(patterns, null_value)
+        self._inferrer = TypeInferrer(patterns, null_value, **kwargs)
 
-    def read_row(self, row):
-        """Read a row."""
-        item = self._key(row)
-        self._inferrer.read_item(item)
+    def read_rows(self, rows):
+        """Read a chunk of rows as a column."""
+        self._inferrer.read_items(list(map(self._key, rows)))
 
     @property
     def index(self):
@@ -214,6 +307,84 @@ class _Inference:
         """Return the type name."""
         return self._inferrer.type_name
 
+    @property
+    def inferrer(self):
+        """Return the type inferrer."""
+        return self._inferrer
+
+
+class _Transition:
+    """Tracks where the type inference of a column ends
+    from each of the start patterns.
+    Inferences that reach the same pattern are merged,
+    since they behave the same from then on.
+    """
+
+    def __init__(self, index, patterns, starts, null_value, **kwargs):
+        """Initialize."""
+        self._index = int(index)
+        self._key = operator.itemgetter(self._index)
+        self._routes = dict((start, start) for start in starts)
+        self._inferrers = dict(
+            (start, TypeInferrer(
+                patterns, null_value, start=start, **kwargs))
+            for start in set(starts))
+        self._errors = {}
+
+    def read_rows(self, rows):
+        """Read a chunk of rows as a column."""
+        items = list(map(self._key, rows))
+        inferrers = {}
+        moves = {}
+        failures = {}
+        for current, inferrer in self._inferrers.items():
+            try:
+                inferrer.read_items(items)
+            except TypeInferenceError as error:
+                failures[current] = str(error)
+                continue
+            moves[current] = inferrer.index
+            inferrers.setdefault(inferrer.index, inferrer)
+        self._inferrers = inferrers
+
+        for start, current in list(self._routes.items()):
+            if current is None:
+                continue
+            if current in failures:
+                self._routes[start] = None
+                self._errors[start] = failures[current]
+            else:
+                self._routes[start] = moves[current]
+
+    @property
+    def settled(self):
+        """Return if no route can change any more."""
+        return all(item.settled for item in self._inferrers.values())
+
+    @property
+    def index(self):
+        """Return the index."""
+        return self._index
+
+    @property
+    def ends(self):
+        """Return a dict from a start pattern index to the end one,
+        or to the error message when no pattern matches.
+        """
+        return dict(
+            (start, self._errors[start] if end is None else end)
+            for start, end in self._routes.items())
+
+
+def _read_chunks(reader, chunk_size):
+    reader = iter(reader)
+    while True:
+        with span('read_chunk', 'inference'):
+            chunk = list(itertools.islice(reader, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
 
 def decide_types(patterns, reader, column_names, **kwargs):
     """Decide the types and returns the list of types.
@@ -221,19 +392,63 @@ def decide_types(patterns, reader, column_names, **kwargs):
     Given `index_types` as a list of (index, typename),
     the types of the specified columns will not be calculated
     and will be set the pre-defined type names.
+    The rows are read by `chunk_size` rows and inferred column by column.
+    Columns whose types can no longer change are skipped,
+    and the reader is no longer read when all the columns are so.
+    Each column caches up to `cache_size` accepted values,
+    and `cache_memory` bytes limits the total size of the caches.
+    Given `stats`, the records read and the predicate evaluations
+    are recorded into it.
     """
     null_value = kwargs.get('null_value', _DEFAULT_NULL_VALUE)
     index_types = kwargs.get('index_types', [])
+    chunk_size = kwargs.get('chunk_size', _DEFAULT_CHUNK_SIZE)
+    cache_size = kwargs.get('cache_size', _DEFAULT_CACHE_SIZE)
+    cache_memory = kwargs.get('cache_memory')
 
     typename_maps = dict(
         (int(index), typename) for (index, typename) in index_types)
 
-    inferences = [
-        _Inference(index, patterns, null_value)
-        for index in range(len(column_names))
+    indices = [
+        index for index in range(len(column_names))
         if index not in typename_maps.keys()]
-    for row, inference in itertools.product(reader, inferences):
-        inference.read_row(row)
+    if cache_memory is not None and indices:
+        cache_memory //= len(indices)
+    inferences = [
+        _Inference(
+            index, patterns, null_value,
+            cache_size=cache_size, cache_memory=cache_memory)
+        for index in indices]
+    active_inferences = [
+        item for item in inferences if not item.inferrer.settled]
+    num_rows = 0
+    if active_inferences:
+        for chunk in _read_chunks(reader, chunk_size):
+            num_rows += len(chunk)
+            with span('infer_chunk', 'inference', rows=len(chunk),
+                      columns=len(active_inferences)):
+                for inference in active_inferences:
+                    inference.read_rows(chunk)
+
+            active_inferences = [
+                item for item in active_inferences
+                if not item.inferrer.settled]
+            if not active_inferences:
+                get_logger().info(
+                    'All the column types are settled after %d records.',
+                    num_rows)
+                break
+    get_logger().debug(
+        'Type inference cache: %d hits, %d misses.',
+        sum(item.inferrer.cache_hits for item in inferences),
+        sum(item.inferrer.cache_misses for item in inferences))
+
+    stats = kwargs.get('stats')
+    if stats is not None:
+        stats.record_inference(
+            [typename for typename, _ in patterns], num_rows,
+            [(column_names[item.index], item.inferrer.index,
+              item.inferrer.evaluations) for item in inferences])
 
     typename_maps.update(
         dict((item.index, item.type_name) for item in inferences)
@@ -241,3 +456,46 @@ def decide_types(patterns, reader, column_names, **kwargs):
 
     type_names = [typename_maps[index] for index in range(len(column_names))]
     return type_names
+
+
+def infer_transitions(patterns, reader, column_names, starts, **kwargs):
+    """Infer the types from each of the start pattern indexes in `starts`
+    and return a dict for each column, which maps a start index
+    to the end index or to the error message when no pattern matches.
+    Reading consecutive parts of a file, the serial result is given by
+    looking up the dicts of the parts in order, starting from 0.
+    The columns in `index_types` are not inferred and given None.
+    The other keyword arguments are the same as `decide_types`,
+    and `cache_memory` bytes are shared by the inferences
+    from all the start patterns.
+    """
+    null_value = kwargs.get('null_value', _DEFAULT_NULL_VALUE)
+    index_types = kwargs.get('index_types', [])
+    chunk_size = kwargs.get('chunk_size', _DEFAULT_CHUNK_SIZE)
+    cache_size = kwargs.get('cache_size', _DEFAULT_CACHE_SIZE)
+    cache_memory = kwargs.get('cache_memory')
+
+    fixed_indices = set(int(index) for (index, _) in index_types)
+    indices = [
+        index for index in range(len(column_names))
+        if index not in fixed_indices]
+    if cache_memory is not None and indices:
+        cache_memory //= len(indices) * len(set(starts))
+    transitions = [
+        _Transition(
+            index, patterns, starts, null_value,
+            cache_size=cache_size, cache_memory=cache_memory)
+        for index in indices]
+
+    active_transitions = [item for item in transitions if not item.settled]
+    if active_transitions:
+        for chunk in _read_chunks(reader, chunk_size):
+            for transition in active_transitions:
+                transition.read_rows(chunk)
+            active_transitions = [
+                item for item in active_transitions if not item.settled]
+            if not active_transitions:
+                break
+
+    ends = dict((item.index, item.ends) for item in transitions)
+    return [ends.get(index) for index in range(len(column_names))]
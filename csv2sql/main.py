@@ -1,20 +1,75 @@
 """Main."""
 
+import io
+import os
 import sys
 import csv
-import collections
 import itertools
+import collections
+import time
+import random
 import argparse
+import contextlib
+import concurrent.futures
 
 import yaml
 
 import csv2sql.meta
 import csv2sql.queryengines.psql
+import csv2sql.queryengines.sqlite
+import csv2sql.queryengines.mysql
+from csv2sql.core.batching import iterate_batches
+from csv2sql.core.compression import open_input
+from csv2sql.core.compression import open_output
+from csv2sql.core.checkpoint import load_state
+from csv2sql.core.checkpoint import record_digest
+from csv2sql.core.checkpoint import save_state
+from csv2sql.core.checkpoint import verify_state
+from csv2sql.core.compression import wrap_input
+from csv2sql.core.error import InputError
+from csv2sql.core.error import RecordBoundaryError
 from csv2sql.core.error import InterpretationError
+from csv2sql.core.error import LoadingError
+from csv2sql.core.error import SerializationError
+from csv2sql.core.error import TypeInferenceError
+from csv2sql.core.multifile import ConcatenatedFile
+from csv2sql.core.multifile import check_headers
+from csv2sql.core.multifile import expand_path
 from csv2sql.core.my_logging import get_logger
 from csv2sql.core.prefetching import RewindableFileIterator
-from csv2sql.core.type_inference import interpret_patterns
+from csv2sql.core.prefetching import SPILL_COMPRESSIONS
+from csv2sql.core.progress import DEFAULT_INTERVAL
+from csv2sql.core.progress import ProgressReporter
+from csv2sql.core.records import find_complete_records
+from csv2sql.core.records import is_canonical
+from csv2sql.core.records import is_splittable
+from csv2sql.core.records import open_range
+from csv2sql.core.records import read_canonical
+from csv2sql.core.records import read_record_blocks
+from csv2sql.core.records import read_records
+from csv2sql.core.records import serialize_canonically
+from csv2sql.core.records import skip_records
+from csv2sql.core.records import split_first_record
+from csv2sql.core.sampling import head_sample
+from csv2sql.core.sampling import reservoir_sample
+from csv2sql.core.sampling import stratified_sample
+from csv2sql.core.sampling import uniform_sample
+from csv2sql.core.sharding import PartialOutput
+from csv2sql.core.sharding import ShardedOutput
+from csv2sql.core.stats import Stats
+from csv2sql.core.tracing import span
+from csv2sql.core.tracing import start_tracing
+from csv2sql.core.tracing import stop_tracing
+from csv2sql.core.compilation import compile_patterns
+from csv2sql.core.parallel import decide_types_in_parallel
+from csv2sql.core.parallel import decide_types_of_files
+from csv2sql.core.type_cache import DEFAULT_MAX_AGE
+from csv2sql.core.type_cache import DEFAULT_MAX_BYTES
+from csv2sql.core.type_cache import TypeCache
+from csv2sql.core.type_cache import default_cache_dir
+from csv2sql.core.type_cache import make_key
 from csv2sql.core.type_inference import decide_types
+from csv2sql.core.type_inference import infer_transitions
 
 
 csv.field_size_limit(1 * 1024 * 1024 * 1024)  # 1 Gigabytes.
@@ -31,8 +86,17 @@ yaml.add_representer(
 )
 
 
+_DEFAULT_SHARD_BLOCK_ROWS = 10000
+# Rows serialized at once when the passthrough falls back to parsing.
+_PARSED_ROWS = 1024
+# Options passed to the processes writing input files into shards.
+_SHARD_WORKER_OPTIONS = (
+    'table_name', 'delimiter', 'null', 'shards', 'shard_rows', 'shard_bytes',
+    'data_file', 'rows_per_statement', 'max_statement_bytes')
 _QUERY_ENGINE_MAP = collections.OrderedDict((
     ('psql', csv2sql.queryengines.psql),
+    ('sqlite', csv2sql.queryengines.sqlite),
+    ('mysql', csv2sql.queryengines.mysql),
 ))
 
 
@@ -40,60 +104,731 @@ def _dump_patterns(args):
     yaml.dump(args.patterns, args.out_file, default_flow_style=False)
 
 
-def _dump_schema(args, in_file=None):
-    if not in_file:
-        in_file = args.in_file
+def _regular_file_path(in_file):
+    """Return the path of `in_file` when it is a regular file."""
+    if in_file is sys.stdin:
+        return None
+    path = getattr(in_file, 'name', None)
+    if not isinstance(path, str) or not os.path.isfile(path):
+        return None
+    return path
+
+
+def _sample(args, reader):
+    size = args.lines_for_inference
+    rand = random.Random(args.sampling_seed)
+
+    if args.sampling in ('uniform', 'stratified'):
+        path = _regular_file_path(args.in_file)
+        encoding = getattr(args.in_file, 'encoding', None)
+        if path and is_splittable(encoding):
+            get_logger().info(
+                'Records are sampled by %s sampling.', args.sampling)
+            try:
+                if args.sampling == 'uniform':
+                    return uniform_sample(
+                        path, size, rand,
+                        encoding=encoding, delimiter=args.delimiter)
+                return stratified_sample(
+                    path, size, encoding=encoding, delimiter=args.delimiter)
+            except RecordBoundaryError as error:
+                get_logger().info(
+                    'Records are sampled by reservoir sampling instead,'
+                    ' since the input cannot be split: %s', error)
+        else:
+            get_logger().info(
+                'Records are sampled by reservoir sampling instead of %s'
+                ' sampling, which needs a regular input file'
+                ' of an ASCII-compatible encoding.', args.sampling)
+        return reservoir_sample(reader, size, rand)
+
+    if args.sampling == 'reservoir':
+        get_logger().info('Records are sampled by reservoir sampling.')
+        return reservoir_sample(reader, size, rand)
+
+    return head_sample(reader, size)
+
+
+def _decide_types(args, reader, column_names):
+    patterns = compile_patterns(args.patterns)
+    kwargs = {
+        'null_value': args.null,
+        'index_types': args.index_types,
+        'cache_size': args.inference_cache_size,
+        'cache_memory': args.inference_cache_memory,
+    }
+
+    if args.jobs > 1:
+        path = _regular_file_path(args.in_file)
+        encoding = getattr(args.in_file, 'encoding', None)
+        if (args.lines_for_inference == 0 and path and
+                is_splittable(encoding)):
+            get_logger().info(
+                'Type inference runs in %d processes.', args.jobs)
+            try:
+                return decide_types_in_parallel(
+                    args.patterns, path, column_names, args.jobs,
+                    encoding=encoding, delimiter=args.delimiter, **kwargs)
+            except RecordBoundaryError as error:
+                get_logger().info(
+                    'Type inference runs in a single process instead,'
+                    ' since the input cannot be split: %s', error)
+        else:
+            get_logger().info(
+                'Type inference runs in a single process, since parallel'
+                ' inference needs a regular input file of an'
+                ' ASCII-compatible encoding and `--lines-for-inference 0`.')
+
+    return decide_types(
+        patterns, reader, column_names, stats=getattr(args, 'stats', None),
+        **kwargs)
+
+
+def _pattern_indexes(args, type_names):
+    """Return the indexes of the patterns of `type_names`,
+    or None for the columns of `--column-type`.
+    """
+    pattern_type_names = [pattern['typename'] for pattern in args.patterns]
+    overridden = set(index for index, _ in args.index_types)
+    return [
+        None if index in overridden or type_name not in pattern_type_names
+        else pattern_type_names.index(type_name)
+        for index, type_name in enumerate(type_names)]
+
+
+def _cache_key(args, paths, column_names):
+    return make_key(
+        paths,
+        column_names=column_names,
+        patterns=args.patterns,
+        null=args.null,
+        index_types=args.index_types,
+        delimiter=args.delimiter,
+        lines_for_inference=args.lines_for_inference,
+        sampling=args.sampling,
+        sampling_seed=args.sampling_seed,
+        multi_file=_is_multi_file(args))
+
+
+def _decide_types_with_cache(args, paths, column_names, decide):
+    """Return the types decided by `decide`,
+    or the cached ones for the input files of `paths`.
+    """
+    if getattr(args, 'no_cache', True) or not paths:
+        return decide()
+    cache = TypeCache(
+        args.cache_dir, max_age=args.cache_max_age,
+        max_bytes=args.cache_max_bytes)
+    try:
+        key = _cache_key(args, paths, column_names)
+    except OSError:
+        return decide()
+
+    entry = cache.lookup(key)
+    if entry is not None and len(entry['type_names']) == len(column_names):
+        get_logger().info(
+            'Column types are found in the cache in %s.', args.cache_dir)
+        return entry['type_names']
+    type_names = decide()
+    if cache.store(key, type_names, _pattern_indexes(args, type_names)):
+        get_logger().info(
+            'Column types are stored in the cache in %s.', args.cache_dir)
+    return type_names
+
+
+@contextlib.contextmanager
+def _phase(args, name):
+    """Record the phase `name` by `--stats`, `--trace` and `--progress`."""
+    stats = getattr(args, 'stats', None)
+    progress = getattr(args, 'progress', None)
+    if progress is not None:
+        progress.set_phase(name)
+    with span(name, 'phase'):
+        if stats is None:
+            yield
+            return
+        with stats.phase(name):
+            yield
+
+
+def _count_input(args, in_file):
+    stats = getattr(args, 'stats', None)
+    return in_file if stats is None else stats.count_input(in_file)
+
+
+def _count_rows(args, reader):
+    # The stats count the records consumed, not the chunks of the progress.
+    progress = getattr(args, 'progress', None)
+    if progress is not None:
+        reader = progress.count_rows(reader)
+    stats = getattr(args, 'stats', None)
+    if stats is not None:
+        reader = stats.count_rows(reader)
+    return reader
+
+
+def _add_rows(args, num_rows):
+    """Count `num_rows` records read without `_count_rows`."""
+    stats = getattr(args, 'stats', None)
+    if stats is not None:
+        stats.rows += num_rows
+    progress = getattr(args, 'progress', None)
+    if progress is not None:
+        progress.add_rows(num_rows)
+
+
+def _read_records(args, in_file):
+    """Return the reader of the records of `in_file` after the header."""
+    reader = csv.reader(in_file, delimiter=args.delimiter)
+    next(reader)  # Skip the header.
+    return _count_rows(args, reader)
+
+
+def _is_multi_file(args):
+    return bool(getattr(args, 'in_files', None))
+
+
+def _read_column_types_of_files(args):
+    column_names = check_headers(args.in_files, args.delimiter)
+    get_logger().info('Column names are identified: %s', str(column_names))
+
+    def decide():
+        if args.lines_for_inference > 0:
+            get_logger().info(
+                '%d records of each input file'
+                ' will be used for type inference.',
+                args.lines_for_inference)
+        get_logger().info(
+            'Type inference runs over %d input files in %d processes.',
+            len(args.in_files), args.jobs)
+        return decide_types_of_files(
+            args.patterns, args.in_files, column_names, args.jobs,
+            delimiter=args.delimiter,
+            num_records=args.lines_for_inference,
+            null_value=args.null,
+            index_types=args.index_types,
+            cache_size=args.inference_cache_size,
+            cache_memory=args.inference_cache_memory)
+
+    type_names = _decide_types_with_cache(
+        args, args.in_files, column_names, decide)
+    get_logger().info('Column types are decided: %s', str(type_names))
+    return column_names, type_names
+
+
+def _read_column_types(args, in_file):
+    """Read the header and the records for inference from `in_file`
+    and return the column names and the type names.
+    Multiple input files are read by their paths instead.
+    """
+    if _is_multi_file(args):
+        return _read_column_types_of_files(args)
 
     # Read the header and decide column names.
     reader = csv.reader(in_file, delimiter=args.delimiter)
     column_names = next(reader)
     get_logger().info('Column names are identified: %s', str(column_names))
 
-    num_lines_for_inference = args.lines_for_inference
-    if num_lines_for_inference > 0:
-        get_logger().info(
-            '%d records will be used for type inference.',
-            num_lines_for_inference)
-        reader = itertools.islice(reader, num_lines_for_inference)
+    def decide():
+        sample = _count_rows(args, reader)
+        if args.lines_for_inference > 0:
+            get_logger().info(
+                '%d records will be used for type inference.',
+                args.lines_for_inference)
+            sample = _sample(args, sample)
+        return _decide_types(args, sample, column_names)
 
-    type_names = decide_types(
-        interpret_patterns(args.patterns), reader, column_names,
-        null_value=args.null, index_types=args.index_types)
+    path = _regular_file_path(args.in_file)
+    type_names = _decide_types_with_cache(
+        args, [path] if path else [], column_names, decide)
     get_logger().info('Column types are decided: %s', str(type_names))
+    return column_names, type_names
 
-    args.query_engine.write_schema_statement(
-        args.out_file,
-        args.table_name,
-        zip(column_names, type_names),
-        args.rebuild,
-    )
+
+def _dump_schema(args, in_file=None, out_file=None):
+    if not in_file:
+        in_file = args.in_file
+    if not out_file:
+        out_file = args.out_file
+
+    with _phase(args, 'schema'):
+        column_names, type_names = _read_column_types(
+            args, _count_input(args, in_file))
+        args.query_engine.write_schema_statement(
+            out_file,
+            args.table_name,
+            zip(column_names, type_names),
+            args.rebuild,
+        )
+    return type_names
+
+
+def _canonical_blocks(args, blocks):
+    """Yield `blocks` as they are while they are in the canonical CSV format,
+    and the rest parsed and serialized again from the first block not in it,
+    which are written the same as when parsed.
+    """
+    blocks = iter(blocks)
+    for block in blocks:
+        if '"' not in block and '\r' not in block:
+            # Canonical without parsing, since no field is quoted.
+            num_rows = block.count('\n')
+            if block and not block.endswith('\n'):
+                num_rows += 1
+            _add_rows(args, num_rows)
+            yield block
+            continue
+        rows = read_canonical(block)
+        if rows is not None:
+            _add_rows(args, len(rows))
+            yield block
+            continue
+        get_logger().info(
+            'The rest of the input records are parsed,'
+            ' since they are not in the canonical CSV format.')
+        # Parsed as a whole, since a quote character in an unquoted field
+        # can break the boundaries of the rest of the blocks.
+        reader = _count_rows(args, csv.reader(itertools.chain.from_iterable(
+            io.StringIO(text) for text in itertools.chain([block], blocks))))
+        for rows in iter(
+                lambda: list(itertools.islice(reader, _PARSED_ROWS)), []):
+            yield serialize_canonically(rows)
+        return
+
+
+def _dump_data_passthrough(args, in_file, rebuild):
+    """Dump the data writing the input records as they are.
+    Returns None when done, or the lines of the input to be parsed
+    when the input is not suitable for passthrough.
+    """
+    blocks = read_record_blocks(in_file)
+    first_block = next(blocks, '')
+    header, body = split_first_record(first_block)
+
+    engine = args.query_engine
+    if not hasattr(engine, 'write_raw_insert_statement'):
+        reason = 'the query engine does not support it'
+    elif args.delimiter != ',':
+        reason = 'the delimiter is not a comma'
+    elif not is_canonical(header + body):
+        reason = 'the input is not in the canonical CSV format'
+    else:
+        get_logger().info('The input records are written as they are.')
+        engine.write_raw_insert_statement(
+            args.out_file,
+            args.table_name,
+            _canonical_blocks(args, itertools.chain([body], blocks)),
+            args.null,
+            rebuild,
+        )
+        return None
+
+    get_logger().info('The input records are parsed, since %s.', reason)
+    return itertools.chain.from_iterable(
+        io.StringIO(block) for block in itertools.chain([first_block], blocks))
+
+
+def _insertion_options(args):
+    return {
+        'data_file': args.data_file,
+        'rows_per_statement': args.rows_per_statement,
+        'max_statement_bytes': args.max_statement_bytes,
+    }
+
+
+def _is_batched(args):
+    return bool(
+        getattr(args, 'batch_rows', None) or
+        getattr(args, 'batch_bytes', None))
+
+
+def _is_sharded(args):
+    return bool(getattr(args, 'out_dir', None))
+
+
+def _dump_data_sharded(args, reader, output):
+    """Dump the data into the shards of `output` by blocks of records,
+    each of which is a shard or is dealt to `--shards` shards
+    in round-robin.
+    """
+    max_rows = args.shard_rows
+    if args.shards and not (max_rows or args.shard_bytes):
+        max_rows = _DEFAULT_SHARD_BLOCK_ROWS
+
+    blocks = iterate_batches(reader, max_rows, args.shard_bytes)
+    for block_index, block in enumerate(blocks):
+        index = block_index % args.shards if args.shards else block_index
+        args.query_engine.write_insert_statement(
+            output.shard(index),
+            args.table_name,
+            block,
+            args.null,
+            False,
+            **_insertion_options(args)
+        )
+        output.add_rows(index, block.num_rows)
 
 
-def _dump_data(args, in_file=None, rebuild=None):
+def _dump_file_into_shards(task):
+    """Dump the records of an input file into the parts of shards
+    in a worker process, and return the descriptions of the parts.
+    """
+    engine_name, options, index, path = task
+    args = argparse.Namespace(
+        query_engine=_QUERY_ENGINE_MAP[engine_name], **options)
+    part_name = 'part-{0:05d}'.format(index)
+    with open_input(path) as in_file, \
+            PartialOutput(options['out_dir'], part_name) as output:
+        # Skip the header.
+        reader = csv.reader(in_file, delimiter=args.delimiter)
+        next(reader)
+        _dump_data_sharded(args, reader, output)
+    return output.descriptions
+
+
+def _dump_files_sharded(args, output):
+    """Dump the data of the input files into the shards of `output`
+    in `--jobs` processes, each of which writes the blocks of a file.
+    """
+    check_headers(args.in_files, args.delimiter)
+    engine_name = next(
+        name for name, engine in _QUERY_ENGINE_MAP.items()
+        if engine is args.query_engine)
+    options = dict(
+        (option, getattr(args, option)) for option in _SHARD_WORKER_OPTIONS)
+    options['out_dir'] = args.out_dir
+    tasks = [
+        (engine_name, options, index, path)
+        for index, path in enumerate(args.in_files)]
+
+    get_logger().info(
+        'The input files are written into shards in %d processes.',
+        args.jobs)
+    progress = getattr(args, 'progress', None)
+
+    def adopt(path, descriptions):
+        output.adopt(descriptions)
+        _add_rows(args, sum(
+            description['rows'] for description in descriptions))
+        if progress is not None:
+            progress.add_file(path)
+
+    if args.jobs > 1:
+        with concurrent.futures.ProcessPoolExecutor(args.jobs) as executor:
+            for path, descriptions in zip(
+                    args.in_files,
+                    executor.map(_dump_file_into_shards, tasks)):
+                adopt(path, descriptions)
+    else:
+        for path, task in zip(args.in_files, tasks):
+            adopt(path, _dump_file_into_shards(task))
+
+
+def _dump_data(args, in_file=None, rebuild=None, output=None):
     if not in_file:
         in_file = args.in_file
     if rebuild is None:
         rebuild = args.rebuild
 
-    # Skip the header.
-    reader = csv.reader(in_file, delimiter=args.delimiter)
-    next(reader)
+    with _phase(args, 'data'):
+        in_file = _count_input(args, in_file)
+        if _is_sharded(args) and output is None:
+            with ShardedOutput(args.out_dir, args.table_name) as output:
+                _write_data(args, in_file, rebuild, output)
+        else:
+            _write_data(args, in_file, rebuild, output)
+
+
+def _write_data(args, in_file, rebuild, output):
+    if _is_sharded(args):
+        if rebuild:
+            args.query_engine.write_truncate_statement(
+                output.schema, args.table_name)
+        if _is_multi_file(args) and not args.shards:
+            _dump_files_sharded(args, output)
+        else:
+            _dump_data_sharded(args, _read_records(args, in_file), output)
+        get_logger().info(
+            'The data are written into %d shards in %s.',
+            output.num_shards, args.out_dir)
+        return
+
+    if _is_batched(args):
+        args.query_engine.write_batched_insert_statement(
+            args.out_file,
+            args.table_name,
+            _read_records(args, in_file),
+            args.null,
+            rebuild,
+            max_rows=args.batch_rows,
+            max_bytes=args.batch_bytes,
+            resume_from=getattr(args, 'resume_from_batch', 0),
+        )
+        return
+
+    if getattr(args, 'passthrough', False):
+        in_file = _dump_data_passthrough(args, in_file, rebuild)
+        if in_file is None:
+            return
 
     args.query_engine.write_insert_statement(
         args.out_file,
         args.table_name,
-        reader,
+        _read_records(args, in_file),
         args.null,
         rebuild,
+        **_insertion_options(args)
     )
 
 
-def _dump_all(args):
-    with RewindableFileIterator(args.in_file) as file_iterator:
-        _dump_schema(args, in_file=file_iterator)
+def _dump_binary_data(args, in_file, type_names):
+    get_logger().info(
+        'The data are written into %s in the binary format.', args.data_file)
+    with _phase(args, 'data'):
+        reader = _read_records(args, _count_input(args, in_file))
+        with open(args.data_file, 'wb') as data_file:
+            args.query_engine.write_binary_data(
+                data_file, reader, type_names, args.null)
+        args.query_engine.write_binary_insert_statement(
+            args.out_file, args.table_name, args.data_file, False)
+
+
+def _open_rewindable(args):
+    return RewindableFileIterator(
+        args.in_file,
+        buffer_size=args.buffer_size,
+        spill_dir=args.spill_dir,
+        spill_compression=args.spill_compression)
+
+
+def _freeze(args, file_iterator):
+    with _phase(args, 'rewind'):
         file_iterator.rewind()
         frozen_file_iterator = file_iterator.freeze()
-        _dump_data(args, in_file=frozen_file_iterator, rebuild=False)
+    if file_iterator.spooling:
+        get_logger().info(
+            '%d bytes are spooled for type inference,'
+            ' and %d bytes of them are spilled into a temporary file.',
+            file_iterator.spooled_bytes, file_iterator.spilled_bytes)
+    return frozen_file_iterator
+
+
+@contextlib.contextmanager
+def _open_twice(args):
+    """Yield the input for the schema and a function
+    returning the input read again for the data.
+    Multiple input files are not spooled,
+    since the schema is inferred from their paths.
+    """
+    if _is_multi_file(args):
+        with args.in_file as in_file:
+            yield in_file, lambda: in_file
+        return
+
+    with _open_rewindable(args) as file_iterator:
+        yield file_iterator, lambda: _freeze(args, file_iterator)
+
+
+def _dump_all(args):
+    if _is_sharded(args):
+        with _open_twice(args) as (in_file, reopen), \
+                ShardedOutput(args.out_dir, args.table_name) as output:
+            _dump_schema(args, in_file=in_file, out_file=output.schema)
+            _dump_data(args, reopen(), False, output)
+        return
+
+    with _open_twice(args) as (in_file, reopen):
+        type_names = _dump_schema(args, in_file=in_file)
+        if args.copy_format == 'binary':
+            _dump_binary_data(args, reopen(), type_names)
+        else:
+            _dump_data(args, in_file=reopen(), rebuild=False)
+
+
+def _load(args):
+    with _open_rewindable(args) as file_iterator:
+        with _phase(args, 'schema'):
+            column_names, type_names = _read_column_types(
+                args, _count_input(args, file_iterator))
+        frozen_file_iterator = _freeze(args, file_iterator)
+
+        get_logger().info('The records are loaded into %s.', args.table_name)
+        start_time = time.perf_counter()
+        with _phase(args, 'load'):
+            reader = _read_records(
+                args, _count_input(args, frozen_file_iterator))
+            num_rows = args.query_engine.load(
+                args.database,
+                args.table_name,
+                zip(column_names, type_names),
+                reader,
+                args.null,
+                rebuild=args.rebuild,
+                batch_size=args.batch_size,
+                journal_mode=args.journal_mode,
+                synchronous=args.synchronous,
+                cache_size=args.cache_size,
+                indexes=args.index,
+                defer_index=args.defer_index,
+                streams=args.streams,
+                two_phase=args.two_phase,
+            )
+        elapsed = time.perf_counter() - start_time
+        get_logger().info(
+            '%d records are loaded in %.3f seconds (%.0f records/sec).',
+            num_rows, elapsed, num_rows / elapsed if elapsed else 0.0)
+
+
+def _start_appending(args, raw_file, path, encoding):
+    """Write the schema decided from the complete records
+    and return the checkpoint before the records.
+    """
+    end, _, _ = find_complete_records(raw_file, 0)
+    with open_range(path, 0, end, encoding) as in_file:
+        column_names, type_names = _read_column_types(args, in_file)
+    args.query_engine.write_schema_statement(
+        args.out_file,
+        args.table_name,
+        zip(column_names, type_names),
+        args.rebuild,
+    )
+    return {
+        'column_names': column_names,
+        'type_names': type_names,
+        'pattern_indexes': _pattern_indexes(args, type_names),
+        'offset': skip_records(raw_file, 0, 1),
+        'last_record_start': None,
+        'last_record_sha256': None,
+        'records': 0,
+    }
+
+
+def _verify_checkpoint(args, raw_file, encoding, state):
+    verify_state(raw_file, state)
+
+    header_end = skip_records(raw_file, 0, 1)
+    raw_file.seek(0)
+    header_text = raw_file.read(header_end).decode(encoding)
+    header = next(csv.reader(
+        io.StringIO(header_text), delimiter=args.delimiter), None)
+    if header != state['column_names']:
+        raise InputError(
+            'The header is changed since the checkpoint: {0}'.format(header))
+
+    pattern_type_names = [pattern['typename'] for pattern in args.patterns]
+    for index, type_name in zip(
+            state['pattern_indexes'], state['type_names']):
+        if index is not None and (
+                index >= len(pattern_type_names) or
+                pattern_type_names[index] != type_name):
+            raise InputError(
+                'The type patterns are changed since the checkpoint.')
+
+
+def _infer_appended_types(args, state, in_file):
+    """Return the pattern indexes of the columns
+    after reading the appended records of `in_file`.
+    """
+    indexes = state['pattern_indexes']
+    starts = sorted(set(index for index in indexes if index is not None))
+    if not starts:
+        return indexes
+    transitions = infer_transitions(
+        compile_patterns(args.patterns),
+        read_records(in_file, args.delimiter),
+        state['column_names'],
+        starts,
+        null_value=args.null,
+        index_types=[
+            (column, None) for column, index in enumerate(indexes)
+            if index is None],
+        cache_size=args.inference_cache_size,
+        cache_memory=args.inference_cache_memory)
+
+    new_indexes = []
+    for column_name, index, ends in zip(
+            state['column_names'], indexes, transitions):
+        end = None if index is None else ends[index]
+        if index is not None and not isinstance(end, int):
+            raise TypeInferenceError(
+                'The column {0}: {1}'.format(column_name, end))
+        new_indexes.append(end)
+    return new_indexes
+
+
+def _alter_appended_types(args, state, new_indexes):
+    """Write the queries to change the types of the columns
+    whose pattern indexes are changed, or fail by `--on-type-change`.
+    """
+    for column, (column_name, index, new_index) in enumerate(zip(
+            state['column_names'], state['pattern_indexes'], new_indexes)):
+        if index == new_index:
+            continue
+        old_type_name = state['type_names'][column]
+        new_type_name = args.patterns[new_index]['typename']
+        if args.on_type_change == 'fail':
+            raise TypeInferenceError(
+                'The type of the column {0} must change from {1} to {2}'
+                ' for the appended records.'.format(
+                    column_name, old_type_name, new_type_name))
+        get_logger().info(
+            'The type of the column %s is changed from %s to %s.',
+            column_name, old_type_name, new_type_name)
+        args.query_engine.write_alter_column_type_statement(
+            args.out_file, args.table_name, column_name, new_type_name)
+        state['type_names'][column] = new_type_name
+        state['pattern_indexes'][column] = new_index
+
+
+def _append(args):
+    path = _regular_file_path(args.in_file)
+    encoding = getattr(args.in_file, 'encoding', None)
+    if not path or not is_splittable(encoding):
+        raise InputError(
+            'Appending needs a regular uncompressed input file'
+            ' of an ASCII-compatible encoding.')
+
+    state = load_state(args.state_file)
+    first = state is None
+    with open(path, 'rb') as raw_file:
+        if first:
+            get_logger().info(
+                'No checkpoint is found in %s.', args.state_file)
+            state = _start_appending(args, raw_file, path, encoding)
+        else:
+            _verify_checkpoint(args, raw_file, encoding, state)
+
+        offset = state['offset']
+        end, last_start, num_records = find_complete_records(
+            raw_file, offset)
+        if num_records and not first:
+            # The types go on from the checkpoint as decided serially.
+            with open_range(path, offset, end, encoding) as in_file:
+                new_indexes = _infer_appended_types(args, state, in_file)
+            _alter_appended_types(args, state, new_indexes)
+        if num_records:
+            state['last_record_start'] = last_start
+            state['last_record_sha256'] = record_digest(
+                raw_file, last_start, end)
+
+    if num_records:
+        with open_range(path, offset, end, encoding) as in_file:
+            args.query_engine.write_insert_statement(
+                args.out_file,
+                args.table_name,
+                read_records(in_file, args.delimiter),
+                args.null,
+                False,
+                **_insertion_options(args)
+            )
+        args.out_file.flush()
+    get_logger().info(
+        '%d records are appended from the offset %d to %d.',
+        num_records, offset, end)
+
+    state['offset'] = end
+    state['records'] += num_records
+    save_state(args.state_file, state)
 
 
 def _decide_patterns(args):
@@ -133,6 +868,26 @@ def _parse_column_type(column_type):
     return index, type_name
 
 
+def _open_in_file(path):
+    if path == '-':
+        return sys.stdin
+    try:
+        return open_input(path)
+    except IOError as error:
+        raise argparse.ArgumentTypeError(
+            'can\'t open \'{0}\': {1}'.format(path, error))
+
+
+def _open_out_file(path):
+    if path == '-':
+        return sys.stdout
+    try:
+        return open_output(path)
+    except IOError as error:
+        raise argparse.ArgumentTypeError(
+            'can\'t open \'{0}\': {1}'.format(path, error))
+
+
 class _ArgsInterfaces:
     # pylint: disable=too-few-public-methods
     # since this class is an namespace.
@@ -140,15 +895,31 @@ class _ArgsInterfaces:
     readable = argparse.ArgumentParser(add_help=False)
     readable.add_argument(
         '-i', '--in-file', metavar='PATH',
-        help='Input file. [default: std-in]',
-        type=argparse.FileType('r'), default=sys.stdin)
+        help=('Input file, which is decompressed transparently'
+              ' when compressed by gzip, bzip2, xz or zstd.'
+              ' [default: std-in]'),
+        type=_open_in_file, default=sys.stdin)
+
+    # multi_readable.
+    multi_readable = argparse.ArgumentParser(add_help=False)
+    multi_readable.add_argument(
+        '--in-files', metavar='PATH', action='append',
+        help=('Input file or glob pattern of input files,'
+              ' which are read in order as one input instead of `-i`.'
+              ' The files must have the same header,'
+              ' and the types are inferred from the first'
+              ' `--lines-for-inference` records of each file'
+              ' in `--jobs` processes.'
+              ' This option can be set more than once.'),
+        default=[])
 
     # writable.
     writable = argparse.ArgumentParser(add_help=False)
     writable.add_argument(
         '-o', '--out-file', metavar='PATH',
-        help='Output file. [default: std-out]',
-        type=argparse.FileType('w'), default=sys.stdout)
+        help=('Output file, which is compressed by the extension'
+              ' `.gz`, `.bz2`, `.xz` or `.zst`. [default: std-out]'),
+        type=_open_out_file, default=sys.stdout)
 
     # csv readable.
     csv_readable = argparse.ArgumentParser(add_help=False)
@@ -169,6 +940,116 @@ class _ArgsInterfaces:
         choices=list(_QUERY_ENGINE_MAP), default='psql',
     )
 
+    # parallel_inference.
+    parallel_inference = argparse.ArgumentParser(add_help=False)
+    parallel_inference.add_argument(
+        '-j', '--jobs', metavar='NUM',
+        help=('Num processes for type inference over the whole input file,'
+              ' effective only for a regular input file'
+              ' with `--lines-for-inference 0`,'
+              ' or over `--in-files`, and for writing `--in-files`'
+              ' into shards without `--shards`. [default: 1]'),
+        type=int, default=1)
+
+    # rewindable.
+    rewindable = argparse.ArgumentParser(add_help=False)
+    rewindable.add_argument(
+        '--buffer-size', metavar='BYTES',
+        help=('Memory budget to keep the input read for type inference'
+              ' when the input is not seekable, such as a pipe.'
+              ' [default: 10485760]'),
+        type=int, default=10 * 1024 * 1024)
+    rewindable.add_argument(
+        '--spill-dir', metavar='PATH',
+        help=('Directory to spill the input beyond the memory budget into.'
+              ' [default: the system temporary directory]'))
+    rewindable.add_argument(
+        '--spill-compression',
+        help='Compression of the spilled input. [default: none]',
+        choices=sorted(SPILL_COMPRESSIONS))
+
+    # copy_formattable.
+    copy_formattable = argparse.ArgumentParser(add_help=False)
+    copy_formattable.add_argument(
+        '--copy-format',
+        help=('Format of the data. `binary` writes the data'
+              ' in the binary COPY format of PostgreSQL into `--data-file`,'
+              ' encoded by the column types, and the output loads it'
+              ' by the `\\copy` meta-command of psql. [default: csv]'),
+        choices=['csv', 'binary'], default='csv')
+
+    # data_file_writable.
+    data_file_writable = argparse.ArgumentParser(add_help=False)
+    data_file_writable.add_argument(
+        '--data-file', metavar='PATH',
+        help=('Data file to write the records into,'
+              ' which the output loads: the binary COPY data'
+              ' with `--copy-format binary` for psql,'
+              ' or the data for `LOAD DATA LOCAL INFILE` for mysql.'))
+
+    # multi_row_insertable.
+    multi_row_insertable = argparse.ArgumentParser(add_help=False)
+    multi_row_insertable.add_argument(
+        '--rows-per-statement', metavar='NUM',
+        help=('Max num rows of a multi-row INSERT statement'
+              ' for the query engines using them.'
+              ' [default: the query engine default]'),
+        type=int)
+    multi_row_insertable.add_argument(
+        '--max-statement-bytes', metavar='BYTES',
+        help=('Max bytes of a multi-row INSERT statement for mysql,'
+              ' to be kept under `max_allowed_packet`. [default: 1048576]'),
+        type=int)
+
+    # loadable.
+    loadable = argparse.ArgumentParser(add_help=False)
+    loadable.add_argument(
+        '--database', metavar='DB', required=True,
+        help=('Database to load into: a file path for sqlite,'
+              ' or a libpq connection string for psql.'))
+    loadable.add_argument(
+        '--batch-size', metavar='NUM',
+        help=('Num records loaded at once: by a transaction for sqlite,'
+              ' or passed to a COPY stream for psql. [default: 100000]'),
+        type=int, default=100000)
+    loadable.add_argument(
+        '--index', metavar='COLUMN', action='append',
+        help='Column to be indexed. This option can be set more than once.',
+        default=[])
+    loadable.add_argument(
+        '--defer-index', action='store_true',
+        help='Create the indexes after loading the records.')
+
+    # sqlite_tunable.
+    sqlite_tunable = argparse.ArgumentParser(add_help=False)
+    sqlite_tunable.add_argument(
+        '--journal-mode',
+        help='Journal mode of sqlite. [default: the database default]',
+        type=str.upper, choices=csv2sql.queryengines.sqlite.journal_modes())
+    sqlite_tunable.add_argument(
+        '--synchronous',
+        help='Synchronous mode of sqlite. [default: the database default]',
+        type=str.upper,
+        choices=csv2sql.queryengines.sqlite.synchronous_modes())
+    sqlite_tunable.add_argument(
+        '--cache-size', metavar='NUM',
+        help=('Cache size of sqlite in pages,'
+              ' or in KiB when negative. [default: the database default]'),
+        type=int)
+
+    # psql_tunable.
+    psql_tunable = argparse.ArgumentParser(add_help=False)
+    psql_tunable.add_argument(
+        '--streams', metavar='NUM',
+        help=('Num parallel COPY streams of psql on their own connections,'
+              ' which are committed after all of them succeed.'
+              ' [default: 1]'),
+        type=int, default=1)
+    psql_tunable.add_argument(
+        '--two-phase', action='store_true',
+        help=('Commit the COPY streams of psql by two-phase commit,'
+              ' which needs `max_prepared_transactions` on the server.'))
+
     # query_factory.
     query_factory = argparse.ArgumentParser(add_help=False)
     query_factory.add_argument('table_name', help='Table name.')
@@ -185,6 +1066,64 @@ class _ArgsInterfaces:
         '-r', '--rebuild', action='store_true',
         help='Rebuild the table by a query such as "TRUNCATE TABLE".')
 
+    # shardable.
+    shardable = argparse.ArgumentParser(add_help=False)
+    shardable.add_argument(
+        '--out-dir', metavar='PATH',
+        help=('Directory to write the output into as shard files'
+              ' `data-NNNNN.sql` to be run in parallel after `schema.sql`,'
+              ' with `manifest.json` listing their rows and checksums.'
+              ' The data are split into blocks by `--shard-rows` and'
+              ' `--shard-bytes`, each of which is a shard,'
+              ' or dealt to `--shards` shards in round-robin.'))
+    shardable.add_argument(
+        '--shards', metavar='NUM',
+        help=('Num shards to deal the blocks to in round-robin.'
+              ' The blocks have 10000 rows unless their size is set.'),
+        type=int)
+    shardable.add_argument(
+        '--shard-rows', metavar='NUM',
+        help='Max num rows of a block.', type=int)
+    shardable.add_argument(
+        '--shard-bytes', metavar='BYTES',
+        help=('Approximate max bytes of a block,'
+              ' counted in the characters of the values and delimiters.'),
+        type=int)
+
+    # batchable.
+    batchable = argparse.ArgumentParser(add_help=False)
+    batchable.add_argument(
+        '--batch-rows', metavar='NUM',
+        help=('Max num rows of a batch. The data are written as batches,'
+              ' each of which is copied in its own transaction,'
+              ' following a comment of its batch number.'),
+        type=int)
+    batchable.add_argument(
+        '--batch-bytes', metavar='BYTES',
+        help=('Approximate max bytes of a batch,'
+              ' counted in the characters of the values and delimiters.'),
+        type=int)
+
+    # resumable.
+    resumable = argparse.ArgumentParser(add_help=False)
+    resumable.add_argument(
+        '--resume-from-batch', metavar='NUM',
+        help=('Num batches already committed, which are skipped.'
+              ' The table is not truncated even with `--rebuild`.'
+              ' psql stops at a failed batch, whose number is'
+              ' in the comment before it.'
+              ' [default: 0]'),
+        type=int, default=0)
+
+    # passthrough.
+    passthrough = argparse.ArgumentParser(add_help=False)
+    passthrough.add_argument(
+        '--passthrough', action='store_true',
+        help=('Write the input records into the data as they are,'
+              ' without parsing them, while they are'
+              ' in the same CSV format as the output.'
+              ' Otherwise, the records are parsed as usual.'))
+
     # pattern_readable.
     pattern_readable = argparse.ArgumentParser(add_help=False)
     pattern_readable.add_argument(
@@ -204,15 +1143,210 @@ class _ArgsInterfaces:
               ' When 0, all over the input file will be'
               ' used to identify them. [default: 1000]'),
         type=int, default=1000)
+    pattern_readable.add_argument(
+        '--sampling',
+        help=('How to sample the records for type inference'
+              ' when `--lines-for-inference` is positive.'
+              ' `head` takes the first records,'
+              ' `uniform` takes records at random byte offsets,'
+              ' `stratified` takes the head, the middle and the tail blocks,'
+              ' and `reservoir` takes random records reading the whole input.'
+              ' `uniform` and `stratified` read only near the offsets'
+              ' of the records, and fall back to `reservoir`'
+              ' for non-regular input files. [default: head]'),
+        choices=['head', 'uniform', 'stratified', 'reservoir'],
+        default='head')
+    pattern_readable.add_argument(
+        '--sampling-seed', metavar='NUM',
+        help='Random seed for sampling. [default: 0]',
+        type=int, default=0)
+    pattern_readable.add_argument(
+        '--inference-cache-size', metavar='NUM',
+        help=('Num values accepted by the current type per column'
+              ' to be cached during type inference.'
+              ' When 0, the cache is disabled. [default: 1024]'),
+        type=int, default=1024)
+    pattern_readable.add_argument(
+        '--inference-cache-memory', metavar='BYTES',
+        help=('Max total bytes of the type inference caches.'
+              ' [default: unlimited]'),
+        type=int, default=None)
+
+    # type_cacheable.
+    type_cacheable = argparse.ArgumentParser(add_help=False)
+    type_cacheable.add_argument(
+        '--no-cache', action='store_true',
+        help=('Do not use the cache of the decided types,'
+              ' which are reused for the same regular input files'
+              ' and the same settings of type inference.'))
+    type_cacheable.add_argument(
+        '--cache-dir', metavar='PATH',
+        help=('Directory of the cache of the decided types.'
+              ' [default: csv2sql in $XDG_CACHE_HOME or ~/.cache]'),
+        default=default_cache_dir())
+    type_cacheable.add_argument(
+        '--cache-max-age', metavar='SECONDS',
+        help=('Max age of the cached types since used last.'
+              ' [default: {0}]'.format(DEFAULT_MAX_AGE)),
+        type=int, default=DEFAULT_MAX_AGE)
+    type_cacheable.add_argument(
+        '--cache-max-bytes', metavar='BYTES',
+        help=('Max total bytes of the cached types,'
+              ' beyond which the least recently used ones are evicted.'
+              ' [default: {0}]'.format(DEFAULT_MAX_BYTES)),
+        type=int, default=DEFAULT_MAX_BYTES)
+
+    # appendable.
+    appendable = argparse.ArgumentParser(add_help=False)
+    appendable.add_argument(
+        '--state-file', metavar='PATH', required=True,
+        help=('State file of the checkpoint, which records the offset'
+              ' after the records written so far and the column types.'
+              ' Without it, the schema and all the complete records'
+              ' are written. Otherwise, only the complete records'
+              ' appended since the checkpoint are written.'
+              ' The state file is updated after writing the output.'))
+    appendable.add_argument(
+        '--on-type-change',
+        help=('What to do when the appended records need other types:'
+              ' `fail` raises an error, and `alter` writes queries'
+              ' such as "ALTER TABLE ... ALTER COLUMN ... TYPE" before'
+              ' the data. [default: fail]'),
+        choices=['fail', 'alter'], default='fail')
+
+    # stats_recordable.
+    stats_recordable = argparse.ArgumentParser(add_help=False)
+    stats_recordable.add_argument(
+        '--stats', metavar='PATH', dest='stats_file', nargs='?', const='',
+        help=('Record the wall time, the CPU time, the records,'
+              ' the bytes read and written and the peak memory'
+              ' of each phase, and how far type inference went'
+              ' through the type patterns. The statistics are written'
+              ' into PATH in JSON, or logged without PATH.'))
+
+    # traceable.
+    traceable = argparse.ArgumentParser(add_help=False)
+    traceable.add_argument(
+        '--trace', metavar='PATH', dest='trace_file',
+        help=('Trace file to write the spans of the phases and of'
+              ' the chunks read, inferred, spooled, serialized and'
+              ' written into, in the trace event format of Chrome.'))
+
+    # progress_reportable.
+    progress_reportable = argparse.ArgumentParser(add_help=False)
+    progress_reportable.add_argument(
+        '--progress', dest='progress_format', nargs='?', const='text',
+        help=('Report the progress of the current phase into std-err'
+              ' every `--progress-interval` seconds: the records read,'
+              ' the records per second, and the bytes read and the ETA'
+              ' for a regular input file. `text` writes log messages,'
+              ' and `json` writes a JSON object per line.'
+              ' [default: text]'),
+        choices=['text', 'json'])
+    progress_reportable.add_argument(
+        '--progress-interval', metavar='SECONDS',
+        help=('Interval of the progress reports.'
+              ' [default: {0}]'.format(DEFAULT_INTERVAL)),
+        type=float, default=DEFAULT_INTERVAL)
 
     # Composed interfaces.
     schema_dumper = [
-        readable, writable, query_engine_dependent, csv_readable,
-        query_factory, schema_factory, pattern_readable]
+        readable, multi_readable, writable, query_engine_dependent,
+        csv_readable, query_factory, schema_factory, pattern_readable,
+        parallel_inference, type_cacheable, stats_recordable, traceable,
+        progress_reportable]
+    all_dumper = schema_dumper + [
+        rewindable, copy_formattable, data_file_writable,
+        multi_row_insertable, shardable, batchable]
     insertion_dumper = [
+        readable, multi_readable, writable, query_engine_dependent,
+        csv_readable, query_factory, insertion_factory, pattern_readable,
+        parallel_inference, passthrough, data_file_writable,
+        multi_row_insertable, shardable, batchable, resumable,
+        stats_recordable, traceable, progress_reportable]
+    appender = [
         readable, writable, query_engine_dependent, csv_readable,
-        query_factory, insertion_factory, pattern_readable]
+        query_factory, schema_factory, pattern_readable, parallel_inference,
+        data_file_writable, multi_row_insertable, appendable]
     pattern_dumper = [writable, query_engine_dependent, pattern_readable]
+    loader = [
+        readable, query_engine_dependent, csv_readable, query_factory,
+        schema_factory, pattern_readable, parallel_inference, rewindable,
+        type_cacheable, loadable, sqlite_tunable, psql_tunable,
+        stats_recordable, traceable, progress_reportable]
+
+
+def _validate_sharding(parser, args):
+    sharding = [
+        option for option, value in (
+            ('--shards', args.shards),
+            ('--shard-rows', args.shard_rows),
+            ('--shard-bytes', args.shard_bytes))
+        if value is not None]
+    for option in sharding:
+        if getattr(args, option[2:].replace('-', '_')) < 1:
+            parser.error('`{0}` must be positive.'.format(option))
+    if not args.out_dir:
+        if sharding:
+            parser.error('`{0}` requires `--out-dir`.'.format(sharding[0]))
+        return
+    if not sharding:
+        parser.error('`--out-dir` requires `--shards`, `--shard-rows`'
+                     ' or `--shard-bytes`.')
+    conflicts = [
+        option for option, value in (
+            ('--passthrough', getattr(args, 'passthrough', False)),
+            ('--copy-format binary',
+             getattr(args, 'copy_format', 'csv') == 'binary'),
+            ('--data-file', args.data_file))
+        if value]
+    if conflicts:
+        parser.error(
+            '`--out-dir` cannot be used with `{0}`.'.format(conflicts[0]))
+
+
+def _validate_batching(parser, args):
+    resume_from_batch = getattr(args, 'resume_from_batch', 0)
+    if resume_from_batch < 0:
+        parser.error('`--resume-from-batch` must not be negative.')
+    for option, value in (
+            ('--batch-rows', args.batch_rows),
+            ('--batch-bytes', args.batch_bytes)):
+        if value is not None and value < 1:
+            parser.error('`{0}` must be positive.'.format(option))
+    if not _is_batched(args):
+        if resume_from_batch:
+            parser.error('`--resume-from-batch` requires `--batch-rows`'
+                         ' or `--batch-bytes`.')
+        return
+    if not hasattr(args.query_engine, 'write_batched_insert_statement'):
+        parser.error('The query engine does not support batches.')
+    conflicts = [
+        option for option, value in (
+            ('--out-dir', args.out_dir),
+            ('--passthrough', getattr(args, 'passthrough', False)),
+            ('--copy-format binary',
+             getattr(args, 'copy_format', 'csv') == 'binary'))
+        if value]
+    if conflicts:
+        parser.error('Batches cannot be used with `{0}`.'.format(
+            conflicts[0]))
+
+
+def _expand_in_files(parser, args):
+    if args.in_file is not sys.stdin:
+        parser.error('`--in-files` cannot be used with `--in-file`.')
+    if getattr(args, 'sampling', 'head') != 'head':
+        parser.error('`--in-files` cannot be used with `--sampling`'
+                     ' other than `head`.')
+    paths = []
+    for pattern in args.in_files:
+        matches = expand_path(pattern)
+        if not matches:
+            parser.error('No input file matches `{0}`.'.format(pattern))
+        paths.extend(matches)
+    args.in_files = paths
+    args.in_file = ConcatenatedFile(paths, delimiter=args.delimiter)
 
 
 def parse_args(arguments):
@@ -229,7 +1363,7 @@ def parse_args(arguments):
         title='target', description='What to dump.')
     subparsers.add_parser(
         'all', help='All queries.',
-        parents=_ArgsInterfaces.schema_dumper,
+        parents=_ArgsInterfaces.all_dumper,
     ).set_defaults(command=_dump_all)
     subparsers.add_parser(
         'schema', help='Schema queries.',
@@ -239,6 +1373,14 @@ def parse_args(arguments):
         'data', help='Data-insertion queries.',
         parents=_ArgsInterfaces.insertion_dumper,
     ).set_defaults(command=_dump_data)
+    subparsers.add_parser(
+        'load', help='Load into a database directly.',
+        parents=_ArgsInterfaces.loader,
+    ).set_defaults(command=_load)
+    subparsers.add_parser(
+        'append', help='Queries of the records appended since a checkpoint.',
+        parents=_ArgsInterfaces.appender,
+    ).set_defaults(command=_append)
     subparsers.add_parser(
         'pattern', help='Type-inference patterns.',
         parents=_ArgsInterfaces.pattern_dumper,
@@ -252,6 +1394,36 @@ def parse_args(arguments):
     if hasattr(args, 'column_type'):
         args.index_types = [
             _parse_column_type(item) for item in args.column_type]
+    if (getattr(args, 'command', None) is _load and
+            not hasattr(args.query_engine, 'load')):
+        parser.error('The query engine does not support loading.')
+    if getattr(args, 'in_files', None):
+        _expand_in_files(parser, args)
+    if (getattr(args, 'on_type_change', None) == 'alter' and
+            not hasattr(args.query_engine,
+                        'write_alter_column_type_statement')):
+        parser.error('The query engine does not support'
+                     ' `--on-type-change alter`.')
+    for option in ('--inference-cache-size', '--inference-cache-memory'):
+        value = getattr(args, option[2:].replace('-', '_'), None)
+        if value is not None and value < 0:
+            parser.error('`{0}` must not be negative.'.format(option))
+    if getattr(args, 'progress_interval', DEFAULT_INTERVAL) <= 0:
+        parser.error('`--progress-interval` must be positive.')
+    if hasattr(args, 'out_dir'):
+        _validate_sharding(parser, args)
+    if hasattr(args, 'batch_rows'):
+        _validate_batching(parser, args)
+    if getattr(args, 'copy_format', 'csv') == 'binary':
+        if not args.data_file:
+            parser.error('`--copy-format binary` requires `--data-file`.')
+        if not hasattr(args.query_engine, 'write_binary_data'):
+            parser.error('The query engine does not support'
+                         ' `--copy-format binary`.')
+    elif (getattr(args, 'data_file', None) and
+          not hasattr(args.query_engine, 'write_data_file')):
+        parser.error('The query engine does not support `--data-file`'
+                     ' without `--copy-format binary`.')
 
     return args
 
@@ -261,12 +1433,97 @@ def _fatal_error(error):
     sys.exit(1)
 
 
+def _decompress_stdin(args):
+    if getattr(args, 'in_file', None) is not sys.stdin:
+        return
+    in_file = wrap_input(sys.stdin.buffer)
+    if in_file is not None:
+        get_logger().info('The input is decompressed.')
+        args.in_file = in_file
+
+
+def _close_out_file(args):
+    # Compressed output files must be closed to be complete.
+    out_file = getattr(args, 'out_file', None)
+    if out_file is not None and out_file is not sys.stdout:
+        out_file.close()
+
+
+def _run_with_stats(args):
+    """Run the command, recording the statistics by `--stats`."""
+    stats_file = getattr(args, 'stats_file', None)
+    if stats_file is None:
+        args.command(args)
+        return
+
+    args.stats = Stats()
+    out_file = getattr(args, 'out_file', None)
+    if out_file is not None:
+        args.out_file = args.stats.count_output(out_file)
+    args.command(args)
+    if out_file is not None:
+        args.out_file = out_file
+
+    if not stats_file:
+        args.stats.log()
+        return
+    with open(stats_file, 'w') as stats_stream:
+        args.stats.dump(stats_stream)
+    get_logger().info('The statistics are written into %s.', stats_file)
+
+
+def _run_command(args):
+    """Run the command, recording the statistics by `--stats`
+    and the trace events by `--trace`.
+    """
+    trace_file = getattr(args, 'trace_file', None)
+    if trace_file is None:
+        _run_with_progress(args)
+        return
+
+    with open(trace_file, 'w') as trace_stream:
+        start_tracing(trace_stream)
+        try:
+            _run_with_progress(args)
+        finally:
+            stop_tracing()
+    get_logger().info('The trace events are written into %s.', trace_file)
+
+
+def _run_with_progress(args):
+    """Run the command, reporting the progress by `--progress`."""
+    progress_format = getattr(args, 'progress_format', None)
+    if progress_format is None:
+        _run_with_stats(args)
+        return
+
+    paths = args.in_files if _is_multi_file(args) else None
+    with ProgressReporter(
+            args.in_file, interval=args.progress_interval,
+            machine_readable=progress_format == 'json',
+            paths=paths) as progress:
+        args.progress = progress
+        if paths:
+            args.in_file.on_file_read = progress.add_file
+        _run_with_stats(args)
+
+
 def main():
     """Main."""
     try:
         args = parse_args(sys.argv[1:])
-        args.command(args)
+        _decompress_stdin(args)
+        _run_command(args)
+        _close_out_file(args)
     except IOError as error:
         _fatal_error(error)
+    except InputError as error:
+        _fatal_error(error)
     except InterpretationError as error:
         _fatal_error(error)
+    except TypeInferenceError as error:
+        _fatal_error(error)
+    except SerializationError as error:
+        _fatal_error(error)
+    except LoadingError as error:
+        _fatal_error(error)
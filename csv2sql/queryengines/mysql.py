@@ -0,0 +1,255 @@
+"""MySQL engine."""
+
+import copy
+import io
+from collections import OrderedDict
+
+from csv2sql.core.schema import write_create_table_statement
+
+
+def _int_pattern(type_name, min_value, max_value):
+    return OrderedDict([
+        ('typename', type_name),
+        ('predicate', OrderedDict([
+            ('type', 'all-of'),
+            ('args', [
+                OrderedDict([
+                    ('type', 'compatible'),
+                    ('args', 'int'),
+                ]),
+                OrderedDict([
+                    ('type', 'not'),
+                    ('args', [
+                        OrderedDict([
+                            ('type', 'match'),
+                            ('args', '^0[0-9]+'),
+                        ]),
+                    ]),
+                ]),
+                OrderedDict([
+                    ('type', 'greater-than-or-equal-to'),
+                    ('args', min_value),
+                ]),
+                OrderedDict([
+                    ('type', 'less-than-or-equal-to'),
+                    ('args', max_value),
+                ]),
+            ]),
+        ])),
+    ])
+
+
+_DEFAULT_TYPE_PATTERN = [
+    _int_pattern('TINYINT', -128, 127),
+    _int_pattern('SMALLINT', -32768, 32767),
+    _int_pattern('MEDIUMINT', -8388608, 8388607),
+    _int_pattern('INT', -2147483648, 2147483647),
+    _int_pattern('BIGINT', -9223372036854775808, 9223372036854775807),
+    OrderedDict([
+        ('typename', 'DOUBLE'),
+        ('predicate', OrderedDict([
+            ('type', 'all-of'),
+            ('args', [
+                OrderedDict([
+                    ('type', 'compatible'),
+                    ('args', 'float'),
+                ]),
+                OrderedDict([
+                    ('type', 'not'),
+                    ('args', [
+                        OrderedDict([
+                            ('type', 'compatible'),
+                            ('args', 'int'),
+                        ]),
+                    ]),
+                ]),
+                OrderedDict([
+                    ('type', 'not'),
+                    ('args', [
+                        OrderedDict([
+                            ('type', 'match'),
+                            ('args', '^0[0-9]+'),
+                        ]),
+                    ]),
+                ]),
+                OrderedDict([
+                    ('type', 'not'),
+                    ('args', [
+                        OrderedDict([
+                            ('type', 'match'),
+                            ('args', '(?i)(nan|inf)'),
+                        ]),
+                    ]),
+                ]),
+            ]),
+        ])),
+    ]),
+    OrderedDict([
+        ('typename', 'VARCHAR(255)'),
+        ('predicate', OrderedDict([
+            ('type', 'shorter-than'),
+            ('args', 255),
+        ])),
+    ]),
+    OrderedDict([
+        ('typename', 'LONGTEXT'),
+        ('predicate', OrderedDict([
+            ('type', 'any')
+        ])),
+    ]),
+]
+_LINE_TERMINATOR = '\n'
+_DEFAULT_ROWS_PER_STATEMENT = 1000
+_DEFAULT_MAX_STATEMENT_BYTES = 1024 * 1024
+_DATA_FILE_ENCODING = 'utf-8'
+_DATA_FILE_CHARACTER_SET = 'utf8mb4'
+_DATA_FIELD_TERMINATOR = '\t'
+_DATA_LINE_TERMINATOR = '\n'
+_DATA_NULL = '\\N'
+_DATA_ESCAPES = str.maketrans({
+    '\\': '\\\\',
+    '\t': '\\t',
+    '\n': '\\n',
+    '\r': '\\r',
+    '\0': '\\0',
+})
+_LITERAL_ESCAPES = str.maketrans({
+    '\\': '\\\\',
+    '\'': '\\\'',
+    '\t': '\\t',
+    '\n': '\\n',
+    '\r': '\\r',
+    '\0': '\\0',
+    '\x1a': '\\Z',
+})
+
+
+def type_patterns():
+    """Return the default type pattern."""
+    return copy.deepcopy(_DEFAULT_TYPE_PATTERN)
+
+
+def _quote_schema(name):
+    escaped = name.replace('`', '``')
+    return '`{0}`'.format(escaped)
+
+
+def _quote_literal(value):
+    return '\'{0}\''.format(value.translate(_LITERAL_ESCAPES))
+
+
+def write_schema_statement(out_stream, table_name, column_types, rebuild=False):
+    """Write the schema query into `out_stream`.
+    When `rebuild` is true, it prepends the query
+    'DROP TABLE IF EXISTS `table_name`.
+    """
+    write_create_table_statement(
+        out_stream, table_name, column_types, _quote_schema, rebuild)
+
+
+def write_truncate_statement(out_stream, table_name):
+    """Write the query to delete all the records of `table_name`
+    into `out_stream`, which is 'TRUNCATE TABLE `table_name`.
+    """
+    out_stream.write('TRUNCATE TABLE {0};'.format(table_name))
+    out_stream.write(_LINE_TERMINATOR)
+
+
+def write_alter_column_type_statement(
+        out_stream, table_name, column_name, type_name):
+    """Write the query to change the type of the column `column_name`
+    into `type_name`.
+    """
+    out_stream.write('ALTER TABLE {0} MODIFY COLUMN {1} {2};'.format(
+        table_name, _quote_schema(column_name), type_name))
+    out_stream.write(_LINE_TERMINATOR)
+
+
+def write_data_file(data_stream, reader, null_value):
+    """Write the records of `reader` into `data_stream`
+    in the default format of `LOAD DATA`,
+    that is, tab-separated fields escaped by backslashes
+    and NULL as `\\N`.
+    Returns the number of the written records.
+    """
+    num_rows = 0
+    for row in reader:
+        data_stream.write(_DATA_FIELD_TERMINATOR.join(
+            _DATA_NULL if value == null_value
+            else value.translate(_DATA_ESCAPES)
+            for value in row))
+        data_stream.write(_DATA_LINE_TERMINATOR)
+        num_rows += 1
+    return num_rows
+
+
+def _write_load_data_statement(out_stream, table_name, data_file):
+    out_stream.write(
+        'LOAD DATA LOCAL INFILE {0} INTO TABLE {1}'.format(
+            _quote_literal(data_file), table_name))
+    out_stream.write(_LINE_TERMINATOR)
+    out_stream.write('  CHARACTER SET {0}'.format(_DATA_FILE_CHARACTER_SET))
+    out_stream.write(_LINE_TERMINATOR)
+    out_stream.write('  FIELDS TERMINATED BY {0} ESCAPED BY {1}'.format(
+        _quote_literal(_DATA_FIELD_TERMINATOR), _quote_literal('\\')))
+    out_stream.write(_LINE_TERMINATOR)
+    out_stream.write('  LINES TERMINATED BY {0};'.format(
+        _quote_literal(_DATA_LINE_TERMINATOR)))
+    out_stream.write(_LINE_TERMINATOR)
+
+
+def _write_multi_row_insert_statements(
+        out_stream, table_name, reader, null_value,
+        rows_per_statement, max_statement_bytes):
+    head = 'INSERT INTO {0} VALUES'.format(table_name) + _LINE_TERMINATOR
+    separator = ',' + _LINE_TERMINATOR
+    tail = ';' + _LINE_TERMINATOR
+
+    tuples = []
+    num_bytes = len(head) + len(tail)
+    for row in reader:
+        values = '({0})'.format(', '.join(
+            'NULL' if value == null_value else _quote_literal(value)
+            for value in row))
+        size = len(values.encode('utf-8')) + len(separator)
+        if tuples and (
+                len(tuples) >= rows_per_statement or
+                num_bytes + size > max_statement_bytes):
+            out_stream.write(head + separator.join(tuples) + tail)
+            tuples = []
+            num_bytes = len(head) + len(tail)
+        tuples.append(values)
+        num_bytes += size
+    if tuples:
+        out_stream.write(head + separator.join(tuples) + tail)
+
+
+def write_insert_statement(
+        out_stream, table_name, reader, null_value, rebuild=False, **kwargs):
+    """Write the insert query into `out_stream`.
+    When `rebuild` is true, it prepends the query
+    'TRUNCATE TABLE `table_name`.
+
+    When `data_file` is given, the records are written into the file
+    of the path and the query loads it by `LOAD DATA LOCAL INFILE`,
+    which needs `local_infile` enabled.
+    Otherwise, the records are inserted by multi-row `INSERT` statements,
+    each of which has at most `rows_per_statement` rows
+    and `max_statement_bytes` bytes unless a row exceeds it,
+    to be kept under `max_allowed_packet`.
+    """
+    if rebuild:
+        write_truncate_statement(out_stream, table_name)
+
+    data_file = kwargs.get('data_file')
+    if data_file:
+        with io.open(data_file, 'w', encoding=_DATA_FILE_ENCODING,
+                     newline='') as data_stream:
+            write_data_file(data_stream, reader, null_value)
+        _write_load_data_statement(out_stream, table_name, data_file)
+        return
+
+    _write_multi_row_insert_statements(
+        out_stream, table_name, reader, null_value,
+        kwargs.get('rows_per_statement') or _DEFAULT_ROWS_PER_STATEMENT,
+        kwargs.get('max_statement_bytes') or _DEFAULT_MAX_STATEMENT_BYTES)
@@ -1,11 +1,31 @@
 """PostgreSQL engine."""
 
+import io
+import re
 import copy
 import csv
+import struct
+import itertools
+import queue
+import threading
+import time
+import uuid
 from collections import OrderedDict
 
 from six.moves import cStringIO as StringIO
 
+from csv2sql.core.batching import iterate_batches
+from csv2sql.core.error import LoadingError
+from csv2sql.core.error import SerializationError
+from csv2sql.core.my_logging import get_logger
+from csv2sql.core.schema import write_create_table_statement
+from csv2sql.core.tracing import span
+
+try:
+    import psycopg2
+except ImportError:
+    psycopg2 = None
+
 
 _DEFAULT_TYPE_PATTERN = [
     OrderedDict([
@@ -82,15 +102,44 @@ _DEFAULT_TYPE_PATTERN = [
     ]),
 ]
 _LINE_TERMINATOR = '\n'
+_END_OF_DATA = '\\.'
+_ESCAPED_END_OF_DATA = '"\\."'
+_DEFAULT_BATCH_SIZE = 4096
+_END_OF_DATA_LINE = re.compile(r'(?:^|\n)\\\.\r?(?:\n|$)')
+
+_BINARY_SIGNATURE = b'PGCOPY\n\xff\r\n\x00'
+_BINARY_HEADER = _BINARY_SIGNATURE + struct.pack('!ii', 0, 0)
+_BINARY_TRAILER = struct.pack('!h', -1)
+_BINARY_NULL = struct.pack('!i', -1)
+_BINARY_FIELD_COUNT = struct.Struct('!h')
+_BINARY_LENGTH = struct.Struct('!i')
+_BINARY_FLUSH_BYTES = 1024 * 1024
+# Raised by the encoders for invalid values, such as 1e39 for REAL.
+_BINARY_ERRORS = (ValueError, OverflowError, struct.error)
+_DEFAULT_LOAD_BATCH_SIZE = 10000
+_CLIENT_ENCODING = 'UTF8'
+_BOOLEAN_VALUES = {
+    't': True, 'true': True, 'y': True, 'yes': True, 'on': True, '1': True,
+    'f': False, 'false': False, 'n': False, 'no': False, 'off': False,
+    '0': False,
+}
 
 
 class WriterWrapper:
     """CSV writer wrapper class to escape the special strings."""
 
     def __init__(self, stream, *args, **kwargs):
+        """Initialize.
+        `writerows` serializes rows by `batch_size` rows at once.
+        The other arguments are passed to `csv.writer`.
+        """
+        self._batch_size = kwargs.pop('batch_size', _DEFAULT_BATCH_SIZE)
         self._stream = stream
         self._queue = StringIO()
         self._writer = csv.writer(self._queue, *args, **kwargs)
+        terminator = self._writer.dialect.lineterminator
+        self._end_of_data = _END_OF_DATA + terminator
+        self._escaped_end_of_data = _ESCAPED_END_OF_DATA + terminator
 
     def writerow(self, row):
         """Take a row and write it into the stream
@@ -99,8 +148,8 @@ class WriterWrapper:
         self._writer.writerow(row)
 
         data = self._queue.getvalue()
-        if data == '\\.\r\n':
-            data = '"\\."\r\n'
+        if data == self._end_of_data:
+            data = self._escaped_end_of_data
 
         self._stream.write(data)
         self._queue.seek(0)
@@ -109,9 +158,33 @@ class WriterWrapper:
     def writerows(self, rows):
         """Take a rows and write them into the stream
         with escaping the terminator.
+        Rows are serialized by batches and written at once,
+        which results in the same output as `writerow`.
         """
-        for row in rows:
-            self.writerow(row)
+        rows = iter(rows)
+        while True:
+            with span('read_rows', 'input'):
+                batch = list(itertools.islice(rows, self._batch_size))
+            if not batch:
+                return
+            self._write_batch(batch)
+
+    def _write_batch(self, rows):
+        with span('serialize', 'output', rows=len(rows)):
+            self._writer.writerows(rows)
+            data = self._queue.getvalue()
+            self._queue.seek(0)
+            self._queue.truncate(0)
+
+        if (data.startswith(self._end_of_data) or
+                '\n' + self._end_of_data in data):
+            # Can be a false positive in a quoted value,
+            # so escape precisely row by row.
+            for row in rows:
+                self.writerow(row)
+            return
+        with span('write', 'output', chars=len(data)):
+            self._stream.write(data)
 
 
 def type_patterns():
@@ -129,33 +202,31 @@ def write_schema_statement(out_stream, table_name, column_types, rebuild=False):
     When `rebuild` is true, it prepends the query
     'DROP TABLE IF EXISTS `table_name`.
     """
-    if rebuild:
-        out_stream.write('DROP TABLE IF EXISTS {0};'.format(table_name))
-        out_stream.write(_LINE_TERMINATOR)
+    write_create_table_statement(
+        out_stream, table_name, column_types, _quote_schema, rebuild)
 
-    out_stream.write('CREATE TABLE {0} ('.format(table_name))
-    out_stream.write(_LINE_TERMINATOR)
-    for index, column_type in enumerate(column_types):
-        if index != 0:
-            out_stream.write(',')
-            out_stream.write(_LINE_TERMINATOR)
-        column_name, type_name = column_type[0], column_type[1]
-        out_stream.write(
-            '  {0} {1}'.format(_quote_schema(column_name), type_name))
-    out_stream.write(_LINE_TERMINATOR)
-    out_stream.write(');')
+
+def write_truncate_statement(out_stream, table_name):
+    """Write the query to delete all the records of `table_name`
+    into `out_stream`, which is 'TRUNCATE TABLE `table_name`.
+    """
+    out_stream.write('TRUNCATE TABLE {0};'.format(table_name))
     out_stream.write(_LINE_TERMINATOR)
 
 
-def write_insert_statement(
-        out_stream, table_name, reader, null_value, rebuild=False):
-    """Write the insert query into `out_stream`.
-    When `rebuild` is true, it prepends the query
-    'TRUNCATE TABLE `table_name`.
+def write_alter_column_type_statement(
+        out_stream, table_name, column_name, type_name):
+    """Write the query to change the type of the column `column_name`
+    into `type_name`.
     """
+    out_stream.write('ALTER TABLE {0} ALTER COLUMN {1} TYPE {2};'.format(
+        table_name, _quote_schema(column_name), type_name))
+    out_stream.write(_LINE_TERMINATOR)
+
+
+def _write_insert_header(out_stream, table_name, null_value, rebuild):
     if rebuild:
-        out_stream.write('TRUNCATE TABLE {0};'.format(table_name))
-        out_stream.write(_LINE_TERMINATOR)
+        write_truncate_statement(out_stream, table_name)
 
     out_stream.write(
         'COPY {0} FROM STDIN WITH NULL \'{1}\' CSV;'.format(
@@ -165,8 +236,463 @@ def write_insert_statement(
     )
     out_stream.write(_LINE_TERMINATOR)
 
+
+def _write_insert_footer(out_stream):
+    out_stream.write('\\.')
+    out_stream.write(_LINE_TERMINATOR)
+
+
+def write_insert_statement(
+        out_stream, table_name, reader, null_value, rebuild=False, **_):
+    """Write the insert query into `out_stream`.
+    When `rebuild` is true, it prepends the query
+    'TRUNCATE TABLE `table_name`.
+    Keyword arguments for the other query engines are ignored.
+    """
+    _write_insert_header(out_stream, table_name, null_value, rebuild)
+
     writer = WriterWrapper(out_stream, dialect='excel')
     writer.writerows(reader)
 
-    out_stream.write('\\.')
+    _write_insert_footer(out_stream)
+
+
+def write_batched_insert_statement(
+        out_stream, table_name, reader, null_value, rebuild=False, **kwargs):
+    """Write the insert query into `out_stream`
+    as COPY statements of batches, each of which is in a transaction
+    following a comment of its number and its first record number.
+    Batches have at most `max_rows` records and about `max_bytes` bytes.
+    The first `resume_from` batches, which are already committed,
+    are skipped without being written.
+    When `rebuild` is true and nothing is skipped, it prepends the query
+    'TRUNCATE TABLE `table_name`.
+    The output starts with '\\set ON_ERROR_STOP on' so that psql stops
+    at a failed batch, which is then the batch to resume from.
+    """
+    resume_from = kwargs.get('resume_from', 0)
+    out_stream.write('\\set ON_ERROR_STOP on')
+    out_stream.write(_LINE_TERMINATOR)
+    if rebuild and not resume_from:
+        write_truncate_statement(out_stream, table_name)
+
+    writer = WriterWrapper(out_stream, dialect='excel')
+    first_record = 1
+    batches = iterate_batches(
+        reader, kwargs.get('max_rows'), kwargs.get('max_bytes'))
+    for index, batch in enumerate(batches):
+        if index < resume_from:
+            batch.skip()
+            first_record += batch.num_rows
+            continue
+
+        out_stream.write('-- Batch {0}, from the record {1}.'.format(
+            index, first_record))
+        out_stream.write(_LINE_TERMINATOR)
+        out_stream.write('BEGIN;')
+        out_stream.write(_LINE_TERMINATOR)
+        _write_insert_header(out_stream, table_name, null_value, False)
+        writer.writerows(batch)
+        _write_insert_footer(out_stream)
+        out_stream.write('COMMIT;')
+        out_stream.write(_LINE_TERMINATOR)
+        first_record += batch.num_rows
+
+
+def write_raw_insert_statement(
+        out_stream, table_name, blocks, null_value, rebuild=False):
+    """Write the insert query into `out_stream`
+    with `blocks`, texts of complete CSV records in the excel dialect
+    with LF terminators, written as they are.
+    Only the blocks containing a line of the end-of-data marker
+    are parsed and written with escaping it.
+    When `rebuild` is true, it prepends the query
+    'TRUNCATE TABLE `table_name`.
+    """
+    _write_insert_header(out_stream, table_name, null_value, rebuild)
+
+    # The same terminators as the canonical blocks written as they are,
+    # since COPY rejects mixed ones.
+    writer = WriterWrapper(
+        out_stream, dialect='excel', lineterminator=_LINE_TERMINATOR)
+    last_char = _LINE_TERMINATOR
+    for block in blocks:
+        if not block:
+            continue
+        if _END_OF_DATA_LINE.search(block):
+            writer.writerows(csv.reader(io.StringIO(block), dialect='excel'))
+            last_char = _LINE_TERMINATOR
+            continue
+        out_stream.write(block)
+        last_char = block[-1]
+    if last_char != _LINE_TERMINATOR:
+        out_stream.write(_LINE_TERMINATOR)
+
+    _write_insert_footer(out_stream)
+
+
+def _parse_matching(pattern, parse):
+    """Return `parse` accepting only the values matching `pattern`,
+    since Python accepts more values than the server in the text format,
+    such as '1_000' and non-ASCII digits.
+    """
+    def _parse(value):
+        if not pattern.match(value):
+            raise ValueError('invalid value: {0!r}'.format(value))
+        return parse(value)
+    return _parse
+
+
+def _fixed_size_encoder(format_char, parse):
+    packer = struct.Struct('!i' + format_char)
+    size = packer.size - _BINARY_LENGTH.size
+
+    def _encode(value):
+        return packer.pack(size, parse(value))
+    return _encode
+
+
+def _parse_boolean(value):
+    try:
+        return _BOOLEAN_VALUES[value.strip().lower()]
+    except KeyError:
+        raise ValueError('invalid boolean: {0!r}'.format(value))
+
+
+def _encode_text(value):
+    data = value.encode('utf-8')
+    return _BINARY_LENGTH.pack(len(data)) + data
+
+
+_parse_integer = _parse_matching(
+    re.compile(r'^\s*[+-]?[0-9]+\s*$', re.ASCII), int)
+_parse_float = _parse_matching(
+    re.compile(
+        r'^\s*(?:[+-]?(?:(?:[0-9]+\.?[0-9]*|\.[0-9]+)(?:e[+-]?[0-9]+)?'
+        r'|inf|infinity)|nan)\s*$',
+        re.ASCII | re.IGNORECASE),
+    float)
+_BINARY_ENCODERS = [
+    (r'SMALLINT|INT2', lambda: _fixed_size_encoder('h', _parse_integer)),
+    (r'INTEGER|INT|INT4', lambda: _fixed_size_encoder('i', _parse_integer)),
+    (r'BIGINT|INT8', lambda: _fixed_size_encoder('q', _parse_integer)),
+    (r'REAL|FLOAT4', lambda: _fixed_size_encoder('f', _parse_float)),
+    (r'DOUBLE PRECISION|FLOAT8',
+     lambda: _fixed_size_encoder('d', _parse_float)),
+    (r'BOOLEAN|BOOL', lambda: _fixed_size_encoder('?', _parse_boolean)),
+    (r'TEXT|(?:VARCHAR|CHARACTER VARYING|CHAR|CHARACTER)(?:\(\d+\))?',
+     lambda: _encode_text),
+]
+_BINARY_ENCODERS = [
+    (re.compile(r'^(?:{0})$'.format(pattern), re.IGNORECASE), factory)
+    for pattern, factory in _BINARY_ENCODERS
+]
+
+
+def binary_encoder(type_name):
+    """Return the function to encode a text value into a field
+    of the binary COPY format for `type_name`,
+    or raise `SerializationError` when the type is not supported.
+    """
+    normalized = ' '.join(type_name.split())
+    for pattern, factory in _BINARY_ENCODERS:
+        if pattern.match(normalized):
+            return factory()
+    raise SerializationError(
+        'The type {0} is not supported by the binary format.'.format(
+            type_name))
+
+
+def _describe_binary_failure(row, encoders, null_value):
+    if len(row) != len(encoders):
+        return 'The record has {0} fields instead of {1}: {2}'.format(
+            len(row), len(encoders), row)
+    for index, (value, encoder) in enumerate(zip(row, encoders)):
+        if value == null_value:
+            continue
+        try:
+            encoder(value)
+        except _BINARY_ERRORS as error:
+            return 'The value {0!r} of the column {1} is invalid: {2}'.format(
+                value, index + 1, error)
+    return 'The record is invalid: {0}'.format(row)
+
+
+def write_binary_data(out_stream, reader, type_names, null_value):
+    """Write the records of `reader` into the binary stream `out_stream`
+    in the binary COPY format with the column types `type_names`.
+    Values equal to `null_value` are written as NULL.
+    """
+    encoders = [binary_encoder(type_name) for type_name in type_names]
+    field_count = _BINARY_FIELD_COUNT.pack(len(encoders))
+
+    buf = bytearray(_BINARY_HEADER)
+    for row in reader:
+        if len(row) != len(encoders):
+            raise SerializationError(
+                _describe_binary_failure(row, encoders, null_value))
+        buf += field_count
+        try:
+            for value, encoder in zip(row, encoders):
+                buf += (
+                    _BINARY_NULL if value == null_value else encoder(value))
+        except _BINARY_ERRORS:
+            raise SerializationError(
+                _describe_binary_failure(row, encoders, null_value))
+        if len(buf) >= _BINARY_FLUSH_BYTES:
+            out_stream.write(buf)
+            buf = bytearray()
+    buf += _BINARY_TRAILER
+    out_stream.write(buf)
+
+
+def _quote_literal(value):
+    return "'{0}'".format(value.replace("'", "''"))
+
+
+def write_binary_insert_statement(
+        out_stream, table_name, data_path, rebuild=False):
+    """Write the query to insert the binary COPY data
+    in the file of `data_path` into `out_stream`,
+    which is the `copy` meta-command of psql.
+    When `rebuild` is true, it prepends the query
+    'TRUNCATE TABLE `table_name`.
+    """
+    if rebuild:
+        write_truncate_statement(out_stream, table_name)
+
+    out_stream.write('\\copy {0} FROM {1} WITH (FORMAT binary)'.format(
+        table_name, _quote_literal(data_path)))
     out_stream.write(_LINE_TERMINATOR)
+
+
+class _ChunkReader:
+    """A file-like object reading the chunks of COPY data from a queue
+    shared by the streams until it gets None.
+    """
+
+    def __init__(self, chunks):
+        self._chunks = chunks
+        self._chunk = b''
+        self._position = 0
+        self._done = False
+        self.num_rows = 0
+        self.num_bytes = 0
+
+    def read(self, size=-1):
+        """Read at most `size` bytes, or b'' at the end."""
+        if self._position >= len(self._chunk):
+            if self._done:
+                return b''
+            item = self._chunks.get()
+            if item is None:
+                self._done = True
+                return b''
+            self._chunk, num_rows = item
+            self._position = 0
+            self.num_rows += num_rows
+            self.num_bytes += len(self._chunk)
+
+        if size is None or size < 0:
+            size = len(self._chunk)
+        data = self._chunk[self._position:self._position + size]
+        self._position += len(data)
+        return data
+
+    def drain(self):
+        """Discard the rest of the chunks."""
+        while not self._done:
+            self._done = self._chunks.get() is None
+
+
+class _CopyStream(threading.Thread):
+    """A thread to run a COPY statement on a connection."""
+
+    def __init__(self, connection, query, chunks, xid=None):
+        super().__init__()
+        self.connection = connection
+        self.error = None
+        self.elapsed = 0.0
+        self._query = query
+        self._reader = _ChunkReader(chunks)
+        self._xid = xid
+        self._began_two_phase = False
+
+    @property
+    def num_rows(self):
+        """Num rows copied by the stream."""
+        return self._reader.num_rows
+
+    @property
+    def num_bytes(self):
+        """Num bytes copied by the stream."""
+        return self._reader.num_bytes
+
+    def run(self):
+        start_time = time.perf_counter()
+        try:
+            if self._xid is not None:
+                self.connection.tpc_begin(self._xid)
+                self._began_two_phase = True
+            cursor = self.connection.cursor()
+            cursor.copy_expert(self._query, self._reader)
+            cursor.close()
+            if self._xid is not None:
+                self.connection.tpc_prepare()
+        # pylint: disable=broad-except
+        # since any error must prevent the other streams from committing.
+        except Exception as error:
+            self.error = error
+        finally:
+            self._reader.drain()
+            self.elapsed = time.perf_counter() - start_time
+
+    def commit(self):
+        """Commit the transaction of the stream."""
+        if self._began_two_phase:
+            self.connection.tpc_commit()
+        else:
+            self.connection.commit()
+
+    def rollback(self):
+        """Roll back the transaction of the stream."""
+        if self._began_two_phase:
+            self.connection.tpc_rollback()
+        else:
+            self.connection.rollback()
+
+
+def _connect(database):
+    connection = psycopg2.connect(database)
+    connection.set_client_encoding(_CLIENT_ENCODING)
+    return connection
+
+
+def _create_indexes(cursor, table_name, column_names):
+    for column_name in column_names:
+        index_name = '{0}_{1}_index'.format(table_name, column_name)
+        cursor.execute('CREATE INDEX {0} ON {1} ({2})'.format(
+            _quote_schema(index_name), table_name,
+            _quote_schema(column_name)))
+
+
+def _put_chunks(chunks, reader, batch_size, streams):
+    buf = StringIO()
+    writer = WriterWrapper(buf, dialect='excel')
+    reader = iter(reader)
+    try:
+        while all(stream.error is None for stream in streams):
+            rows = list(itertools.islice(reader, batch_size))
+            if not rows:
+                break
+            writer.writerows(rows)
+            chunks.put((buf.getvalue().encode('utf-8'), len(rows)))
+            buf.seek(0)
+            buf.truncate(0)
+    finally:
+        for _ in streams:
+            chunks.put(None)
+
+
+def _copy_in_parallel(connections, table_name, reader, null_value, **kwargs):
+    batch_size = kwargs.get('batch_size') or _DEFAULT_LOAD_BATCH_SIZE
+    two_phase = kwargs.get('two_phase', False)
+
+    query = 'COPY {0} FROM STDIN WITH NULL \'{1}\' CSV'.format(
+        table_name, null_value)
+    chunks = queue.Queue(maxsize=2 * len(connections))
+    transaction_id = uuid.uuid4().hex
+    streams = [
+        _CopyStream(
+            connection, query, chunks,
+            connection.xid(0, 'csv2sql-{0}-{1}'.format(transaction_id, index),
+                           'csv2sql') if two_phase else None)
+        for index, connection in enumerate(connections)
+    ]
+    uncommitted = list(streams)
+    try:
+        for stream in streams:
+            stream.start()
+        try:
+            _put_chunks(chunks, reader, batch_size, streams)
+        finally:
+            for stream in streams:
+                stream.join()
+
+        errors = [
+            stream.error for stream in streams if stream.error is not None]
+        if errors:
+            raise LoadingError('Failed to copy into {0}: {1}'.format(
+                table_name, errors[0]))
+        while uncommitted:
+            uncommitted[0].commit()
+            uncommitted.pop(0)
+    finally:
+        for stream in uncommitted:
+            try:
+                stream.rollback()
+            except psycopg2.Error as error:
+                get_logger().warning('Failed to roll back a stream: %s', error)
+
+    for index, stream in enumerate(streams):
+        get_logger().info(
+            'Stream %d copied %d records (%d bytes) in %.3f seconds'
+            ' (%.0f records/sec).',
+            index, stream.num_rows, stream.num_bytes, stream.elapsed,
+            stream.num_rows / stream.elapsed if stream.elapsed else 0.0)
+    return sum(stream.num_rows for stream in streams)
+
+
+def load(database, table_name, column_types, reader, null_value, **kwargs):
+    """Create the table in the PostgreSQL database of the libpq connection
+    string `database` and copy the records of `reader` into it
+    by `streams` COPY statements on their own connections in parallel.
+    The transactions of the streams are committed after all of them
+    succeed, or are prepared first by two-phase commit with `two_phase`,
+    which needs `max_prepared_transactions` on the server.
+    Returns the number of the copied records.
+    Keyword arguments are below.
+    - `rebuild`: drop the table first when it exists.
+    - `streams`: num parallel COPY streams.
+    - `batch_size`: num rows passed to a stream at once.
+    - `two_phase`: commit the streams by two-phase commit.
+    - `indexes`: column names to be indexed.
+    - `defer_index`: create the indexes after copying the records.
+    The table is created before the records are copied,
+    so it remains even when copying fails.
+    """
+    if psycopg2 is None:
+        raise LoadingError('psycopg2 is required to load into PostgreSQL.')
+    num_streams = max(kwargs.get('streams') or 1, 1)
+    indexes = kwargs.get('indexes', [])
+    defer_index = kwargs.get('defer_index', False)
+
+    schema = StringIO()
+    write_schema_statement(
+        schema, table_name, column_types, kwargs.get('rebuild', False))
+
+    connections = []
+    try:
+        connections.append(_connect(database))
+        with connections[0].cursor() as cursor:
+            cursor.execute(schema.getvalue())
+            if not defer_index:
+                _create_indexes(cursor, table_name, indexes)
+        connections[0].commit()
+
+        connections.extend(
+            _connect(database) for _ in range(num_streams - 1))
+        num_rows = _copy_in_parallel(
+            connections, table_name, reader, null_value, **kwargs)
+
+        if defer_index:
+            with connections[0].cursor() as cursor:
+                _create_indexes(cursor, table_name, indexes)
+            connections[0].commit()
+    except psycopg2.Error as error:
+        raise LoadingError(
+            'Failed to load into {0}: {1}'.format(table_name, error))
+    finally:
+        for connection in connections:
+            connection.close()
+    return num_rows
@@ -0,0 +1,246 @@
+"""SQLite engine."""
+
+import copy
+import itertools
+import sqlite3
+from collections import OrderedDict
+
+from six.moves import cStringIO as StringIO
+
+from csv2sql.core.error import LoadingError
+from csv2sql.core.schema import write_create_table_statement
+
+
+_DEFAULT_TYPE_PATTERN = [
+    OrderedDict([
+        ('typename', 'INTEGER'),
+        ('predicate', OrderedDict([
+            ('type', 'all-of'),
+            ('args', [
+                OrderedDict([
+                    ('type', 'compatible'),
+                    ('args', 'int'),
+                ]),
+                OrderedDict([
+                    ('type', 'not'),
+                    ('args', [
+                        OrderedDict([
+                            ('type', 'match'),
+                            ('args', '^0[0-9]+'),
+                        ]),
+                    ]),
+                ]),
+                OrderedDict([
+                    ('type', 'greater-than-or-equal-to'),
+                    ('args', -9223372036854775808),
+                ]),
+                OrderedDict([
+                    ('type', 'less-than-or-equal-to'),
+                    ('args', 9223372036854775807),
+                ]),
+            ]),
+        ])),
+    ]),
+    OrderedDict([
+        ('typename', 'REAL'),
+        ('predicate', OrderedDict([
+            ('type', 'all-of'),
+            ('args', [
+                OrderedDict([
+                    ('type', 'compatible'),
+                    ('args', 'float'),
+                ]),
+                OrderedDict([
+                    ('type', 'not'),
+                    ('args', [
+                        OrderedDict([
+                            ('type', 'compatible'),
+                            ('args', 'int'),
+                        ]),
+                    ]),
+                ]),
+                OrderedDict([
+                    ('type', 'not'),
+                    ('args', [
+                        OrderedDict([
+                            ('type', 'match'),
+                            ('args', '^0[0-9]+'),
+                        ]),
+                    ]),
+                ]),
+            ]),
+        ])),
+    ]),
+    OrderedDict([
+        ('typename', 'TEXT'),
+        ('predicate', OrderedDict([
+            ('type', 'any')
+        ])),
+    ]),
+]
+_LINE_TERMINATOR = '\n'
+_DEFAULT_BATCH_SIZE = 100000
+_DEFAULT_ROWS_PER_STATEMENT = 500
+_JOURNAL_MODES = ['DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'WAL', 'OFF']
+_SYNCHRONOUS_MODES = ['OFF', 'NORMAL', 'FULL', 'EXTRA']
+
+
+def type_patterns():
+    """Return the default type pattern."""
+    return copy.deepcopy(_DEFAULT_TYPE_PATTERN)
+
+
+def journal_modes():
+    """Return the available journal modes."""
+    return list(_JOURNAL_MODES)
+
+
+def synchronous_modes():
+    """Return the available synchronous modes."""
+    return list(_SYNCHRONOUS_MODES)
+
+
+def _quote_schema(name):
+    escaped = name.replace('"', '""')
+    return '"{0}"'.format(escaped)
+
+
+def _quote_value(value, null_value):
+    if value == null_value:
+        return 'NULL'
+    escaped = value.replace('\'', '\'\'')
+    return '\'{0}\''.format(escaped)
+
+
+def write_schema_statement(out_stream, table_name, column_types, rebuild=False):
+    """Write the schema query into `out_stream`.
+    When `rebuild` is true, it prepends the query
+    'DROP TABLE IF EXISTS `table_name`.
+    """
+    write_create_table_statement(
+        out_stream, table_name, column_types, _quote_schema, rebuild)
+
+
+def write_truncate_statement(out_stream, table_name):
+    """Write the query to delete all the records of `table_name`
+    into `out_stream`, which is 'DELETE FROM `table_name`.
+    """
+    out_stream.write('DELETE FROM {0};'.format(table_name))
+    out_stream.write(_LINE_TERMINATOR)
+
+
+def write_insert_statement(
+        out_stream, table_name, reader, null_value, rebuild=False, **kwargs):
+    """Write the insert query into `out_stream`,
+    which inserts `rows_per_statement` rows by a statement
+    in a transaction.
+    When `rebuild` is true, it prepends the query
+    'DELETE FROM `table_name`.
+    The other keyword arguments are ignored.
+    """
+    rows_per_statement = (
+        kwargs.get('rows_per_statement') or _DEFAULT_ROWS_PER_STATEMENT)
+
+    out_stream.write('BEGIN TRANSACTION;')
+    out_stream.write(_LINE_TERMINATOR)
+    if rebuild:
+        write_truncate_statement(out_stream, table_name)
+
+    reader = iter(reader)
+    while True:
+        rows = list(itertools.islice(reader, rows_per_statement))
+        if not rows:
+            break
+        out_stream.write('INSERT INTO {0} VALUES'.format(table_name))
+        out_stream.write(_LINE_TERMINATOR)
+        out_stream.write(
+            (',' + _LINE_TERMINATOR).join(
+                '({0})'.format(', '.join(
+                    _quote_value(value, null_value) for value in row))
+                for row in rows))
+        out_stream.write(';')
+        out_stream.write(_LINE_TERMINATOR)
+
+    out_stream.write('COMMIT;')
+    out_stream.write(_LINE_TERMINATOR)
+
+
+def _set_pragmas(cursor, **kwargs):
+    journal_mode = kwargs.get('journal_mode')
+    if journal_mode:
+        if journal_mode.upper() not in _JOURNAL_MODES:
+            raise ValueError('Invalid journal mode: {0}'.format(journal_mode))
+        cursor.execute('PRAGMA journal_mode = {0}'.format(journal_mode))
+
+    synchronous = kwargs.get('synchronous')
+    if synchronous:
+        if synchronous.upper() not in _SYNCHRONOUS_MODES:
+            raise ValueError(
+                'Invalid synchronous mode: {0}'.format(synchronous))
+        cursor.execute('PRAGMA synchronous = {0}'.format(synchronous))
+
+    cache_size = kwargs.get('cache_size')
+    if cache_size is not None:
+        cursor.execute('PRAGMA cache_size = {0:d}'.format(cache_size))
+
+
+def _create_indexes(cursor, table_name, column_names):
+    for column_name in column_names:
+        index_name = '{0}_{1}_index'.format(table_name, column_name)
+        cursor.execute('CREATE INDEX {0} ON {1} ({2})'.format(
+            _quote_schema(index_name), table_name,
+            _quote_schema(column_name)))
+
+
+def load(database, table_name, column_types, reader, null_value, **kwargs):
+    """Create the table in the SQLite database file of the path `database`
+    and insert the records of `reader` into it, `batch_size` rows
+    by a transaction. Returns the number of the inserted records.
+    Keyword arguments are below.
+    - `rebuild`: drop the table first when it exists.
+    - `batch_size`: num rows inserted by a transaction.
+    - `journal_mode`, `synchronous` and `cache_size`: the pragmas.
+    - `indexes`: column names to be indexed.
+    - `defer_index`: create the indexes after inserting the records.
+    """
+    column_types = list(column_types)
+    batch_size = kwargs.get('batch_size') or _DEFAULT_BATCH_SIZE
+    indexes = kwargs.get('indexes', [])
+    defer_index = kwargs.get('defer_index', False)
+
+    schema = StringIO()
+    write_schema_statement(
+        schema, table_name, column_types, kwargs.get('rebuild', False))
+    query = 'INSERT INTO {0} VALUES ({1})'.format(
+        table_name, ', '.join('?' * len(column_types)))
+
+    num_rows = 0
+    connection = sqlite3.connect(database, isolation_level=None)
+    try:
+        cursor = connection.cursor()
+        _set_pragmas(cursor, **kwargs)
+        cursor.executescript(schema.getvalue())
+        if not defer_index:
+            _create_indexes(cursor, table_name, indexes)
+
+        reader = iter(reader)
+        while True:
+            rows = [
+                [None if value == null_value else value for value in row]
+                for row in itertools.islice(reader, batch_size)
+            ]
+            if not rows:
+                break
+            cursor.execute('BEGIN TRANSACTION')
+            cursor.executemany(query, rows)
+            cursor.execute('COMMIT')
+            num_rows += len(rows)
+
+        if defer_index:
+            _create_indexes(cursor, table_name, indexes)
+    except sqlite3.Error as error:
+        raise LoadingError(
+            'Failed to load into {0}: {1}'.format(database, error))
+    finally:
+        connection.close()
+    return num_rows
@@ -1,5 +1,6 @@
 #!/usr/bin/env python
 
+import os
 import unittest
 import csv
 import itertools
@@ -14,6 +15,9 @@ _RUN_QUERY = {
     'psql': ['docker-compose', 'run', 'psql_client'],
 }
 _QUERY_ENGINES = list(_RUN_QUERY)
+# libpq connection string of the server for `load`, such as
+# 'host=localhost user=docker password=docker'.
+_LOAD_DATABASE = os.environ.get('CSV2SQL_LOAD_DATABASE')
 
 
 def _pipe(args_list, stdin=None, stdout=None, stderr=None):
@@ -224,5 +228,26 @@ class TestPsql(unittest.TestCase):
             assert_query_succeeds(args, 'psql', stdin=in_file)
 
 
+@unittest.skipUnless(_LOAD_DATABASE, 'CSV2SQL_LOAD_DATABASE is not set.')
+class TestPsqlLoad(unittest.TestCase):
+    @parameterized.expand([
+        ('single_stream', []),
+        ('parallel_streams', ['--streams', '4', '--batch-size', '10']),
+        ('indexes', ['--index', 'key', '--defer-index']),
+    ])
+    def test_load_succeeds(self, name, tmp_args):
+        rows = itertools.chain(
+            [['key', 'value']],
+            (['key{0}'.format(index), str(index)] for index in range(1000)),
+        )
+        table_name = 'psql_load_{0}_succeeds'.format(name)
+        args = [_RUN + ['load', '-r', '--database', _LOAD_DATABASE] +
+                tmp_args + [table_name]]
+
+        with prepare_csv_file(rows) as in_file:
+            statuses = run_pipe_process(args, stdin=in_file)
+        eq_(statuses, (0,))
+
+
 if __name__ == '__main__':
     unittest.main()
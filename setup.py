@@ -40,6 +40,9 @@ setuptools.setup(
     ],
 
     install_requires=requirements,
+    extras_require={
+        'psql': ['psycopg2'],
+    },
     packages=packages,
     entry_points={
         'console_scripts': [
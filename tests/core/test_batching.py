@@ -0,0 +1,67 @@
+from unittest import TestCase
+
+from nose.tools import eq_
+from nose_parameterized import parameterized
+
+from csv2sql.core.batching import record_size
+from csv2sql.core.batching import iterate_batches
+
+
+class TestRecordSize(TestCase):
+    @parameterized.expand([
+        ([], 0),
+        ([''], 1),
+        (['ab', 'c'], 5),
+    ])
+    def test(self, row, expected):
+        eq_(record_size(row), expected)
+
+
+class TestIterateBatches(TestCase):
+    @parameterized.expand([
+        (0, None, None, []),
+        (5, None, None, [5]),
+        (5, 2, None, [2, 2, 1]),
+        (4, 2, None, [2, 2]),
+        (5, None, 6, [2, 2, 1]),
+        (5, None, 1, [1, 1, 1, 1, 1]),
+        (5, 3, 6, [2, 2, 1]),
+        (5, 1, 100, [1, 1, 1, 1, 1]),
+    ])
+    def test(self, num_rows, max_rows, max_bytes, expected):
+        rows = [['{0:02d}'.format(index)] for index in range(num_rows)]
+        batches = [
+            list(batch)
+            for batch in iterate_batches(rows, max_rows, max_bytes)]
+        eq_([len(batch) for batch in batches], expected)
+        eq_(sum(batches, []), rows)
+
+    @staticmethod
+    def test_counts():
+        rows = [['a', 'bc']] * 5
+        batches = iterate_batches(rows, max_rows=3)
+        counts = []
+        for batch in batches:
+            list(batch)
+            counts.append((batch.num_rows, batch.num_bytes))
+        eq_(counts, [(3, 15), (2, 10)])
+
+    @staticmethod
+    def test_skip_unconsumed():
+        rows = [[str(index)] for index in range(7)]
+        firsts = [
+            next(iter(batch)) for batch in iterate_batches(rows, max_rows=3)]
+        eq_(firsts, [['0'], ['3'], ['6']])
+
+    @staticmethod
+    def test_lazy():
+        def _rows():
+            for index in range(3):
+                consumed.append(index)
+                yield [str(index)]
+
+        consumed = []
+        batch = next(iterate_batches(_rows(), max_rows=2))
+        eq_(consumed, [0])
+        list(batch)
+        eq_(consumed, [0, 1])
@@ -0,0 +1,68 @@
+from unittest import TestCase
+from io import BytesIO
+import os
+import shutil
+import tempfile
+
+from nose.tools import eq_, raises
+
+from csv2sql.core.checkpoint import load_state
+from csv2sql.core.checkpoint import record_digest
+from csv2sql.core.checkpoint import save_state
+from csv2sql.core.checkpoint import verify_state
+from csv2sql.core.error import InputError
+
+
+class TestState(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, 'state.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test(self):
+        eq_(load_state(self.path), None)
+        save_state(self.path, {'offset': 3})
+        save_state(self.path, {'offset': 5})
+        eq_(load_state(self.path), {'offset': 5, 'version': 1})
+        eq_(os.listdir(self.temp_dir), ['state.json'])
+
+    @raises(InputError)
+    def test_broken(self):
+        with open(self.path, 'w') as state_file:
+            state_file.write('{')
+        load_state(self.path)
+
+    @raises(InputError)
+    def test_unknown_version(self):
+        with open(self.path, 'w') as state_file:
+            state_file.write('{"version": 0}')
+        load_state(self.path)
+
+
+class TestVerifyState(TestCase):
+    data = b'a,b\n1,2\n3,4\n'
+
+    def _state(self):
+        return {
+            'offset': 12,
+            'last_record_start': 8,
+            'last_record_sha256': record_digest(BytesIO(self.data), 8, 12),
+        }
+
+    def test(self):
+        verify_state(BytesIO(self.data), self._state())
+        verify_state(BytesIO(self.data + b'5,6\n'), self._state())
+        verify_state(BytesIO(self.data[:4]), {
+            'offset': 4,
+            'last_record_start': None,
+        })
+
+    @raises(InputError)
+    def test_shorter(self):
+        verify_state(BytesIO(self.data[:10]), self._state())
+
+    @raises(InputError)
+    def test_changed(self):
+        verify_state(BytesIO(b'a,b\n1,2\n3,5\n'), self._state())
@@ -0,0 +1,105 @@
+from unittest import TestCase
+
+from nose.tools import ok_, eq_, raises
+from nose_parameterized import parameterized
+
+from csv2sql.core.error import InterpretationError
+from csv2sql.core.compilation import compile_predicate
+from csv2sql.core.compilation import compile_patterns
+from csv2sql.core.type_inference import interpret_predicate
+from csv2sql.core.type_inference import interpret_patterns
+from csv2sql.core.type_inference import always_true
+from csv2sql.queryengines import psql
+
+
+_VALUES = [
+    '', '0', '1', '01', '-1', '+5', ' 7 ', '1_000', '0.1', '-1.234e-5',
+    'nan', 'inf', 'A', 'ab', 'bc', 'zabz', 'abccc', 'bcccc',
+    '2147483647', '2147483648', '-2147483648', '-2147483649', '1e3',
+    'x' * 254, 'x' * 255,
+]
+
+
+def _evaluate(predicate, value):
+    try:
+        return predicate(value)
+    except ArithmeticError as error:
+        return error.__class__
+
+
+class TestCompilePredicate(TestCase):
+    obj_compatible_int = {'type': 'compatible', 'args': 'int'}
+    obj_compatible_float = {'type': 'compatible', 'args': 'float'}
+    obj_lt = {'type': 'less-than', 'args': '0'}
+    obj_ge = {'type': 'greater-than-or-equal-to', 'args': '0'}
+    obj_shorter_than = {'type': 'shorter-than', 'args': '5'}
+    obj_match = {'type': 'match', 'args': 'abc*'}
+    obj_any = {'type': 'any'}
+
+    @parameterized.expand([
+        (obj_compatible_int,),
+        (obj_compatible_float,),
+        (obj_lt,),
+        (obj_ge,),
+        (obj_shorter_than,),
+        (obj_match,),
+        (obj_any,),
+        ({'type': 'all-of'},),
+        ({'type': 'any-of'},),
+        ({'type': 'not', 'args': [obj_any]},),
+        ({'type': 'not', 'args': [{'type': 'not', 'args': [obj_match]}]},),
+        ({'type': 'all-of', 'args': [obj_shorter_than, obj_match]},),
+        ({'type': 'any-of', 'args': [obj_shorter_than, obj_match]},),
+        ({'type': 'all-of', 'args': [obj_compatible_int, obj_match, obj_lt]},),
+        ({'type': 'all-of', 'args': [
+            obj_compatible_int, {'type': 'less-than', 'args': '2.5'}]},),
+        ({'type': 'all-of', 'args': [
+            obj_compatible_int, {'type': 'less-than', 'args': 'Infinity'}]},),
+        ({'type': 'all-of', 'args': [
+            obj_match, {'type': 'all-of', 'args': [obj_compatible_int]},
+            obj_ge]},),
+        ({'type': 'all-of', 'args': [obj_compatible_float, obj_ge]},),
+        ({'type': 'any-of', 'args': [obj_lt, obj_any]},),
+        ({'type': 'any-of', 'args': [obj_any, obj_lt]},),
+        ({'type': 'all-of', 'args': [
+            obj_lt, {'type': 'not', 'args': [obj_any]}]},),
+    ])
+    def test_equals_to_interpretation(self, obj):
+        interpreted = interpret_predicate(obj)
+        compiled = compile_predicate(obj)
+        for value in _VALUES:
+            eq_(_evaluate(compiled, value), _evaluate(interpreted, value))
+
+    @parameterized.expand([
+        ({'args': ['int']},),
+        ({'type': 'comp', 'args': 'int'},),
+        ({'type': 'compatible', 'args': ['not-existing-type']},),
+        ({'type': 'less-than', 'args': ['A']},),
+        ({'type': 'all-of', 'args': [{'type': 'any', 'args': ['A']}]},),
+    ])
+    @raises(InterpretationError)
+    def test_fails(self, obj):
+        compile_predicate(obj)
+
+    @parameterized.expand([
+        ({'type': 'any'},),
+        ({'type': 'all-of'},),
+        ({'type': 'not', 'args': [{'type': 'any-of'}]},),
+        ({'type': 'any-of', 'args': [{'type': 'match', 'args': 'A'},
+                                     {'type': 'any'}]},),
+    ])
+    def test_always_true(self, obj):
+        ok_(compile_predicate(obj) is always_true)
+
+
+class TestCompilePatterns(TestCase):
+    @staticmethod
+    def test_psql_patterns():
+        obj = psql.type_patterns()
+        interpreted = interpret_patterns(obj)
+        compiled = compile_patterns(obj)
+
+        eq_([item[0] for item in compiled], [item[0] for item in interpreted])
+        for (_, expected), (_, actual) in zip(interpreted, compiled):
+            for value in _VALUES:
+                eq_(actual(value), expected(value))
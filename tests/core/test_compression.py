@@ -0,0 +1,144 @@
+from unittest import TestCase
+import io
+import os
+import bz2
+import gzip
+import lzma
+import shutil
+import tempfile
+
+from mock import patch
+from nose.tools import ok_, eq_, raises
+from nose_parameterized import parameterized
+
+from csv2sql.core.compression import detect_compression
+from csv2sql.core.compression import compression_of_path
+from csv2sql.core.compression import consumed_position
+from csv2sql.core.compression import is_decompressed
+from csv2sql.core.compression import wrap_input
+from csv2sql.core.compression import open_input
+from csv2sql.core.compression import open_output
+
+_TEXT = ''.join('{0},あ\n'.format(index) for index in range(100000))
+
+
+class TestDetectCompression(TestCase):
+    @parameterized.expand([
+        (gzip.compress(b'abc'), 'gzip'),
+        (bz2.compress(b'abc'), 'bz2'),
+        (bz2.compress(b''), 'bz2'),
+        (lzma.compress(b'abc'), 'xz'),
+        (b'\x28\xb5\x2f\xfd\x00', 'zstd'),
+        (b'', None),
+        (b'a,b\n', None),
+        (b'BZh_code,value\n', None),
+    ])
+    def test(self, head, expected):
+        eq_(detect_compression(head[:10]), expected)
+
+
+class TestCompressionOfPath(TestCase):
+    @parameterized.expand([
+        ('a.csv.gz', 'gzip'),
+        ('a.sql.BZ2', 'bz2'),
+        ('a.xz', 'xz'),
+        ('a.lzma', 'xz'),
+        ('a.zst', 'zstd'),
+        ('a.sql', None),
+        ('gz', None),
+    ])
+    def test(self, path, expected):
+        eq_(compression_of_path(path), expected)
+
+
+class TestOpen(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    @parameterized.expand([
+        ('data.csv', lambda data: data),
+        ('data.csv.gz', gzip.decompress),
+        ('data.csv.bz2', bz2.decompress),
+        ('data.csv.xz', lzma.decompress),
+    ])
+    def test_round_trip(self, file_name, decompress):
+        path = os.path.join(self.temp_dir, file_name)
+        with open_output(path, encoding='utf-8') as out_file:
+            out_file.write(_TEXT)
+        with open(path, 'rb') as raw_file:
+            eq_(decompress(raw_file.read()), _TEXT.encode('utf-8'))
+        with open_input(path, encoding='utf-8') as in_file:
+            eq_(in_file.read(), _TEXT)
+
+    def test_detected_by_magic_bytes(self):
+        path = os.path.join(self.temp_dir, 'data.csv')
+        with open(path, 'wb') as raw_file:
+            raw_file.write(gzip.compress(b'a\n') + gzip.compress(b'b\n'))
+        with open_input(path) as in_file:
+            eq_(list(in_file), ['a\n', 'b\n'])
+
+    def test_fileno_of_compressed_file(self):
+        path = os.path.join(self.temp_dir, 'data.csv.gz')
+        with open_output(path, encoding='utf-8') as out_file:
+            out_file.write(_TEXT)
+        with open_input(path, encoding='utf-8') as in_file:
+            eq_(in_file.read(), _TEXT)
+            eq_(os.lseek(in_file.fileno(), 0, os.SEEK_CUR),
+                os.path.getsize(path))
+
+    def test_consumed_position(self):
+        path = os.path.join(self.temp_dir, 'data.csv.gz')
+        with open_output(path, encoding='utf-8') as out_file:
+            out_file.write(_TEXT * 20)
+        with open_input(path, encoding='utf-8') as in_file:
+            ok_(is_decompressed(in_file))
+            in_file.readline()
+            ok_(consumed_position(in_file) < os.path.getsize(path))
+            in_file.read()
+            eq_(consumed_position(in_file), os.path.getsize(path))
+        with open_input(os.devnull) as in_file:
+            ok_(not is_decompressed(in_file))
+
+    def test_close_before_end(self):
+        path = os.path.join(self.temp_dir, 'data.csv.gz')
+        with open_output(path, encoding='utf-8') as out_file:
+            out_file.write(_TEXT * 10)
+        in_file = open_input(path, encoding='utf-8')
+        eq_(in_file.readline(), '0,あ\n')
+        in_file.close()
+        ok_(in_file.closed)
+
+    def test_broken_input(self):
+        path = os.path.join(self.temp_dir, 'data.csv.gz')
+        with open(path, 'wb') as raw_file:
+            raw_file.write(gzip.compress(_TEXT.encode('utf-8'))[:1000])
+        with open_input(path, encoding='utf-8') as in_file:
+            try:
+                in_file.read()
+            except EOFError:
+                return
+        raise AssertionError('EOFError is not raised.')
+
+    @raises(IOError)
+    def test_zstd_without_zstandard(self):
+        path = os.path.join(self.temp_dir, 'data.csv.zst')
+        with patch('csv2sql.core.compression.zstandard', None):
+            open_output(path)
+
+
+class TestWrapInput(TestCase):
+    @staticmethod
+    def test_not_compressed():
+        binary_file = io.BufferedReader(io.BytesIO(b'a,b\n'))
+        eq_(wrap_input(binary_file), None)
+        eq_(binary_file.read(), b'a,b\n')
+
+    @staticmethod
+    def test_compressed():
+        binary_file = io.BufferedReader(io.BytesIO(lzma.compress(b'a,b\n')))
+        with wrap_input(binary_file) as in_file:
+            eq_(in_file.read(), 'a,b\n')
+        ok_(binary_file.closed)
@@ -0,0 +1,57 @@
+import sys
+from unittest import TestCase
+
+from nose.tools import ok_, eq_
+
+from csv2sql.core.memoization import ValueCache
+
+
+class TestValueCache(TestCase):
+    @staticmethod
+    def test_lookup():
+        cache = ValueCache(2)
+        ok_(not cache.lookup('A'))
+        cache.add('A')
+        ok_(cache.lookup('A'))
+        eq_((cache.hits, cache.misses), (1, 1))
+
+    @staticmethod
+    def test_filter_unknown():
+        cache = ValueCache(4)
+        cache.update(['A', 'B'])
+        eq_(cache.filter_unknown(['C', 'A', 'D']), ['C', 'D'])
+        eq_((cache.hits, cache.misses), (1, 2))
+
+    @staticmethod
+    def test_evicts_least_recently_used():
+        cache = ValueCache(2)
+        cache.update(['A', 'B'])
+        cache.lookup('A')
+        cache.add('C')
+        ok_('A' in cache)
+        ok_('B' not in cache)
+        ok_('C' in cache)
+
+    @staticmethod
+    def test_max_bytes():
+        cache = ValueCache(10, max_bytes=sys.getsizeof('A') * 2)
+        cache.update(['A', 'B', 'C'])
+        eq_(len(cache), 2)
+        ok_('A' not in cache)
+        eq_(cache.num_bytes, sys.getsizeof('B') + sys.getsizeof('C'))
+
+    @staticmethod
+    def test_disabled():
+        cache = ValueCache(0)
+        cache.update(['A'])
+        eq_(len(cache), 0)
+        ok_(not cache.enabled)
+
+    @staticmethod
+    def test_clear_keeps_counters():
+        cache = ValueCache(2)
+        cache.add('A')
+        cache.lookup('A')
+        cache.clear()
+        eq_(len(cache), 0)
+        eq_(cache.hits, 1)
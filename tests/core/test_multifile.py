@@ -0,0 +1,109 @@
+from unittest import TestCase
+import os
+import gzip
+import shutil
+import tempfile
+
+from nose.tools import ok_, eq_, raises
+
+from csv2sql.core.error import InputError
+from csv2sql.core.multifile import ConcatenatedFile
+from csv2sql.core.multifile import check_headers
+from csv2sql.core.multifile import expand_path
+
+
+class _FilesTestCase(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def _write(self, file_name, data):
+        path = os.path.join(self.temp_dir, file_name)
+        with open(path, 'wb') as raw_file:
+            if file_name.endswith('.gz'):
+                raw_file.write(gzip.compress(data.encode('utf-8')))
+            else:
+                raw_file.write(data.encode('utf-8'))
+        return path
+
+
+class TestExpandPath(_FilesTestCase):
+    def test(self):
+        paths = [self._write(name, 'a\n') for name in ('b.csv', 'a.csv')]
+        self._write('c.txt', 'a\n')
+        os.mkdir(os.path.join(self.temp_dir, 'd.csv'))
+        eq_(expand_path(os.path.join(self.temp_dir, '*.csv')),
+            sorted(paths))
+        eq_(expand_path(paths[0]), [paths[0]])
+        eq_(expand_path(os.path.join(self.temp_dir, 'x*')), [])
+
+    def test_path_with_glob_characters(self):
+        path = self._write('a[1].csv', 'a\n')
+        eq_(expand_path(path), [path])
+
+
+class TestCheckHeaders(_FilesTestCase):
+    def test(self):
+        paths = [
+            self._write('a.csv', '"a\nb",c\n1,2\n'),
+            self._write('b.csv.gz', '"a\nb",c'),
+        ]
+        eq_(check_headers(paths), ['a\nb', 'c'])
+
+    @raises(InputError)
+    def test_different_headers(self):
+        check_headers([
+            self._write('a.csv', 'a,b\n'),
+            self._write('b.csv', 'a,c\n'),
+        ])
+
+    @raises(InputError)
+    def test_no_header(self):
+        check_headers([self._write('a.csv', '')])
+
+
+class TestConcatenatedFile(_FilesTestCase):
+    def _paths(self):
+        return [
+            self._write('a.csv', '"a\nb",c\n1,2'),
+            self._write('b.csv.gz', '"a\nb",c\n3,"4\n5"\n'),
+            self._write('c.csv', '"a\nb",c\n'),
+            self._write('d.csv', '"a\nb",c\n6,7\n'),
+        ]
+
+    def test_iterate(self):
+        with ConcatenatedFile(self._paths()) as in_file:
+            eq_(list(in_file),
+                ['"a\n', 'b",c\n', '1,2\n', '3,"4\n', '5"\n', '6,7\n'])
+        ok_(in_file.closed)
+
+    def test_on_file_read(self):
+        paths = self._paths()
+        read = []
+        with ConcatenatedFile(paths) as in_file:
+            in_file.on_file_read = read.append
+            eq_(next(in_file), '"a\n')
+            eq_(read, [])
+            list(in_file)
+        eq_(read, paths)
+
+    def test_read(self):
+        expected = '"a\nb",c\n1,2\n3,"4\n5"\n6,7\n'
+        with ConcatenatedFile(self._paths()) as in_file:
+            eq_(in_file.read(3), expected[:3])
+            eq_(next(in_file), expected[3:8])
+            eq_(in_file.read(6), expected[8:14])
+            eq_(next(in_file), expected[14:17])
+            eq_(in_file.read(), expected[17:])
+            eq_(in_file.read(1), '')
+
+    @raises(InputError)
+    def test_different_headers(self):
+        paths = [
+            self._write('a.csv', 'a,b\n1,2\n'),
+            self._write('b.csv', 'a,c\n3,4\n'),
+        ]
+        with ConcatenatedFile(paths) as in_file:
+            list(in_file)
@@ -0,0 +1,116 @@
+from unittest import TestCase
+import os
+import csv
+import gzip
+import shutil
+import tempfile
+
+from nose.tools import eq_, raises
+from nose_parameterized import parameterized
+
+from csv2sql.core.compilation import compile_patterns
+from csv2sql.core.error import RecordBoundaryError
+from csv2sql.core.error import TypeInferenceError
+from csv2sql.core.parallel import decide_types_in_parallel
+from csv2sql.core.parallel import decide_types_of_files
+from csv2sql.core.type_inference import decide_types
+from csv2sql.queryengines import psql
+
+
+def _write_csv(rows):
+    csv_file = tempfile.NamedTemporaryFile(mode='w+', newline='')
+    writer = csv.writer(csv_file)
+    for row in rows:
+        writer.writerow(row)
+    csv_file.flush()
+    return csv_file
+
+
+class TestDecideTypesInParallel(TestCase):
+    rows = (
+        [['float-then-int', 'quoted', 'int', 'null']] +
+        [['1.5', 'A\n"B"', '1', '']] * 100 +
+        [['1', '2', '3', '']] * 100
+    )
+
+    @parameterized.expand([
+        (1, {}),
+        (2, {}),
+        (3, {'index_types': [(1, 'TEXT')]}),
+        (4, {'null_value': '1'}),
+        (2, {'cache_memory': 64}),
+    ])
+    def test_equals_to_serial(self, jobs, kwargs):
+        pattern_obj = psql.type_patterns()
+        column_names = self.rows[0]
+        expected = decide_types(
+            compile_patterns(pattern_obj), self.rows[1:], column_names,
+            **kwargs)
+        with _write_csv(self.rows) as csv_file:
+            actual = decide_types_in_parallel(
+                pattern_obj, csv_file.name, column_names, jobs, **kwargs)
+        eq_(actual, expected)
+
+    @staticmethod
+    @raises(TypeInferenceError)
+    def test_no_matching_pattern_raises_an_error():
+        pattern_obj = psql.type_patterns()[:1]
+        with _write_csv([['c'], ['1'], ['A']]) as csv_file:
+            decide_types_in_parallel(pattern_obj, csv_file.name, ['c'], 2)
+
+    @staticmethod
+    @raises(RecordBoundaryError)
+    def test_quote_in_unquoted_field_raises_an_error():
+        csv_file = tempfile.NamedTemporaryFile(mode='w+', newline='')
+        with csv_file:
+            csv_file.write('a,b\n1,5"in\n' + '2,"x\ny"\n' * 100)
+            csv_file.flush()
+            decide_types_in_parallel(
+                psql.type_patterns(), csv_file.name, ['a', 'b'], 4)
+
+
+class TestDecideTypesOfFiles(TestCase):
+    header = ['int-then-float', 'float-then-int', 'quoted', 'null']
+    parts = [
+        [['1', '1.5', 'A\n"B"', '']] * 10,
+        [['2', '2', '1', '']] * 10,
+        [['3.5', '3', '2', '']] * 10,
+    ]
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.paths = []
+        for index, rows in enumerate(self.parts):
+            path = os.path.join(self.temp_dir, '{0}.csv.gz'.format(index))
+            with gzip.open(path, 'wt', newline='') as csv_file:
+                writer = csv.writer(csv_file)
+                for row in [self.header] + rows:
+                    writer.writerow(row)
+            self.paths.append(path)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    @parameterized.expand([
+        (1, {}),
+        (2, {}),
+        (3, {'index_types': [(1, 'TEXT')]}),
+        (2, {'null_value': '1'}),
+    ])
+    def test_equals_to_serial(self, jobs, kwargs):
+        pattern_obj = psql.type_patterns()
+        rows = [row for part in self.parts for row in part]
+        expected = decide_types(
+            compile_patterns(pattern_obj), rows, self.header, **kwargs)
+        actual = decide_types_of_files(
+            pattern_obj, self.paths, self.header, jobs, **kwargs)
+        eq_(actual, expected)
+
+    def test_num_records(self):
+        pattern_obj = psql.type_patterns()
+        rows = [row for part in self.parts[:2] for row in part[:1]]
+        expected = decide_types(
+            compile_patterns(pattern_obj), rows, self.header)
+        actual = decide_types_of_files(
+            pattern_obj, self.paths[:2], self.header, 2, num_records=1)
+        eq_(actual, expected)
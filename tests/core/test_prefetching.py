@@ -9,6 +9,13 @@ from nose_parameterized import parameterized
 from csv2sql.core.prefetching import RewindableFileIterator
 
 
+class _Pipe(StringIO):
+    """A non-seekable stream such as pipes."""
+
+    def seekable(self):
+        return False
+
+
 class TestRewindableFileIterator(TestCase):
     @parameterized.expand([
         (StringIO(''), 0, [], []),
@@ -17,6 +24,9 @@ class TestRewindableFileIterator(TestCase):
         (StringIO('A\nB\n'), 1, ['A\n'], ['A\n', 'B\n']),
         (StringIO('A\nB\n'), 2, ['A\n', 'B\n'], ['A\n', 'B\n']),
         (StringIO('A\nB\n'), 3, ['A\n', 'B\n'], ['A\n', 'B\n']),
+        (_Pipe(''), 1, [], []),
+        (_Pipe('A\nB\n'), 1, ['A\n'], ['A\n', 'B\n']),
+        (_Pipe('A\nB\n'), 3, ['A\n', 'B\n'], ['A\n', 'B\n']),
     ])
     def test_iteration(
             self, in_file, num_line, expected_pre_fetching, expected_all):
@@ -35,6 +45,7 @@ class TestRewindableFileIterator(TestCase):
         (StringIO('A\nB\n'), 0, [], ['A\n', 'B\n']),
         (StringIO('A\nB\n'), 1, ['A\n'], ['B\n']),
         (StringIO('A\nB\n'), 2, ['A\n', 'B\n'], []),
+        (_Pipe('A\nB\n'), 1, ['A\n'], ['B\n']),
     ])
     def test_freeze(
             self, in_file, num_line, expected_pre_fetching, expected_frozen):
@@ -44,3 +55,50 @@ class TestRewindableFileIterator(TestCase):
         eq_(list(actual_pre_fetching), expected_pre_fetching)
         eq_(list(actual_frozen), expected_frozen)
         ok_(file_iterator.closed)
+
+    @parameterized.expand([
+        (StringIO('A\nB\n'), False),
+        (_Pipe('A\nB\n'), True),
+    ])
+    def test_spooling(self, in_file, expected):
+        with RewindableFileIterator(in_file) as file_iterator:
+            eq_(file_iterator.spooling, expected)
+            eq_(next(file_iterator), 'A\n')
+            file_iterator.rewind()
+            eq_(list(file_iterator.freeze()), ['A\n', 'B\n'])
+
+    @staticmethod
+    def test_rewinds_to_the_initial_position():
+        in_file = StringIO('H\nA\nB\n')
+        in_file.readline()
+        with RewindableFileIterator(in_file) as file_iterator:
+            eq_(list(file_iterator), ['A\n', 'B\n'])
+            file_iterator.rewind()
+            eq_(list(file_iterator), ['A\n', 'B\n'])
+
+    @parameterized.expand([
+        (None,),
+        ('zlib',),
+        ('bz2',),
+        ('lzma',),
+    ])
+    def test_spill(self, compression):
+        lines = ['line-{0}\n'.format(index) for index in range(100)]
+        in_file = _Pipe(''.join(lines) + 'last')
+        with RewindableFileIterator(
+                in_file, buffer_size=64, block_size=16,
+                spill_compression=compression) as file_iterator:
+            eq_(list(islice(file_iterator, 50)), lines[:50])
+            file_iterator.rewind()
+            eq_(list(islice(file_iterator, 10)), lines[:10])
+            eq_(list(file_iterator.freeze()), lines[10:] + ['last'])
+            ok_(file_iterator.spooled_bytes >= 64)
+            ok_(file_iterator.spilled_bytes > 0)
+
+    @staticmethod
+    def test_freeze_in_the_middle_of_a_line():
+        in_file = _Pipe('AAAA\nBBBB\nCCCC\n')
+        with RewindableFileIterator(in_file, block_size=7) as file_iterator:
+            eq_(next(file_iterator), 'AAAA\n')
+            file_iterator.rewind()
+            eq_(list(file_iterator.freeze()), ['AAAA\n', 'BBBB\n', 'CCCC\n'])
@@ -0,0 +1,88 @@
+from unittest import TestCase
+import io
+import os
+import json
+import shutil
+import tempfile
+
+from nose.tools import eq_, ok_
+
+from csv2sql.core.progress import ProgressReporter
+
+
+class TestProgressReporter(TestCase):
+    @staticmethod
+    def test_count_rows():
+        reporter = ProgressReporter(io.StringIO())
+        reporter.set_phase('data')
+        rows = [[str(index)] for index in range(3000)]
+        eq_(list(reporter.count_rows(rows)), rows)
+        eq_(reporter.snapshot()['rows'], 3000)
+        reporter.set_phase('next')
+        eq_(reporter.snapshot()['rows'], 0)
+
+    @staticmethod
+    def test_unknown_position():
+        reporter = ProgressReporter(io.StringIO('a\n'))
+        reporter.set_phase('data')
+        progress = reporter.snapshot()
+        eq_(progress['phase'], 'data')
+        eq_(progress['bytes'], None)
+        eq_(progress['total_bytes'], None)
+        eq_(progress['eta_seconds'], None)
+
+    @staticmethod
+    def test_position():
+        with tempfile.TemporaryFile() as in_file:
+            in_file.write(b'x' * 1000)
+            in_file.seek(0)
+            reporter = ProgressReporter(in_file)
+            reporter.set_phase('data')
+            in_file.seek(250)
+            progress = reporter.snapshot()
+        eq_(progress['bytes'], 250)
+        eq_(progress['total_bytes'], 1000)
+        ok_(progress['eta_seconds'] >= 0.0)
+
+    @staticmethod
+    def test_paths():
+        temp_dir = tempfile.mkdtemp()
+        try:
+            paths = []
+            for index, size in enumerate((100, 300)):
+                paths.append(os.path.join(temp_dir, '{0}.csv'.format(index)))
+                with open(paths[-1], 'w') as in_file:
+                    in_file.write('x' * size)
+            reporter = ProgressReporter(io.StringIO(), paths=paths)
+            reporter.set_phase('data')
+            reporter.add_file(paths[0])
+            progress = reporter.snapshot()
+        finally:
+            shutil.rmtree(temp_dir)
+        eq_(progress['bytes'], 100)
+        eq_(progress['total_bytes'], 400)
+        ok_(progress['eta_seconds'] >= 0.0)
+
+    @staticmethod
+    def test_machine_readable():
+        out_stream = io.StringIO()
+        with ProgressReporter(
+                io.StringIO(), interval=60.0, machine_readable=True,
+                out_stream=out_stream) as reporter:
+            reporter.set_phase('schema')
+            reporter.add_rows(10)
+        lines = out_stream.getvalue().splitlines()
+        eq_(len(lines), 1)
+        progress = json.loads(lines[0])
+        eq_(progress['phase'], 'schema')
+        eq_(progress['rows'], 10)
+
+    @staticmethod
+    def test_text():
+        with ProgressReporter(io.StringIO(), interval=60.0) as reporter:
+            reporter.set_phase('data')
+        with tempfile.TemporaryFile() as in_file:
+            in_file.write(b'x')
+            with ProgressReporter(in_file, interval=60.0) as reporter:
+                reporter.set_phase('data')
+                ok_(os.lseek(in_file.fileno(), 0, os.SEEK_CUR) >= 0)
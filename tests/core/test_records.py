@@ -0,0 +1,229 @@
+from unittest import TestCase
+from io import BytesIO, StringIO
+import tempfile
+
+from nose.tools import ok_, eq_, raises
+from nose_parameterized import parameterized
+
+from csv2sql.core.error import RecordBoundaryError
+from csv2sql.core.records import is_splittable
+from csv2sql.core.records import find_boundaries
+from csv2sql.core.records import find_boundaries_nearby
+from csv2sql.core.records import skip_records
+from csv2sql.core.records import read_records
+from csv2sql.core.records import find_complete_records
+from csv2sql.core.records import split_ranges
+from csv2sql.core.records import open_range
+from csv2sql.core.records import read_record_blocks
+from csv2sql.core.records import split_first_record
+from csv2sql.core.records import is_canonical
+from csv2sql.core.records import read_canonical
+from csv2sql.core.records import serialize_canonically
+
+
+class TestIsSplittable(TestCase):
+    @parameterized.expand([
+        ('utf-8', True),
+        ('ascii', True),
+        ('utf-16', False),
+        ('not-existing-encoding', False),
+    ])
+    def test(self, encoding, expected):
+        eq_(is_splittable(encoding), expected)
+
+
+class TestFindBoundaries(TestCase):
+    data = b'h1,h2\na,"b\nc"\n"d""\n",e\nf,g\n'
+
+    @parameterized.expand([
+        ([0], [0]),
+        ([1], [6]),
+        ([6], [6]),
+        ([8], [14]),
+        ([14], [14]),
+        ([16], [23]),
+        ([23], [23]),
+        ([26], [27]),
+        ([28], [27]),
+        ([16, 8], [14, 23]),
+        ([7, 8, 9], [14, 14, 14]),
+    ])
+    def test(self, targets, expected):
+        for block_size in (1, 3, 1024):
+            actual = find_boundaries(
+                BytesIO(self.data), 0, targets, block_size=block_size)
+            eq_(actual, expected)
+
+
+class _CountingBytesIO(BytesIO):
+    """A binary stream counting the bytes read."""
+
+    num_read = 0
+
+    def read(self, size=-1):
+        data = super().read(size)
+        self.num_read += len(data)
+        return data
+
+
+class TestFindBoundariesNearby(TestCase):
+    @parameterized.expand([
+        (b'1,"a\nb",x\n2,"c""d",y\n3,"e,",z\n4,f,"g\n"\n' * 20,),
+        # Empty quoted fields do not decide the parity.
+        (b'1,"a\nb"\n' + b'"",""\n' * 50 + b'2,"c\nd"\n',),
+        (b'1,a\r\n2,b\r\n' * 20,),
+    ])
+    def test_same_as_find_boundaries(self, body):
+        data = b'h1,h2\n' + body
+        targets = list(range(len(data) + 2))
+        expected = find_boundaries(BytesIO(data), 0, targets)
+        for target in targets:
+            actual = find_boundaries_nearby(
+                BytesIO(data), 0, [target], window=8)
+            eq_(actual, [expected[target]])
+
+    @staticmethod
+    def test_delimiter():
+        data = b'h1;h2\n' + b'1;"a\nb"\n2;"c";"d"\n' * 20
+        targets = list(range(8, len(data), 7))
+        eq_(find_boundaries_nearby(
+                BytesIO(data), 0, targets, delimiter=b';', window=8),
+            find_boundaries(BytesIO(data), 0, targets))
+
+    @staticmethod
+    def test_reads_near_targets():
+        data = b'h1,h2\n' + b'1,"a\nb"\n' * 100000
+        raw_file = _CountingBytesIO(data)
+        targets = [len(data) // 2, len(data) - 100]
+        eq_(find_boundaries_nearby(raw_file, 0, targets),
+            find_boundaries(BytesIO(data), 0, targets))
+        ok_(raw_file.num_read < len(data) // 4)
+
+
+class TestSkipRecords(TestCase):
+    data = b'h1,h2\na,"b\nc"\n"d""\n",e\nf,g\n'
+
+    @parameterized.expand([
+        (0, 0, 0),
+        (0, 1, 6),
+        (6, 1, 14),
+        (6, 2, 23),
+        (6, 10, 27),
+    ])
+    def test(self, start, num_records, expected):
+        eq_(skip_records(BytesIO(self.data), start, num_records), expected)
+
+
+class TestFindCompleteRecords(TestCase):
+    @parameterized.expand([
+        (b'h1,h2\na,"b\nc"\n"d""\n",e\nf,g\n', 6, (27, 23, 3)),
+        (b'h1,h2\na,"b\nc"\n"d""\n",e\nf,g', 6, (23, 14, 2)),
+        (b'h1,h2\na,"b\nc"\n"d""\n', 6, (14, 6, 1)),
+        (b'h1,h2\na,"b\n', 6, (6, None, 0)),
+        (b'h1,h2\n', 6, (6, None, 0)),
+    ])
+    def test(self, data, start, expected):
+        eq_(find_complete_records(BytesIO(data), start), expected)
+
+
+class TestSplitRanges(TestCase):
+    @parameterized.expand([(1,), (2,), (3,), (10,)])
+    def test(self, num_ranges):
+        data = b'a,"b\nc"\n' * 5
+        ranges = split_ranges(BytesIO(data), num_ranges)
+        ok_(len(ranges) <= num_ranges)
+        eq_(ranges[0][0], 0)
+        eq_(ranges[-1][1], len(data))
+        for (_, end), (start, _) in zip(ranges[:-1], ranges[1:]):
+            eq_(end, start)
+            eq_(end % 8, 0)
+
+
+class TestOpenRange(TestCase):
+    @staticmethod
+    def test():
+        with tempfile.NamedTemporaryFile() as raw_file:
+            raw_file.write(b'A\r\nB\nC\n')
+            raw_file.flush()
+            with open_range(raw_file.name, 3, 5, 'utf-8') as in_file:
+                eq_(list(in_file), ['B\n'])
+            with open_range(raw_file.name, 0, 5, 'utf-8') as in_file:
+                eq_(list(in_file), ['A\n', 'B\n'])
+
+
+class TestReadRecords(TestCase):
+    @staticmethod
+    def test():
+        eq_(list(read_records(StringIO('a,"b\nc"\n"d""",e\n'), ',', 2)),
+            [['a', 'b\nc'], ['d"', 'e']])
+
+    @parameterized.expand([
+        ('1,5"in\n2,x\n', None),
+        ('1,"x\ny"\n2\n', 2),
+    ])
+    @raises(RecordBoundaryError)
+    def test_wrong_boundary_raises_an_error(self, text, num_fields):
+        list(read_records(StringIO(text), num_fields=num_fields))
+
+
+class TestReadRecordBlocks(TestCase):
+    @parameterized.expand([
+        ('',),
+        ('a,b\n',),
+        ('a,"b\nc"\n"d""\n",e\nf,g\n',),
+        ('a,"b\nc"\nf,g',),
+    ])
+    def test(self, text):
+        for block_size in (1, 2, 5, 1024):
+            blocks = list(read_record_blocks(StringIO(text), block_size))
+            eq_(''.join(blocks), text)
+            for block in blocks[:-1]:
+                ok_(block.endswith('\n'))
+                eq_(block.count('"') % 2, 0)
+
+
+class TestSplitFirstRecord(TestCase):
+    @parameterized.expand([
+        ('', ('', '')),
+        ('h1,h2', ('h1,h2', '')),
+        ('h1,h2\na\n', ('h1,h2\n', 'a\n')),
+        ('"h\n1",h2\na\n', ('"h\n1",h2\n', 'a\n')),
+    ])
+    def test(self, text, expected):
+        eq_(split_first_record(text), expected)
+
+
+class TestSerializeCanonically(TestCase):
+    @parameterized.expand([
+        ([], ''),
+        ([['a', 'b'], ['1', '2']], 'a,b\n1,2\n'),
+        ([['7', ''], ['d\ne', 'f"']], '7,\n"d\ne","f"""\n'),
+    ])
+    def test(self, rows, expected):
+        eq_(serialize_canonically(rows), expected)
+
+
+class TestReadCanonical(TestCase):
+    @parameterized.expand([
+        ('', []),
+        ('a,"b\nc"\n1,2', [['a', 'b\nc'], ['1', '2']]),
+        ('a,""\n', None),
+    ])
+    def test(self, text, expected):
+        eq_(read_canonical(text), expected)
+
+
+class TestIsCanonical(TestCase):
+    @parameterized.expand([
+        ('', True),
+        ('a,b\n1,2\n', True),
+        ('a,b\n1,2', True),
+        ('a,"b,c"\n"d\ne",f\n', True),
+        ('a,"b"\n', False),
+        ('a,""\n', False),
+        ('a b,c\n', True),
+        ('a"b,c\n', False),
+        ('a,b\r\n', False),
+    ])
+    def test(self, text, expected):
+        eq_(is_canonical(text), expected)
@@ -0,0 +1,83 @@
+from unittest import TestCase
+import csv
+import random
+import tempfile
+
+from nose.tools import ok_, eq_, raises
+from nose_parameterized import parameterized
+
+from csv2sql.core.error import RecordBoundaryError
+from csv2sql.core.sampling import head_sample
+from csv2sql.core.sampling import reservoir_sample
+from csv2sql.core.sampling import stratified_sample
+from csv2sql.core.sampling import uniform_sample
+
+
+def _write_csv(rows):
+    csv_file = tempfile.NamedTemporaryFile(mode='w+', newline='')
+    writer = csv.writer(csv_file)
+    for row in rows:
+        writer.writerow(row)
+    csv_file.flush()
+    return csv_file
+
+
+_ROWS = [[str(index), 'A\n"B"' * (index % 3)] for index in range(300)]
+
+
+class TestHeadSample(TestCase):
+    @staticmethod
+    def test():
+        reader = iter(_ROWS)
+        eq_(list(head_sample(reader, 2)), _ROWS[:2])
+        eq_(next(reader), _ROWS[2])
+
+
+class TestReservoirSample(TestCase):
+    @parameterized.expand([(0,), (1,), (10,), (300,), (500,)])
+    def test(self, size):
+        actual = reservoir_sample(iter(_ROWS), size, random.Random(0))
+        eq_(len(actual), min(size, len(_ROWS)))
+        eq_(actual, sorted(actual, key=lambda row: int(row[0])))
+        ok_(all(row in _ROWS for row in actual))
+
+
+class TestUniformSample(TestCase):
+    @parameterized.expand([(1,), (10,), (1000,)])
+    def test(self, size):
+        with _write_csv([['key', 'value']] + _ROWS) as csv_file:
+            actual = uniform_sample(csv_file.name, size, random.Random(0))
+        ok_(0 < len(actual) <= size)
+        eq_(actual, sorted(actual, key=lambda row: int(row[0])))
+        ok_(all(row in _ROWS for row in actual))
+
+    @staticmethod
+    def test_header_only():
+        with _write_csv([['key', 'value']]) as csv_file:
+            eq_(uniform_sample(csv_file.name, 10, random.Random(0)), [])
+
+
+class TestStratifiedSample(TestCase):
+    @staticmethod
+    def test():
+        with _write_csv([['key', 'value']] + _ROWS) as csv_file:
+            actual = stratified_sample(csv_file.name, 9)
+        eq_(len(actual), 9)
+        eq_(actual[:3], _ROWS[:3])
+        eq_(actual[-3:], _ROWS[-3:])
+        ok_(all(row in _ROWS[3:-3] for row in actual[3:6]))
+
+    @staticmethod
+    def test_small_file():
+        with _write_csv([['key', 'value']] + _ROWS[:5]) as csv_file:
+            actual = stratified_sample(csv_file.name, 9)
+        eq_(actual, _ROWS[:5])
+
+    @staticmethod
+    @raises(RecordBoundaryError)
+    def test_quote_in_unquoted_field_raises_an_error():
+        csv_file = tempfile.NamedTemporaryFile(mode='w+', newline='')
+        with csv_file:
+            csv_file.write('key,value\n1,5"in\n' + '2,"x\ny"\n' * 100)
+            csv_file.flush()
+            stratified_sample(csv_file.name, 9)
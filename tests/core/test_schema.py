@@ -0,0 +1,24 @@
+from unittest import TestCase
+from io import StringIO
+
+from nose.tools import eq_
+from nose_parameterized import parameterized
+
+from csv2sql.core.schema import write_create_table_statement
+
+
+class TestWriteCreateTableStatement(TestCase):
+    @parameterized.expand([
+        ([], False, 'CREATE TABLE tbl (\n\n);\n'),
+        ([('a', 'INT'), ('b"', 'TEXT')], True,
+         'DROP TABLE IF EXISTS tbl;\n'
+         'CREATE TABLE tbl (\n'
+         '  <a> INT,\n'
+         '  <b"> TEXT\n'
+         ');\n'),
+    ])
+    def test(self, column_types, rebuild, expected):
+        stream = StringIO()
+        write_create_table_statement(
+            stream, 'tbl', column_types, '<{0}>'.format, rebuild)
+        eq_(stream.getvalue(), expected)
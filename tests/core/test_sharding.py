@@ -0,0 +1,109 @@
+from unittest import TestCase
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+
+from nose.tools import ok_, eq_
+
+from csv2sql.core.sharding import PartialOutput
+from csv2sql.core.sharding import ShardedOutput
+
+
+def _read_bytes(path):
+    with open(path, 'rb') as in_file:
+        return in_file.read()
+
+
+class TestShardedOutput(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.out_dir = os.path.join(self.temp_dir, 'out')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def _manifest(self):
+        with open(os.path.join(self.out_dir, 'manifest.json')) as in_file:
+            return json.load(in_file)
+
+    def _assert_described(self, description):
+        data = _read_bytes(os.path.join(self.out_dir, description['file']))
+        eq_(description['bytes'], len(data))
+        eq_(description['sha256'], hashlib.sha256(data).hexdigest())
+
+    def test(self):
+        with ShardedOutput(self.out_dir, 'tbl') as output:
+            output.schema.write('schema\n')
+            output.shard(1).write('shard 1\n')
+            output.shard(0).write('shard 0 あ\n')
+            output.add_rows(0, 2)
+            output.add_rows(1, 3)
+            output.add_rows(0, 1)
+            eq_(output.num_shards, 2)
+
+        manifest = self._manifest()
+        eq_(manifest['table'], 'tbl')
+        eq_(manifest['schema']['file'], 'schema.sql')
+        self._assert_described(manifest['schema'])
+        eq_([shard['file'] for shard in manifest['shards']],
+            ['data-00000.sql', 'data-00001.sql'])
+        eq_([shard['rows'] for shard in manifest['shards']], [3, 3])
+        for shard in manifest['shards']:
+            self._assert_described(shard)
+        eq_(_read_bytes(os.path.join(self.out_dir, 'data-00000.sql')),
+            'shard 0 あ\n'.encode('utf-8'))
+
+    def test_without_schema(self):
+        with ShardedOutput(self.out_dir, 'tbl') as output:
+            output.shard(0).write('shard 0\n')
+        eq_(self._manifest()['schema'], None)
+        ok_(not os.path.exists(os.path.join(self.out_dir, 'schema.sql')))
+
+    def test_no_manifest_on_error(self):
+        try:
+            with ShardedOutput(self.out_dir, 'tbl') as output:
+                output.shard(0).write('shard 0\n')
+                raise ValueError()
+        except ValueError:
+            pass
+        ok_(os.path.exists(os.path.join(self.out_dir, 'data-00000.sql')))
+        ok_(not os.path.exists(os.path.join(self.out_dir, 'manifest.json')))
+
+    def test_adopt(self):
+        with PartialOutput(self.out_dir, 'part-0') as part0:
+            part0.shard(0).write('part 0 shard 0\n')
+            part0.shard(1).write('part 0 shard 1\n')
+            part0.add_rows(0, 2)
+            part0.add_rows(1, 1)
+        with PartialOutput(self.out_dir, 'part-1') as part1:
+            part1.shard(0).write('part 1 shard 0\n')
+            part1.add_rows(0, 4)
+        with ShardedOutput(self.out_dir, 'tbl') as output:
+            output.shard(0).write('shard 0\n')
+            output.add_rows(0, 3)
+            output.adopt(part0.descriptions)
+            output.adopt(part1.descriptions)
+            eq_(output.num_shards, 4)
+
+        manifest = self._manifest()
+        eq_([shard['file'] for shard in manifest['shards']],
+            ['data-0000{0}.sql'.format(index) for index in range(4)])
+        eq_([shard['rows'] for shard in manifest['shards']], [3, 2, 1, 4])
+        for shard in manifest['shards']:
+            self._assert_described(shard)
+        eq_(_read_bytes(os.path.join(self.out_dir, 'data-00003.sql')),
+            b'part 1 shard 0\n')
+        eq_(sorted(os.listdir(self.out_dir)),
+            ['data-0000{0}.sql'.format(index) for index in range(4)] +
+            ['manifest.json'])
+
+    def test_partial_output_removed_on_error(self):
+        try:
+            with PartialOutput(self.out_dir, 'part-0') as part:
+                part.shard(0).write('part 0 shard 0\n')
+                raise ValueError()
+        except ValueError:
+            pass
+        eq_(os.listdir(self.out_dir), [])
@@ -0,0 +1,55 @@
+from unittest import TestCase
+import io
+import json
+
+from nose.tools import eq_, ok_
+
+from csv2sql.core.stats import Stats
+
+
+class TestStats(TestCase):
+    @staticmethod
+    def test_phase():
+        stats = Stats()
+        out_stream = io.StringIO()
+        with stats.phase('first'):
+            in_file = stats.count_input(io.StringIO('a,b\n1,2\n'))
+            eq_(list(stats.count_rows(in_file)), ['a,b\n', '1,2\n'])
+            stats.count_output(out_stream).write('xyz')
+        with stats.phase('second'):
+            eq_(stats.count_input(io.StringIO('abc')).read(2), 'ab')
+
+        phases = stats.report()['phases']
+        eq_([phase['phase'] for phase in phases], ['first', 'second'])
+        eq_([phase['rows'] for phase in phases], [2, 0])
+        eq_([phase['bytes_in'] for phase in phases], [8, 2])
+        eq_([phase['bytes_out'] for phase in phases], [3, 0])
+        ok_(all(phase['seconds'] >= 0.0 for phase in phases))
+        eq_(out_stream.getvalue(), 'xyz')
+
+    @staticmethod
+    def test_record_inference():
+        stats = Stats()
+        stats.record_inference(
+            ['int', 'float', 'text'], 10,
+            [('a', 0, [10, 0, 0]), ('b', 2, [3, 2, 7])])
+        inference = stats.report()['inference']
+        eq_(inference['rows'], 10)
+        eq_(inference['predicate_evaluations'], 22)
+        eq_([pattern['columns_reached'] for pattern in inference['patterns']],
+            [2, 1, 1])
+        eq_(inference['columns'][0]['typename'], 'int')
+        eq_(inference['columns'][0]['evaluations'], [10])
+        eq_(inference['columns'][1]['evaluations'], [3, 2, 7])
+
+    @staticmethod
+    def test_dump():
+        stats = Stats()
+        with stats.phase('phase'):
+            pass
+        stats.log()
+        out_stream = io.StringIO()
+        stats.dump(out_stream)
+        actual = json.loads(out_stream.getvalue())
+        eq_(actual['phases'][0]['phase'], 'phase')
+        eq_(actual['inference'], None)
@@ -0,0 +1,53 @@
+from unittest import TestCase
+import io
+import json
+
+from mock import patch
+from nose.tools import eq_, ok_
+
+from csv2sql.core.tracing import span
+from csv2sql.core.tracing import start_tracing
+from csv2sql.core.tracing import stop_tracing
+
+
+class TestTracing(TestCase):
+    def tearDown(self):
+        stop_tracing()
+
+    @staticmethod
+    def test_span_does_nothing_until_started():
+        with span('name', 'category') as actual:
+            eq_(actual, None)
+        ok_(span('name', 'category') is span('other', 'category'))
+
+    @staticmethod
+    def test_trace():
+        out_stream = io.StringIO()
+        start_tracing(out_stream)
+        with span('outer', 'phase'):
+            with span('inner', 'input', rows=2):
+                pass
+        stop_tracing()
+        with span('after', 'phase'):
+            pass
+
+        events = json.loads(out_stream.getvalue())
+        eq_([event['name'] for event in events],
+            ['process_name', 'inner', 'outer'])
+        inner, outer = events[1:]
+        eq_(inner['ph'], 'X')
+        eq_(inner['cat'], 'input')
+        eq_(inner['args'], {'rows': 2})
+        ok_('args' not in outer)
+        ok_(outer['ts'] <= inner['ts'])
+        ok_(inner['ts'] + inner['dur'] <= outer['ts'] + outer['dur'])
+
+    @staticmethod
+    def test_child_processes_are_not_traced():
+        out_stream = io.StringIO()
+        start_tracing(out_stream)
+        with patch('os.getpid', return_value=-1):
+            with span('child', 'phase'):
+                pass
+        stop_tracing()
+        eq_(len(json.loads(out_stream.getvalue())), 1)
@@ -0,0 +1,96 @@
+from unittest import TestCase
+import os
+import time
+import shutil
+import tempfile
+
+from nose.tools import ok_, eq_
+
+from csv2sql.core.type_cache import TypeCache
+from csv2sql.core.type_cache import file_fingerprint
+from csv2sql.core.type_cache import make_key
+
+
+class _TempDirTestCase(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def _write(self, file_name, data, mtime=None):
+        path = os.path.join(self.temp_dir, file_name)
+        with open(path, 'wb') as out_file:
+            out_file.write(data)
+        if mtime is not None:
+            os.utime(path, (mtime, mtime))
+        return path
+
+
+class TestMakeKey(_TempDirTestCase):
+    def test_same(self):
+        path = self._write('a.csv', b'a\n1\n', 1000000)
+        eq_(make_key([path], null=''), make_key([path], null=''))
+        eq_(file_fingerprint(path)['size'], 4)
+
+    def test_changed_settings(self):
+        path = self._write('a.csv', b'a\n1\n', 1000000)
+        ok_(make_key([path], null='') != make_key([path], null='NULL'))
+        ok_(make_key([path]) != make_key([path, path]))
+
+    def test_changed_files(self):
+        path = self._write('a.csv', b'a\n1\n' * 100000, 1000000)
+        key = make_key([path])
+        self._write('a.csv', b'a\n1\n' * 100000, 2000000)
+        ok_(make_key([path]) != key)
+        key = make_key([path])
+        self._write('a.csv', b'a\n2\n' + b'a\n1\n' * 99999, 2000000)
+        ok_(make_key([path]) != key)
+
+
+class TestTypeCache(_TempDirTestCase):
+    def test(self):
+        cache = TypeCache(os.path.join(self.temp_dir, 'cache'))
+        eq_(cache.lookup('key'), None)
+        ok_(cache.store('key', ['INTEGER', 'TEXT'], [0, None]))
+        eq_(cache.lookup('key'), {
+            'type_names': ['INTEGER', 'TEXT'],
+            'pattern_indexes': [0, None],
+        })
+        eq_(cache.lookup('other'), None)
+
+    def test_expired(self):
+        cache_dir = os.path.join(self.temp_dir, 'cache')
+        cache = TypeCache(cache_dir, max_age=60)
+        cache.store('old', ['TEXT'], [0])
+        past = time.time() - 120
+        os.utime(os.path.join(cache_dir, 'old.json'), (past, past))
+        eq_(cache.lookup('old'), None)
+        cache.store('new', ['TEXT'], [0])
+        eq_(os.listdir(cache_dir), ['new.json'])
+
+    def test_evicted_by_size(self):
+        cache_dir = os.path.join(self.temp_dir, 'cache')
+        TypeCache(cache_dir).store('size', ['TEXT'] * 5, [3] * 5)
+        size = os.path.getsize(os.path.join(cache_dir, 'size.json'))
+        os.remove(os.path.join(cache_dir, 'size.json'))
+
+        cache = TypeCache(cache_dir, max_bytes=size * 2)
+        for index, key in enumerate(('a', 'b', 'c')):
+            cache.store(key, ['TEXT'] * 5, [3] * 5)
+            mtime = time.time() - 100 + index
+            os.utime(os.path.join(cache_dir, key + '.json'), (mtime, mtime))
+        ok_(cache.lookup('a') is None)
+        ok_(cache.lookup('b') is not None)
+        ok_(cache.lookup('c') is not None)
+
+    def test_broken_entry(self):
+        cache_dir = os.path.join(self.temp_dir, 'cache')
+        os.mkdir(cache_dir)
+        with open(os.path.join(cache_dir, 'key.json'), 'w') as entry_file:
+            entry_file.write('{')
+        eq_(TypeCache(cache_dir).lookup('key'), None)
+
+    def test_unwritable(self):
+        path = self._write('file', b'')
+        ok_(not TypeCache(os.path.join(path, 'cache')).store('key', [], []))
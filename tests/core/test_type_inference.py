@@ -1,6 +1,6 @@
 from unittest import TestCase
 
-from mock import patch
+from mock import Mock, patch
 from nose.tools import eq_, raises
 from nose_parameterized import parameterized
 
@@ -10,6 +10,8 @@ from csv2sql.core.type_inference import interpret_predicate
 from csv2sql.core.type_inference import interpret_patterns
 from csv2sql.core.type_inference import TypeInferrer
 from csv2sql.core.type_inference import decide_types
+from csv2sql.core.type_inference import infer_transitions
+from csv2sql.core.type_inference import always_true
 
 
 class TestInterpretOnePredicate(TestCase):
@@ -140,6 +142,82 @@ class TestTypeInferer(TestCase):
             inferrer.read_item(item)
         eq_(inferrer.type_name, expected)
 
+    @raises(TypeInferenceError)
+    def test_read_items_no_matching_patterns_raises_an_error(self):
+        inferrer = TypeInferrer(self.patterns)
+        inferrer.read_items(['1', '0'])
+
+    @parameterized.expand([
+        ([],),
+        (['', '1', ''],),
+        (['1', '2', '1'],),
+        (['2', '1'],),
+        (['a', 'b', 'a', 'c'],),
+        (['c', 'a', 'b'],),
+        (['b', 'b', 'a'],),
+    ])
+    def test_read_items_equals_to_read_item(self, items):
+        patterns = [
+            ('a', lambda x: x == 'a'),
+            ('b', lambda x: x == 'b'),
+            ('ab', lambda x: x in 'ab'),
+            ('any', lambda _: True),
+        ]
+        expected = TypeInferrer(patterns)
+        for item in items:
+            expected.read_item(item)
+
+        actual = TypeInferrer(patterns)
+        actual.read_items(items)
+        eq_(actual.index, expected.index)
+        eq_(actual.type_name, expected.type_name)
+
+    @staticmethod
+    def test_cache_skips_accepted_values():
+        calls = []
+        patterns = [('type', lambda x: calls.append(x) or True)]
+        inferrer = TypeInferrer(patterns)
+        inferrer.read_items(['A', 'B', 'A'])
+        inferrer.read_items(['A', 'C'])
+        inferrer.read_item('B')
+        eq_(calls, ['A', 'B', 'C'])
+        eq_(inferrer.cache_hits, 2)
+        eq_(inferrer.cache_misses, 3)
+
+    @staticmethod
+    def test_cache_is_invalidated_when_the_pattern_advances():
+        patterns = [
+            ('a', lambda x: x == 'a'),
+            ('b', lambda x: x == 'b'),
+            ('ab', lambda x: x in 'ab'),
+        ]
+        inferrer = TypeInferrer(patterns)
+        inferrer.read_items(['a'])
+        inferrer.read_items(['b', 'a'])
+        eq_(inferrer.type_name, 'ab')
+
+    @staticmethod
+    def test_cache_disabled():
+        calls = []
+        patterns = [('type', lambda x: calls.append(x) or True)]
+        inferrer = TypeInferrer(patterns, cache_size=0)
+        inferrer.read_items(['A'])
+        inferrer.read_items(['A'])
+        eq_(calls, ['A', 'A'])
+
+    @staticmethod
+    def test_evaluations():
+        patterns = [
+            ('a', lambda x: x == 'a'),
+            ('b', lambda x: x == 'b'),
+            ('ab', lambda x: x in 'ab'),
+        ]
+        inferrer = TypeInferrer(patterns)
+        inferrer.read_items(['a', 'a'])
+        eq_(inferrer.evaluations, [1, 0, 0])
+        inferrer.read_items(['b', 'a'])
+        eq_(inferrer.evaluations, [3, 3, 1])
+
 
 class TestDecideTypes(TestCase):
     reader = [('V1', 'V2')]
@@ -155,3 +233,86 @@ class TestDecideTypes(TestCase):
         actual = decide_types(
             self.patterns, self.reader, self.column_names, **kwargs)
         eq_(actual, expected)
+
+    @staticmethod
+    def test_stops_reading_when_all_types_are_settled():
+        reader = iter([('1', 'a'), ('b', ''), ('c', '1'), ('d', '2')])
+        patterns = [
+            ('int', lambda x: x.isdigit()),
+            ('text', always_true),
+        ]
+        actual = decide_types(
+            patterns, reader, ('T1', 'T2'), index_types=[(1, 'index-type')],
+            chunk_size=1)
+        eq_(actual, ['text', 'index-type'])
+        eq_(list(reader), [('c', '1'), ('d', '2')])
+
+    @staticmethod
+    def test_reads_nothing_when_no_type_is_inferred():
+        reader = iter([('1', 'a')])
+        actual = decide_types(
+            [('text', always_true)], reader, ('T1', 'T2'),
+            index_types=[(1, 'index-type')])
+        eq_(actual, ['text', 'index-type'])
+        eq_(list(reader), [('1', 'a')])
+
+    @parameterized.expand([(1,), (2,), (3,), (100,)])
+    def test_chunk_size(self, chunk_size):
+        reader = [('1', 'a'), ('1.5', ''), ('1', 'b'), ('', 'c')]
+        patterns = [
+            ('int', lambda x: x.isdigit()),
+            ('float', lambda x: x.replace('.', '', 1).isdigit()),
+            ('text', lambda _: True),
+        ]
+        actual = decide_types(
+            patterns, reader, self.column_names, chunk_size=chunk_size)
+        eq_(actual, ['float', 'text'])
+
+    def test_stats(self):
+        stats = Mock()
+        reader = [('1', 'a'), ('1.5', '')]
+        patterns = [
+            ('int', lambda x: x.isdigit()),
+            ('float', lambda x: x.replace('.', '', 1).isdigit()),
+            ('text', lambda _: True),
+        ]
+        decide_types(patterns, reader, self.column_names, stats=stats)
+        stats.record_inference.assert_called_once_with(
+            ['int', 'float', 'text'], 2,
+            [('T1', 1, [3, 1, 0]), ('T2', 2, [2, 1, 1])])
+
+
+class TestInferTransitions(TestCase):
+    patterns = [
+        ('int', lambda x: x.isdigit()),
+        ('float', lambda x: x.replace('.', '', 1).isdigit() and '.' in x),
+        ('text', always_true),
+    ]
+
+    @parameterized.expand([
+        ([('1', '1.5')], [{0: 0, 1: 2, 2: 2}, {0: 1, 1: 1, 2: 2}]),
+        ([('', '')], [{0: 0, 1: 1, 2: 2}, {0: 0, 1: 1, 2: 2}]),
+    ])
+    def test(self, reader, expected):
+        actual = infer_transitions(
+            self.patterns, reader, ('T1', 'T2'), [0, 1, 2], chunk_size=1)
+        eq_(actual, expected)
+
+    def test_index_types(self):
+        actual = infer_transitions(
+            self.patterns, [('1', '1')], ('T1', 'T2'), [0],
+            index_types=[(0, 'fixed')])
+        eq_(actual, [None, {0: 0}])
+
+    def test_cache_memory(self):
+        with patch('csv2sql.core.type_inference.ValueCache') as value_cache:
+            infer_transitions(
+                self.patterns, [], ('T1', 'T2'), [0, 2],
+                cache_size=10, cache_memory=1000)
+        eq_(value_cache.call_args_list, [((10, 250),)] * 4)
+
+    @staticmethod
+    def test_error():
+        patterns = [('int', lambda x: x.isdigit())]
+        actual = infer_transitions(patterns, [('A',)], ('T1',), [0])
+        eq_(actual, [{0: 'Matching pattern is not found for: A'}])
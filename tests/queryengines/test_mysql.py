@@ -0,0 +1,126 @@
+from unittest import TestCase
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from nose.tools import eq_, ok_
+from nose_parameterized import parameterized
+
+from csv2sql.core.compilation import compile_patterns
+from csv2sql.core.type_inference import decide_types
+from csv2sql.queryengines.mysql import type_patterns
+from csv2sql.queryengines.mysql import write_schema_statement
+from csv2sql.queryengines.mysql import write_alter_column_type_statement
+from csv2sql.queryengines.mysql import write_data_file
+from csv2sql.queryengines.mysql import write_insert_statement
+
+
+class TestTypePatterns(TestCase):
+    @parameterized.expand([
+        (['1', '-128', '127'], 'TINYINT'),
+        (['1', '128'], 'SMALLINT'),
+        (['1', '-32769'], 'MEDIUMINT'),
+        (['1', '8388608'], 'INT'),
+        (['1', '2147483648'], 'BIGINT'),
+        (['1', '9223372036854775808'], 'VARCHAR(255)'),
+        (['1.5', '-2e3'], 'DOUBLE'),
+        (['1.5', 'nan'], 'VARCHAR(255)'),
+        (['012'], 'VARCHAR(255)'),
+        (['a' * 255], 'LONGTEXT'),
+    ])
+    def test(self, values, expected):
+        patterns = compile_patterns(type_patterns())
+        actual = decide_types(patterns, [[value] for value in values], ['a'])
+        eq_(actual, [expected])
+
+
+class TestWriteSchemaStatement(TestCase):
+    @staticmethod
+    def test():
+        stream = StringIO()
+        write_schema_statement(
+            stream, 'tbl', [('a', 'INT'), ('b`c', 'DOUBLE')], True)
+        eq_(stream.getvalue(),
+            'DROP TABLE IF EXISTS tbl;\n'
+            'CREATE TABLE tbl (\n'
+            '  `a` INT,\n'
+            '  `b``c` DOUBLE\n'
+            ');\n')
+
+
+class TestWriteAlterColumnTypeStatement(TestCase):
+    @staticmethod
+    def test():
+        stream = StringIO()
+        write_alter_column_type_statement(stream, 'tbl', 'b`c', 'BIGINT')
+        eq_(stream.getvalue(),
+            'ALTER TABLE tbl MODIFY COLUMN `b``c` BIGINT;\n')
+
+
+class TestWriteDataFile(TestCase):
+    @parameterized.expand([
+        ([], '', ''),
+        ([['1', 'A']], '', '1\tA\n'),
+        ([['', 'NULL']], '', '\\N\tNULL\n'),
+        ([['', 'NULL']], 'NULL', '\t\\N\n'),
+        ([['\\N']], '', '\\\\N\n'),
+        ([['A\tB', 'C\nD', 'E\r\nF', 'G\\H', 'I\0J']], '',
+         'A\\tB\tC\\nD\tE\\r\\nF\tG\\\\H\tI\\0J\n'),
+    ])
+    def test(self, rows, null_value, expected):
+        stream = StringIO()
+        eq_(write_data_file(stream, rows, null_value), len(rows))
+        eq_(stream.getvalue(), expected)
+
+
+class TestWriteInsertStatement(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_load_data(self):
+        data_file = os.path.join(self.temp_dir, 'data.tsv')
+        stream = StringIO()
+        write_insert_statement(
+            stream, 'tbl', [['1', ''], ['2', 'A\tB']], '', True,
+            data_file=data_file)
+        eq_(stream.getvalue(),
+            'TRUNCATE TABLE tbl;\n'
+            'LOAD DATA LOCAL INFILE \'{0}\' INTO TABLE tbl\n'
+            '  CHARACTER SET utf8mb4\n'
+            '  FIELDS TERMINATED BY \'\\t\' ESCAPED BY \'\\\\\'\n'
+            '  LINES TERMINATED BY \'\\n\';\n'.format(data_file))
+        with open(data_file, newline='') as data_stream:
+            eq_(data_stream.read(), '1\t\\N\n2\tA\\tB\n')
+
+    @staticmethod
+    def test_insert():
+        stream = StringIO()
+        write_insert_statement(
+            stream, 'tbl', [['1', ''], ['2', 'it\'s\\']], '')
+        eq_(stream.getvalue(),
+            'INSERT INTO tbl VALUES\n'
+            '(\'1\', NULL),\n'
+            '(\'2\', \'it\\\'s\\\\\');\n')
+
+    @parameterized.expand([
+        ({'rows_per_statement': 1}, [1, 1, 1, 1, 1]),
+        ({'rows_per_statement': 2}, [2, 2, 1]),
+        ({'max_statement_bytes': 60}, [2, 2, 1]),
+        ({'max_statement_bytes': 1}, [1, 1, 1, 1, 1]),
+        ({'rows_per_statement': 3, 'max_statement_bytes': 60}, [2, 2, 1]),
+    ])
+    def test_insert_limits(self, kwargs, expected):
+        rows = [['{0:08d}'.format(index)] for index in range(5)]
+        stream = StringIO()
+        write_insert_statement(stream, 'tbl', rows, '', **kwargs)
+
+        statements = stream.getvalue().split(';\n')[:-1]
+        eq_([statement.count('(') for statement in statements], expected)
+        max_bytes = kwargs.get('max_statement_bytes')
+        if max_bytes and max(expected) > 1:
+            for statement in statements:
+                ok_(len(statement) + 2 <= max_bytes)
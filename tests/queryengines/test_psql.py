@@ -0,0 +1,419 @@
+from unittest import TestCase
+import csv
+import struct
+import threading
+from io import BytesIO, StringIO
+
+from mock import patch
+from nose.tools import ok_, eq_, raises
+from nose_parameterized import parameterized
+
+from csv2sql.core.error import LoadingError
+from csv2sql.core.error import SerializationError
+from csv2sql.queryengines.psql import WriterWrapper
+from csv2sql.queryengines.psql import write_alter_column_type_statement
+from csv2sql.queryengines.psql import binary_encoder
+from csv2sql.queryengines.psql import write_binary_data
+from csv2sql.queryengines.psql import write_binary_insert_statement
+from csv2sql.queryengines.psql import load
+from csv2sql.queryengines.psql import write_insert_statement
+from csv2sql.queryengines.psql import write_batched_insert_statement
+from csv2sql.queryengines.psql import write_raw_insert_statement
+from csv2sql.queryengines.psql import write_truncate_statement
+
+
+def _write_row_by_row(rows):
+    stream = StringIO()
+    writer = WriterWrapper(stream, dialect='excel')
+    for row in rows:
+        writer.writerow(row)
+    return stream.getvalue()
+
+
+class TestWriterWrapper(TestCase):
+    @parameterized.expand([
+        ([['\\.']], '"\\."\r\n'),
+        ([['A', '\\.']], 'A,\\.\r\n'),
+        ([['\\.', 'A']], '\\.,A\r\n'),
+        ([['A'], ['\\.'], ['B']], 'A\r\n"\\."\r\nB\r\n'),
+    ])
+    def test_writerow(self, rows, expected):
+        eq_(_write_row_by_row(rows), expected)
+
+    @parameterized.expand([
+        ([],),
+        ([['A', 'B']] * 10,),
+        ([['\\.']],),
+        ([['A'], ['\\.'], ['B'], ['\\.']],),
+        ([['A\r\n\\.\r\nB'], ['C']],),
+        ([['A,\\.'], ['\\.', '']],),
+        ([[''], ['"'], ['A\nB', 'C\rD']],),
+    ])
+    def test_writerows_equals_to_writerow(self, rows):
+        for batch_size in (1, 2, 100):
+            stream = StringIO()
+            writer = WriterWrapper(
+                stream, dialect='excel', batch_size=batch_size)
+            writer.writerows(iter(rows))
+            eq_(stream.getvalue(), _write_row_by_row(rows))
+
+
+def _batch(index, first_record, data):
+    return (
+        '-- Batch {0}, from the record {1}.\n'
+        'BEGIN;\n'
+        'COPY tbl FROM STDIN WITH NULL \'\' CSV;\n'
+        '{2}'
+        '\\.\n'
+        'COMMIT;\n').format(index, first_record, data)
+
+
+_STOP_ON_ERROR = '\\set ON_ERROR_STOP on\n'
+
+
+class TestWriteBatchedInsertStatement(TestCase):
+    _ROWS = [['1', 'A'], ['2', '\\.'], ['3', 'C']]
+
+    @parameterized.expand([
+        ({'max_rows': 2}, False,
+         _STOP_ON_ERROR +
+         _batch(0, 1, '1,A\r\n2,\\.\r\n') + _batch(1, 3, '3,C\r\n')),
+        ({'max_rows': 2}, True,
+         _STOP_ON_ERROR + 'TRUNCATE TABLE tbl;\n' +
+         _batch(0, 1, '1,A\r\n2,\\.\r\n') + _batch(1, 3, '3,C\r\n')),
+        ({'max_bytes': 4}, False,
+         _STOP_ON_ERROR + _batch(0, 1, '1,A\r\n') +
+         _batch(1, 2, '2,\\.\r\n') + _batch(2, 3, '3,C\r\n')),
+        ({'max_rows': 1, 'resume_from': 2}, True,
+         _STOP_ON_ERROR + _batch(2, 3, '3,C\r\n')),
+        ({'max_rows': 1, 'resume_from': 3}, True, _STOP_ON_ERROR),
+    ])
+    def test(self, kwargs, rebuild, expected):
+        stream = StringIO()
+        write_batched_insert_statement(
+            stream, 'tbl', self._ROWS, '', rebuild, **kwargs)
+        eq_(stream.getvalue(), expected)
+
+    @staticmethod
+    def test_escapes_end_of_data():
+        stream = StringIO()
+        write_batched_insert_statement(
+            stream, 'tbl', [['\\.']], '', max_rows=1)
+        eq_(stream.getvalue(), _STOP_ON_ERROR + _batch(0, 1, '"\\."\r\n'))
+
+
+class TestWriteRawInsertStatement(TestCase):
+    @parameterized.expand([
+        ([], ''),
+        (['1,2\n', '3,4\n'], '1,2\n3,4\n'),
+        (['1,2\n3,4'], '1,2\n3,4\n'),
+        (['1,2\n\\.\n3,4\n'], '1,2\n"\\."\n3,4\n'),
+        (['1,2\n', '\\.\n3,4\n', '5,6\n'], '1,2\n"\\."\n3,4\n5,6\n'),
+        (['\\.'], '"\\."\n'),
+        (['"a\n\\.\nb",c\n'], '"a\n\\.\nb",c\n'),
+    ])
+    def test(self, blocks, expected_data):
+        actual = StringIO()
+        write_raw_insert_statement(actual, 'tbl', blocks, 'NULL', True)
+        eq_(actual.getvalue(),
+            'TRUNCATE TABLE tbl;\n'
+            'COPY tbl FROM STDIN WITH NULL \'NULL\' CSV;\n' +
+            expected_data + '\\.\n')
+
+
+_BINARY_HEADER = b'PGCOPY\n\xff\r\n\x00' + b'\x00' * 8
+_BINARY_TRAILER = b'\xff\xff'
+
+
+class TestBinaryEncoder(TestCase):
+    @parameterized.expand([
+        ('SMALLINT', '-2', b'\x00\x00\x00\x02\xff\xfe'),
+        ('INTEGER', '1', b'\x00\x00\x00\x04\x00\x00\x00\x01'),
+        ('int4', ' 1 ', b'\x00\x00\x00\x04\x00\x00\x00\x01'),
+        ('BIGINT', '1', b'\x00\x00\x00\x08' + b'\x00' * 7 + b'\x01'),
+        ('REAL', '1.5', b'\x00\x00\x00\x04' + struct.pack('!f', 1.5)),
+        ('DOUBLE PRECISION', '-0.25',
+         b'\x00\x00\x00\x08' + struct.pack('!d', -0.25)),
+        ('FLOAT8', ' .5e+1 ', b'\x00\x00\x00\x08' + struct.pack('!d', 5.0)),
+        ('FLOAT8', '-Infinity',
+         b'\x00\x00\x00\x08' + struct.pack('!d', float('-inf'))),
+        ('double  precision', 'inf',
+         b'\x00\x00\x00\x08' + struct.pack('!d', float('inf'))),
+        ('BOOLEAN', 'True', b'\x00\x00\x00\x01\x01'),
+        ('BOOLEAN', 'f', b'\x00\x00\x00\x01\x00'),
+        ('TEXT', '', b'\x00\x00\x00\x00'),
+        ('VARCHAR(255)', '\u3042', b'\x00\x00\x00\x03\xe3\x81\x82'),
+        ('character varying', 'a', b'\x00\x00\x00\x01a'),
+    ])
+    def test(self, type_name, value, expected):
+        eq_(binary_encoder(type_name)(value), expected)
+
+    @parameterized.expand([
+        ('INTEGER', '1_000'),
+        ('INTEGER', '\u0661'),
+        ('BIGINT', '1.0'),
+        ('REAL', '1_0.5'),
+        ('DOUBLE PRECISION', '0x1p3'),
+        ('DOUBLE PRECISION', '-nan'),
+    ])
+    @raises(ValueError)
+    def test_invalid(self, type_name, value):
+        binary_encoder(type_name)(value)
+
+    @parameterized.expand([
+        ('NUMERIC',),
+        ('DATE',),
+        ('INTEGER[]',),
+    ])
+    @raises(SerializationError)
+    def test_unsupported(self, type_name):
+        binary_encoder(type_name)
+
+
+class TestWriteBinaryData(TestCase):
+    @staticmethod
+    def test_empty():
+        stream = BytesIO()
+        write_binary_data(stream, [], ['INTEGER'], '')
+        eq_(stream.getvalue(), _BINARY_HEADER + _BINARY_TRAILER)
+
+    @staticmethod
+    def test_rows():
+        stream = BytesIO()
+        write_binary_data(
+            stream, [['1', 'A'], ['NULL', '']], ['INTEGER', 'TEXT'], 'NULL')
+        eq_(stream.getvalue(), b''.join([
+            _BINARY_HEADER,
+            b'\x00\x02',
+            b'\x00\x00\x00\x04\x00\x00\x00\x01',
+            b'\x00\x00\x00\x01A',
+            b'\x00\x02',
+            b'\xff\xff\xff\xff',
+            b'\x00\x00\x00\x00',
+            _BINARY_TRAILER,
+        ]))
+
+    @parameterized.expand([
+        ([['A']], ['INTEGER']),
+        ([['1.5']], ['INTEGER']),
+        ([['2147483648']], ['INTEGER']),
+        ([['1_000']], ['INTEGER']),
+        ([['1e39']], ['REAL']),
+        ([['1', '2']], ['INTEGER']),
+        ([['1']], ['INTEGER', 'INTEGER']),
+    ])
+    @raises(SerializationError)
+    def test_invalid(self, rows, type_names):
+        write_binary_data(BytesIO(), rows, type_names, '')
+
+
+class TestWriteAlterColumnTypeStatement(TestCase):
+    @staticmethod
+    def test():
+        stream = StringIO()
+        write_alter_column_type_statement(
+            stream, 'tbl', 'a', 'DOUBLE PRECISION')
+        eq_(stream.getvalue(),
+            'ALTER TABLE tbl ALTER COLUMN "a" TYPE DOUBLE PRECISION;\n')
+
+
+class TestWriteTruncateStatement(TestCase):
+    @staticmethod
+    def test():
+        stream = StringIO()
+        write_truncate_statement(stream, 'tbl')
+        eq_(stream.getvalue(), 'TRUNCATE TABLE tbl;\n')
+
+
+class TestWriteBinaryInsertStatement(TestCase):
+    @parameterized.expand([
+        ('data.bin', False,
+         "\\copy tbl FROM 'data.bin' WITH (FORMAT binary)\n"),
+        ("it's.bin", False,
+         "\\copy tbl FROM 'it''s.bin' WITH (FORMAT binary)\n"),
+        ('data.bin', True,
+         'TRUNCATE TABLE tbl;\n'
+         "\\copy tbl FROM 'data.bin' WITH (FORMAT binary)\n"),
+    ])
+    def test(self, data_path, rebuild, expected):
+        stream = StringIO()
+        write_binary_insert_statement(stream, 'tbl', data_path, rebuild)
+        eq_(stream.getvalue(), expected)
+
+
+class _FakePsycopg2:
+    """A fake of psycopg2 recording the committed data."""
+
+    class Error(Exception):
+        pass
+
+    def __init__(self, fail_on=None):
+        self.lock = threading.Lock()
+        self.fail_on = fail_on
+        self.statements = []
+        self.copied = []
+        self.events = []
+
+    def connect(self, database):
+        eq_(database, 'dbname=test')
+        return _FakeConnection(self)
+
+
+class _FakeCursor:
+    def __init__(self, connection):
+        self._connection = connection
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def execute(self, statement):
+        self._connection.pending_statements.append(statement)
+
+    def copy_expert(self, query, reader):
+        data = b''
+        while True:
+            chunk = reader.read(7)
+            if not chunk:
+                break
+            data += chunk
+        server = self._connection.server
+        if server.fail_on is not None and server.fail_on in data:
+            raise server.Error('Invalid data.')
+        self._connection.pending_copied.append((query, data))
+
+    def close(self):
+        pass
+
+
+class _FakeConnection:
+    def __init__(self, server):
+        self.server = server
+        self.pending_statements = []
+        self.pending_copied = []
+
+    def set_client_encoding(self, encoding):
+        eq_(encoding, 'UTF8')
+
+    def cursor(self):
+        return _FakeCursor(self)
+
+    @staticmethod
+    def xid(format_id, gtrid, bqual):
+        return (format_id, gtrid, bqual)
+
+    def _record(self, event):
+        with self.server.lock:
+            self.server.events.append(event)
+
+    def tpc_begin(self, xid):
+        self._record(('tpc_begin', xid[1]))
+
+    def tpc_prepare(self):
+        self._record(('tpc_prepare',))
+
+    def tpc_commit(self):
+        self._record(('tpc_commit',))
+        self.commit()
+
+    def tpc_rollback(self):
+        self._record(('tpc_rollback',))
+        self.rollback()
+
+    def commit(self):
+        with self.server.lock:
+            self.server.statements.extend(self.pending_statements)
+            self.server.copied.extend(self.pending_copied)
+        self.pending_statements = []
+        self.pending_copied = []
+
+    def rollback(self):
+        self.pending_statements = []
+        self.pending_copied = []
+
+    def close(self):
+        self.rollback()
+
+
+class TestLoad(TestCase):
+    _COLUMN_TYPES = [('a', 'INTEGER'), ('b', 'TEXT')]
+
+    @staticmethod
+    def _rows(num_rows):
+        return [
+            [str(index), 'x{0}'.format(index)] for index in range(num_rows)]
+
+    @parameterized.expand([
+        (1, 1, 0),
+        (1, 10, 5),
+        (3, 2, 25),
+        (4, 1000, 3),
+    ])
+    def test(self, streams, batch_size, num_rows):
+        server = _FakePsycopg2()
+        with patch('csv2sql.queryengines.psql.psycopg2', server):
+            actual = load(
+                'dbname=test', 'tbl', self._COLUMN_TYPES,
+                self._rows(num_rows), 'NULL', rebuild=True,
+                streams=streams, batch_size=batch_size, indexes=['a'])
+        eq_(actual, num_rows)
+
+        ok_(server.statements[0].startswith('DROP TABLE IF EXISTS tbl;'))
+        eq_(server.statements[1:],
+            ['CREATE INDEX "tbl_a_index" ON tbl ("a")'])
+        for query, _ in server.copied:
+            eq_(query, 'COPY tbl FROM STDIN WITH NULL \'NULL\' CSV')
+        copied_rows = sorted(
+            line.split(',') for _, data in server.copied
+            for line in data.decode('utf-8').splitlines())
+        eq_(copied_rows, sorted(self._rows(num_rows)))
+
+    def test_deferred_index(self):
+        server = _FakePsycopg2()
+        with patch('csv2sql.queryengines.psql.psycopg2', server):
+            load('dbname=test', 'tbl', self._COLUMN_TYPES, self._rows(3), '',
+                 streams=2, indexes=['a'], defer_index=True)
+        eq_(len(server.statements), 2)
+        ok_(server.statements[0].startswith('CREATE TABLE tbl'))
+        eq_(server.statements[1], 'CREATE INDEX "tbl_a_index" ON tbl ("a")')
+
+    def test_two_phase(self):
+        server = _FakePsycopg2()
+        with patch('csv2sql.queryengines.psql.psycopg2', server):
+            load('dbname=test', 'tbl', self._COLUMN_TYPES, self._rows(10), '',
+                 streams=3, batch_size=1, two_phase=True)
+        event_names = [event[0] for event in server.events]
+        eq_(event_names.count('tpc_begin'), 3)
+        eq_(event_names.count('tpc_prepare'), 3)
+        eq_(event_names[-3:], ['tpc_commit'] * 3)
+        eq_(len(set(event[1] for event in server.events
+                    if event[0] == 'tpc_begin')), 3)
+
+    @parameterized.expand([
+        (False,),
+        (True,),
+    ])
+    def test_failure_rolls_back_all_streams(self, two_phase):
+        server = _FakePsycopg2(fail_on=b'x7')
+        with patch('csv2sql.queryengines.psql.psycopg2', server):
+            try:
+                load('dbname=test', 'tbl', self._COLUMN_TYPES,
+                     self._rows(20), '', streams=3, batch_size=2,
+                     two_phase=two_phase)
+            except LoadingError:
+                pass
+            else:
+                raise AssertionError('LoadingError is not raised.')
+        eq_(len(server.statements), 1)
+        eq_(server.copied, [])
+        if two_phase:
+            ok_(('tpc_rollback',) in server.events)
+            ok_(('tpc_commit',) not in server.events)
+
+    @staticmethod
+    @raises(LoadingError)
+    def test_without_psycopg2():
+        with patch('csv2sql.queryengines.psql.psycopg2', None):
+            load('dbname=test', 'tbl', [('a', 'TEXT')], [], '')
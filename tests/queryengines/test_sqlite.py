@@ -0,0 +1,110 @@
+from unittest import TestCase
+import os
+import shutil
+import sqlite3
+import tempfile
+from io import StringIO
+
+from nose.tools import eq_, raises
+from nose_parameterized import parameterized
+
+from csv2sql.core.compilation import compile_patterns
+from csv2sql.core.error import LoadingError
+from csv2sql.core.type_inference import decide_types
+from csv2sql.queryengines.sqlite import type_patterns
+from csv2sql.queryengines.sqlite import write_schema_statement
+from csv2sql.queryengines.sqlite import write_insert_statement
+from csv2sql.queryengines.sqlite import load
+
+
+_COLUMN_TYPES = [('a', 'INTEGER'), ('b"c', 'REAL'), ('d', 'TEXT')]
+_ROWS = [['1', '2.5', 'x'], ['-3', '', 'it\'s'], ['', '1e3', '']]
+_EXPECTED = [(1, 2.5, 'x'), (-3, None, 'it\'s'), (None, 1000.0, None)]
+
+
+class TestTypePatterns(TestCase):
+    @parameterized.expand([
+        (['1', '-9223372036854775808'], 'INTEGER'),
+        (['1', '9223372036854775808'], 'TEXT'),
+        (['1.5', 'nan'], 'REAL'),
+        (['012'], 'TEXT'),
+        (['a'], 'TEXT'),
+    ])
+    def test(self, values, expected):
+        patterns = compile_patterns(type_patterns())
+        actual = decide_types(patterns, [[value] for value in values], ['a'])
+        eq_(actual, [expected])
+
+
+class TestWriteStatements(TestCase):
+    @parameterized.expand([
+        (False,),
+        (True,),
+    ])
+    def test_executable(self, rebuild):
+        stream = StringIO()
+        write_schema_statement(stream, 'tbl', _COLUMN_TYPES, rebuild)
+        write_insert_statement(stream, 'tbl', _ROWS, '', rebuild)
+
+        connection = sqlite3.connect(':memory:')
+        connection.executescript(stream.getvalue())
+        eq_(connection.execute('SELECT * FROM tbl').fetchall(), _EXPECTED)
+
+    @staticmethod
+    def test_many_rows():
+        rows = [[str(index)] for index in range(1234)]
+        stream = StringIO()
+        write_schema_statement(stream, 'tbl', [('a', 'INTEGER')])
+        write_insert_statement(stream, 'tbl', rows, '')
+
+        connection = sqlite3.connect(':memory:')
+        connection.executescript(stream.getvalue())
+        eq_(connection.execute('SELECT SUM(a) FROM tbl').fetchone(),
+            (sum(range(1234)),))
+
+
+class TestLoad(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.database = os.path.join(self.temp_dir, 'test.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def _fetch(self, query):
+        connection = sqlite3.connect(self.database)
+        try:
+            return connection.execute(query).fetchall()
+        finally:
+            connection.close()
+
+    @parameterized.expand([
+        ({},),
+        ({'batch_size': 1},),
+        ({'batch_size': 2, 'journal_mode': 'WAL', 'synchronous': 'OFF',
+          'cache_size': -1024},),
+        ({'indexes': ['a', 'b"c']},),
+        ({'indexes': ['a'], 'defer_index': True},),
+    ])
+    def test(self, kwargs):
+        num_rows = load(
+            self.database, 'tbl', _COLUMN_TYPES, _ROWS, '', **kwargs)
+        eq_(num_rows, 3)
+        eq_(self._fetch('SELECT * FROM tbl'), _EXPECTED)
+        eq_(len(self._fetch(
+            'SELECT name FROM sqlite_master WHERE type = \'index\'')),
+            len(kwargs.get('indexes', [])))
+
+    def test_rebuild(self):
+        load(self.database, 'tbl', _COLUMN_TYPES, _ROWS, '')
+        load(self.database, 'tbl', _COLUMN_TYPES, _ROWS[:1], '', rebuild=True)
+        eq_(self._fetch('SELECT * FROM tbl'), _EXPECTED[:1])
+
+    @raises(LoadingError)
+    def test_existing_table(self):
+        load(self.database, 'tbl', _COLUMN_TYPES, _ROWS, '')
+        load(self.database, 'tbl', _COLUMN_TYPES, _ROWS, '')
+
+    @raises(LoadingError)
+    def test_invalid_row(self):
+        load(self.database, 'tbl', _COLUMN_TYPES, [['1']], '')
@@ -1,8 +1,19 @@
 from unittest import TestCase
+import io
+import os
+import gzip
+import json
+import shutil
+import tempfile
 
+from mock import patch
 from nose.tools import ok_, eq_, raises
 from nose_parameterized import parameterized
 
+from csv2sql.core.error import TypeInferenceError
+from csv2sql.core.records import read_record_blocks
+from csv2sql.main import _read_column_types
+from csv2sql.main import _run_command
 from csv2sql.main import parse_args
 
 
@@ -24,11 +35,474 @@ class ParseArgs(TestCase):
         ok_(hasattr(actual, 'rebuild'))
         ok_(hasattr(actual, 'column_type'))
         ok_(hasattr(actual, 'lines_for_inference'))
+        ok_(hasattr(actual, 'sampling'))
+        ok_(hasattr(actual, 'sampling_seed'))
         ok_(hasattr(actual, 'command'))
         ok_(hasattr(actual, 'query_engine'))
         ok_(hasattr(actual, 'patterns'))
         ok_(hasattr(actual, 'index_types'))
 
+    @parameterized.expand([
+        ('all',),
+        ('schema',),
+    ])
+    def test_jobs(self, command_name):
+        actual = parse_args([command_name, '-j', '4', 'table-name'])
+        eq_(actual.jobs, 4)
+
+    @staticmethod
+    def test_spill_options():
+        actual = parse_args([
+            'all', '--buffer-size', '1024', '--spill-dir', '/tmp',
+            '--spill-compression', 'zlib', 'table-name'])
+        eq_(actual.buffer_size, 1024)
+        eq_(actual.spill_dir, '/tmp')
+        eq_(actual.spill_compression, 'zlib')
+
+    @staticmethod
+    def test_copy_format():
+        actual = parse_args([
+            'all', '--copy-format', 'binary', '--data-file', 'data.bin',
+            'table-name'])
+        eq_(actual.copy_format, 'binary')
+        eq_(actual.data_file, 'data.bin')
+
+    @staticmethod
+    @raises(SystemExit)
+    def test_binary_copy_format_without_data_file():
+        parse_args(['all', '--copy-format', 'binary', 'table-name'])
+
+    @parameterized.expand([
+        (['--data-file', 'data.csv'],),
+        (['-q', 'sqlite', '--data-file', 'data.csv'],),
+    ])
+    @raises(SystemExit)
+    def test_unsupported_data_file(self, data_file_args):
+        parse_args(['all'] + data_file_args + ['table-name'])
+
+    @parameterized.expand([
+        ('all',),
+        ('data',),
+    ])
+    def test_mysql_data_options(self, command_name):
+        actual = parse_args([
+            command_name, '-q', 'mysql', '--data-file', 'data.tsv',
+            '--rows-per-statement', '100', '--max-statement-bytes', '4096',
+            'table-name'])
+        eq_(actual.data_file, 'data.tsv')
+        eq_(actual.rows_per_statement, 100)
+        eq_(actual.max_statement_bytes, 4096)
+
+    @parameterized.expand([
+        ('all',),
+        ('data',),
+    ])
+    def test_sharding(self, command_name):
+        actual = parse_args([
+            command_name, '--out-dir', 'out', '--shards', '4',
+            '--shard-rows', '100', '--shard-bytes', '4096', 'table-name'])
+        eq_(actual.out_dir, 'out')
+        eq_(actual.shards, 4)
+        eq_(actual.shard_rows, 100)
+        eq_(actual.shard_bytes, 4096)
+
+    @staticmethod
+    def test_sharded_rebuild():
+        temp_dir = tempfile.mkdtemp()
+        in_path = os.path.join(temp_dir, 'in.csv')
+        out_dir = os.path.join(temp_dir, 'out')
+        with open(in_path, 'w') as csv_file:
+            csv_file.write('a\n1\n2\n')
+        try:
+            args = parse_args([
+                'data', '-i', in_path, '--out-dir', out_dir, '--shards', '2',
+                '-r', 'tbl'])
+            args.command(args)
+            args.in_file.close()
+            with open(os.path.join(out_dir, 'schema.sql')) as schema_file:
+                eq_(schema_file.read(), 'TRUNCATE TABLE tbl;\n')
+        finally:
+            shutil.rmtree(temp_dir)
+
+    @parameterized.expand([
+        (['--shards', '4'],),
+        (['--out-dir', 'out'],),
+        (['--out-dir', 'out', '--shards', '0'],),
+        (['--out-dir', 'out', '--shards', '4', '--passthrough'],),
+        (['--out-dir', 'out', '--shards', '4', '--data-file', 'data.tsv'],),
+    ])
+    @raises(SystemExit)
+    def test_invalid_sharding(self, sharding_args):
+        parse_args(['data', 'table-name'] + sharding_args)
+
+    @staticmethod
+    def test_batching():
+        actual = parse_args([
+            'data', '--batch-rows', '100', '--batch-bytes', '4096',
+            '--resume-from-batch', '3', 'table-name'])
+        eq_(actual.batch_rows, 100)
+        eq_(actual.batch_bytes, 4096)
+        eq_(actual.resume_from_batch, 3)
+
+    @parameterized.expand([
+        (['--resume-from-batch', '3'],),
+        (['--batch-rows', '0'],),
+        (['--batch-rows', '1', '--resume-from-batch', '-1'],),
+        (['--batch-rows', '1', '--passthrough'],),
+        (['--batch-rows', '1', '--out-dir', 'out', '--shards', '2'],),
+        (['--batch-rows', '1', '-q', 'sqlite'],),
+    ])
+    @raises(SystemExit)
+    def test_invalid_batching(self, batching_args):
+        parse_args(['data', 'table-name'] + batching_args)
+
+    @staticmethod
+    def test_compressed_files():
+        temp_dir = tempfile.mkdtemp()
+        try:
+            in_path = os.path.join(temp_dir, 'in.csv.gz')
+            out_path = os.path.join(temp_dir, 'out.sql.gz')
+            with open(in_path, 'wb') as raw_file:
+                raw_file.write(gzip.compress(b'a,b\n1,2\n'))
+
+            actual = parse_args(
+                ['all', '-i', in_path, '-o', out_path, 'table-name'])
+            eq_(actual.in_file.read(), 'a,b\n1,2\n')
+            actual.out_file.write('SELECT 1;\n')
+            actual.in_file.close()
+            actual.out_file.close()
+            with open(out_path, 'rb') as raw_file:
+                eq_(gzip.decompress(raw_file.read()), b'SELECT 1;\n')
+        finally:
+            shutil.rmtree(temp_dir)
+
+    @parameterized.expand([
+        ('all',),
+        ('schema',),
+        ('data',),
+    ])
+    def test_in_files(self, command_name):
+        temp_dir = tempfile.mkdtemp()
+        try:
+            paths = []
+            for file_name in ('b.csv', 'a.csv', 'c.csv'):
+                paths.append(os.path.join(temp_dir, file_name))
+                with open(paths[-1], 'w') as csv_file:
+                    csv_file.write('a,b\n{0},2\n'.format(file_name))
+
+            actual = parse_args([
+                command_name, '--in-files', os.path.join(temp_dir, '[ab]*'),
+                '--in-files', paths[2], '-j', '2', 'table-name'])
+            eq_(actual.in_files, [paths[1], paths[0], paths[2]])
+            eq_(actual.jobs, 2)
+            eq_(actual.in_file.read(),
+                'a,b\na.csv,2\nb.csv,2\nc.csv,2\n')
+            actual.in_file.close()
+        finally:
+            shutil.rmtree(temp_dir)
+
+    @parameterized.expand([
+        (['--in-files', '/nonexistent/*.csv'],),
+        (['--in-files', __file__, '-i', __file__],),
+        (['--in-files', __file__, '--sampling', 'uniform'],),
+    ])
+    @raises(SystemExit)
+    def test_invalid_in_files(self, in_files_args):
+        parse_args(['all'] + in_files_args + ['table-name'])
+
+    @staticmethod
+    def test_type_cache():
+        temp_dir = tempfile.mkdtemp()
+        try:
+            in_path = os.path.join(temp_dir, 'in.csv')
+            cache_dir = os.path.join(temp_dir, 'cache')
+            with open(in_path, 'w') as csv_file:
+                csv_file.write('a,b\n1,x\n')
+            arguments = [
+                'schema', '-i', in_path, '--cache-dir', cache_dir,
+                '--cache-max-age', '60', '--cache-max-bytes', '1024',
+                'table-name']
+
+            args = parse_args(arguments)
+            eq_(args.cache_max_age, 60)
+            eq_(args.cache_max_bytes, 1024)
+            eq_(_read_column_types(args, args.in_file),
+                (['a', 'b'], ['INTEGER', 'VARCHAR(255)']))
+            args.in_file.close()
+
+            args = parse_args(arguments)
+            with patch('csv2sql.main.decide_types') as decide_types:
+                eq_(_read_column_types(args, args.in_file),
+                    (['a', 'b'], ['INTEGER', 'VARCHAR(255)']))
+            ok_(not decide_types.called)
+            args.in_file.close()
+
+            args = parse_args(arguments + ['--no-cache'])
+            with patch('csv2sql.main.decide_types') as decide_types:
+                decide_types.return_value = ['TEXT', 'TEXT']
+                eq_(_read_column_types(args, args.in_file),
+                    (['a', 'b'], ['TEXT', 'TEXT']))
+            args.in_file.close()
+        finally:
+            shutil.rmtree(temp_dir)
+
+    @staticmethod
+    def test_stats():
+        temp_dir = tempfile.mkdtemp()
+        in_path = os.path.join(temp_dir, 'in.csv')
+        out_path = os.path.join(temp_dir, 'out.sql')
+        stats_path = os.path.join(temp_dir, 'stats.json')
+        with open(in_path, 'w') as csv_file:
+            csv_file.write('a,b\n1,x\n2,y\n')
+        try:
+            args = parse_args([
+                'all', '-i', in_path, '-o', out_path, '--no-cache',
+                'tbl', '--stats', stats_path])
+            eq_(args.stats_file, stats_path)
+            _run_command(args)
+            args.in_file.close()
+            args.out_file.close()
+            with open(out_path, newline='') as out_file:
+                output = out_file.read()
+            with open(stats_path) as stats_file:
+                stats = json.load(stats_file)
+
+            phases = stats['phases']
+            eq_([phase['phase'] for phase in phases],
+                ['schema', 'rewind', 'data'])
+            eq_(phases[0]['rows'], 2)
+            eq_(phases[2]['rows'], 2)
+            eq_(phases[2]['bytes_in'], 12)
+            eq_(sum(phase['bytes_out'] for phase in phases), len(output))
+            columns = stats['inference']['columns']
+            eq_([column['typename'] for column in columns],
+                ['INTEGER', 'VARCHAR(255)'])
+            eq_(parse_args(['all', 'tbl', '--stats']).stats_file, '')
+            eq_(parse_args(['all', 'tbl']).stats_file, None)
+        finally:
+            shutil.rmtree(temp_dir)
+
+    @staticmethod
+    def test_trace():
+        temp_dir = tempfile.mkdtemp()
+        in_path = os.path.join(temp_dir, 'in.csv')
+        out_path = os.path.join(temp_dir, 'out.sql')
+        trace_path = os.path.join(temp_dir, 'trace.json')
+        with open(in_path, 'w') as csv_file:
+            csv_file.write('a,b\n1,x\n2,y\n')
+        try:
+            args = parse_args([
+                'all', '-i', in_path, '-o', out_path, '--no-cache',
+                '--trace', trace_path, 'tbl'])
+            _run_command(args)
+            args.in_file.close()
+            args.out_file.close()
+            with open(trace_path) as trace_file:
+                events = json.load(trace_file)
+            names = set(event['name'] for event in events)
+            ok_(set(['schema', 'rewind', 'data']) <= names)
+            ok_(set(['read_chunk', 'infer_chunk', 'write']) <= names)
+        finally:
+            shutil.rmtree(temp_dir)
+
+    @staticmethod
+    def test_progress():
+        eq_(parse_args(['all', 'tbl']).progress_format, None)
+        eq_(parse_args(['all', 'tbl', '--progress']).progress_format, 'text')
+        args = parse_args([
+            'data', '--progress', 'json', '--progress-interval', '0.5', 'tbl'])
+        eq_(args.progress_format, 'json')
+        eq_(args.progress_interval, 0.5)
+
+    @staticmethod
+    def test_progress_report():
+        temp_dir = tempfile.mkdtemp()
+        in_path = os.path.join(temp_dir, 'in.csv')
+        out_path = os.path.join(temp_dir, 'out.sql')
+        with open(in_path, 'w') as csv_file:
+            csv_file.write('a,b\n1,x\n2,y\n')
+        try:
+            args = parse_args([
+                'all', '-i', in_path, '-o', out_path, '--no-cache',
+                '--progress', 'json', 'tbl'])
+            with patch('sys.stderr', new_callable=io.StringIO) as stderr:
+                _run_command(args)
+            args.in_file.close()
+            args.out_file.close()
+            progress = json.loads(stderr.getvalue().splitlines()[-1])
+            eq_(progress['phase'], 'data')
+            eq_(progress['rows'], 2)
+            eq_(progress['total_bytes'], 12)
+        finally:
+            shutil.rmtree(temp_dir)
+
+    @parameterized.expand([
+        ('a,b\n1,x\n2,y\n7,""\n8,z\n', '1,x\n2,y\n7,\n8,z\n'),
+        ('a,b\n1,x\r\n2,y\n', '1,x\n2,y\n'),
+        # The quote breaks the boundaries of the following blocks.
+        ('a,b\n1,x\n2,5"in\n3,"y\nz"\n4,w\n',
+         '1,x\n2,"5""in"\n3,"y\nz"\n4,w\n'),
+    ])
+    def test_passthrough(self, text, expected_data):
+        temp_dir = tempfile.mkdtemp()
+        in_path = os.path.join(temp_dir, 'in.csv')
+        out_path = os.path.join(temp_dir, 'out.sql')
+        with open(in_path, 'w') as csv_file:
+            csv_file.write(text)
+        try:
+            args = parse_args([
+                'data', '-i', in_path, '-o', out_path, '--passthrough',
+                'tbl'])
+            with patch(
+                    'csv2sql.main.read_record_blocks',
+                    lambda in_file: read_record_blocks(in_file, 8)):
+                args.command(args)
+            args.in_file.close()
+            args.out_file.close()
+            with open(out_path, newline='') as out_file:
+                eq_(out_file.read(),
+                    'COPY tbl FROM STDIN WITH NULL \'\' CSV;\n' +
+                    expected_data + '\\.\n')
+        finally:
+            shutil.rmtree(temp_dir)
+
+    @staticmethod
+    def test_progress_with_stats():
+        temp_dir = tempfile.mkdtemp()
+        in_path = os.path.join(temp_dir, 'in.csv')
+        out_path = os.path.join(temp_dir, 'out.sql')
+        stats_path = os.path.join(temp_dir, 'stats.json')
+        with open(in_path, 'w') as csv_file:
+            csv_file.write('a\n' + '1\n' * 1500)
+        try:
+            args = parse_args([
+                'all', '-i', in_path, '-o', out_path, '--no-cache',
+                '--progress', 'json', '--stats', stats_path, 'tbl'])
+            with patch('sys.stderr', new_callable=io.StringIO):
+                _run_command(args)
+            args.in_file.close()
+            args.out_file.close()
+            with open(stats_path) as stats_file:
+                phases = json.load(stats_file)['phases']
+            eq_([phase['rows'] for phase in phases], [1000, 0, 1500])
+        finally:
+            shutil.rmtree(temp_dir)
+
+    @staticmethod
+    def test_progress_of_passthrough():
+        temp_dir = tempfile.mkdtemp()
+        in_path = os.path.join(temp_dir, 'in.csv')
+        out_path = os.path.join(temp_dir, 'out.sql')
+        with open(in_path, 'w') as csv_file:
+            csv_file.write('a,b\n1,x\n2,y\n3,""\n4,z')
+        try:
+            args = parse_args([
+                'data', '-i', in_path, '-o', out_path, '--passthrough',
+                '--progress', 'json', 'tbl'])
+            with patch('sys.stderr', new_callable=io.StringIO) as stderr, \
+                    patch('csv2sql.main.read_record_blocks',
+                          lambda in_file: read_record_blocks(in_file, 8)):
+                _run_command(args)
+            args.in_file.close()
+            args.out_file.close()
+            progress = json.loads(stderr.getvalue().splitlines()[-1])
+            eq_(progress['rows'], 4)
+        finally:
+            shutil.rmtree(temp_dir)
+
+    @parameterized.expand([
+        (['--inference-cache-size', '-1'],),
+        (['--inference-cache-memory', '-1'],),
+    ])
+    @raises(SystemExit)
+    def test_invalid_inference_cache(self, cache_args):
+        parse_args(['all', 'tbl'] + cache_args)
+
+    @staticmethod
+    @raises(SystemExit)
+    def test_invalid_progress_interval():
+        parse_args(['all', '--progress-interval', '0', 'tbl'])
+
+    @staticmethod
+    def test_append():
+        temp_dir = tempfile.mkdtemp()
+        in_path = os.path.join(temp_dir, 'in.csv')
+        out_path = os.path.join(temp_dir, 'out.sql')
+        state_path = os.path.join(temp_dir, 'state.json')
+
+        def append(data, *options):
+            with open(in_path, 'a') as csv_file:
+                csv_file.write(data)
+            args = parse_args([
+                'append', '-i', in_path, '-o', out_path,
+                '--state-file', state_path] + list(options) + ['tbl'])
+            try:
+                args.command(args)
+            finally:
+                args.in_file.close()
+                args.out_file.close()
+            with open(out_path) as out_file:
+                return out_file.read()
+
+        try:
+            eq_(append('a,b\n1,x\n2,"y'),
+                'CREATE TABLE tbl (\n'
+                '  "a" INTEGER,\n'
+                '  "b" VARCHAR(255)\n'
+                ');\n'
+                'COPY tbl FROM STDIN WITH NULL \'\' CSV;\n'
+                '1,x\n'
+                '\\.\n')
+            eq_(append(''), '')
+            eq_(append('\nz"\n'),
+                'COPY tbl FROM STDIN WITH NULL \'\' CSV;\n'
+                '2,"y\nz"\n'
+                '\\.\n')
+            try:
+                append('2.5,w\n')
+            except TypeInferenceError:
+                pass
+            else:
+                raise AssertionError('TypeInferenceError is not raised.')
+            eq_(append('', '--on-type-change', 'alter'),
+                'ALTER TABLE tbl ALTER COLUMN "a" TYPE DOUBLE PRECISION;\n'
+                'COPY tbl FROM STDIN WITH NULL \'\' CSV;\n'
+                '2.5,w\n'
+                '\\.\n')
+        finally:
+            shutil.rmtree(temp_dir)
+
+    @staticmethod
+    @raises(SystemExit)
+    def test_append_alter_unsupported():
+        parse_args([
+            'append', '-q', 'sqlite', '--state-file', 'state.json',
+            '--on-type-change', 'alter', 'tbl'])
+
+    @staticmethod
+    def test_load():
+        actual = parse_args([
+            'load', '-q', 'sqlite', '--database', 'test.db',
+            '--batch-size', '10', '--index', 'a', '--index', 'b',
+            '--defer-index', '--journal-mode', 'wal', '--synchronous', 'off',
+            '--cache-size', '-1024', 'table-name'])
+        eq_(actual.database, 'test.db')
+        eq_(actual.batch_size, 10)
+        eq_(actual.index, ['a', 'b'])
+        ok_(actual.defer_index)
+        eq_(actual.journal_mode, 'WAL')
+        eq_(actual.synchronous, 'OFF')
+        eq_(actual.cache_size, -1024)
+
+    @staticmethod
+    def test_load_psql():
+        actual = parse_args([
+            'load', '--database', 'dbname=test', '--streams', '4',
+            '--two-phase', 'table-name'])
+        eq_(actual.database, 'dbname=test')
+        eq_(actual.streams, 4)
+        ok_(actual.two_phase)
+
     @parameterized.expand([
         (['-t', '1-type'],),
         (['--column-type', '0:type'],),